@@ -43,6 +43,24 @@ def create_app():
         app.register_blueprint(assessment_bp, url_prefix='/api')
         from app.routes.evaluation_routes import evaluation_bp
         app.register_blueprint(evaluation_bp, url_prefix='/api')
+
+        # comandos de mantenimiento (flask <comando>)
+        from app.services.attendance_summary_service import rebuild_attendance_summaries_command
+        app.cli.add_command(rebuild_attendance_summaries_command)
+        from app.services.attendance_risk_service import compute_attendance_risk_command
+        app.cli.add_command(compute_attendance_risk_command)
+        from app.services.java_outbox_service import java_outbox, java_outbox_worker_command
+        app.cli.add_command(java_outbox_worker_command)
+        from app.services.java_reconciliation_service import reconcile_java_persons_command
+        app.cli.add_command(reconcile_java_persons_command)
+
+        # Worker del outbox de Java en hilos de la app (no en pruebas). Se inicia
+        # con la primera petición: así no corre bajo `flask <comando>` (ni junto
+        # a `flask java-outbox-worker`) y, con gunicorn, arranca después del fork
+        if app.config.get("JAVA_OUTBOX_WORKERS") and not app.config.get("TESTING"):
+            @app.before_request
+            def start_java_outbox_worker():
+                java_outbox.start(app, workers=app.config["JAVA_OUTBOX_WORKERS"])
         
     @app.teardown_appcontext
     def shutdown_session(exception=None):
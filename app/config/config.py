@@ -22,6 +22,27 @@ class Config:
     # [NUEVO] URL del API externo (Docker del profesor)
     PERSON_API_URL = "http://localhost:8096/api/person"
 
+    # Cliente HTTP del API de personas: pool keep-alive, timeouts y reintentos
+    JAVA_HTTP_POOL_SIZE = int(environ.get("JAVA_HTTP_POOL_SIZE", "10"))
+    JAVA_HTTP_CONNECT_TIMEOUT = float(environ.get("JAVA_HTTP_CONNECT_TIMEOUT", "2"))
+    JAVA_HTTP_READ_TIMEOUT = float(environ.get("JAVA_HTTP_READ_TIMEOUT", "5"))
+    JAVA_HTTP_RETRIES = int(environ.get("JAVA_HTTP_RETRIES", "2"))
+    JAVA_HTTP_BACKOFF = float(environ.get("JAVA_HTTP_BACKOFF", "0.2"))
+    # Circuit breaker del API de personas: se abre tras N fallas seguidas
+    JAVA_CIRCUIT_FAILURES = int(environ.get("JAVA_CIRCUIT_FAILURES", "5"))
+    JAVA_CIRCUIT_RESET_SECONDS = float(environ.get("JAVA_CIRCUIT_RESET_SECONDS", "30"))
+    JAVA_CIRCUIT_HALF_OPEN_PROBES = int(environ.get("JAVA_CIRCUIT_HALF_OPEN_PROBES", "1"))
+    # Caché de búsquedas por identificación en Java (segundos; no encontrados = TTL corto)
+    JAVA_ID_CACHE_SIZE = int(environ.get("JAVA_ID_CACHE_SIZE", "2000"))
+    JAVA_ID_CACHE_TTL = float(environ.get("JAVA_ID_CACHE_TTL", "300"))
+    JAVA_ID_CACHE_NEGATIVE_TTL = float(environ.get("JAVA_ID_CACHE_NEGATIVE_TTL", "30"))
+    # Hilos del worker del outbox de Java dentro de la app (0 = usar flask java-outbox-worker).
+    # Se inician con la primera petición: los comandos `flask ...` no los levantan
+    JAVA_OUTBOX_WORKERS = int(environ.get("JAVA_OUTBOX_WORKERS", "1"))
+    # Cuenta de servicio con la que el worker del outbox se autentica en Java
+    JAVA_SERVICE_EMAIL = environ.get("JAVA_SERVICE_EMAIL")
+    JAVA_SERVICE_PASSWORD = environ.get("JAVA_SERVICE_PASSWORD")
+
     #SQLAlchemy configuration
     SQLALCHEMY_DATABASE_URI = f'postgresql://{user}:{password}@{host}:{port}/{db}?client_encoding=utf8'
     
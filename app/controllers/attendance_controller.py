@@ -1,35 +1,77 @@
-from datetime import date, datetime
+import base64
+import hashlib
+import json
+import uuid
+from datetime import date, datetime, timedelta
+from sqlalchemy import and_, case, func, or_
+from sqlalchemy.orm import contains_eager
 from app.models.attendance import Attendance
+from app.models.attendanceDailySummary import AttendanceDailySummary
+from app.models.attendanceSyncReceipt import AttendanceSyncReceipt
+from app.models.enrollment import Enrollment
 from app.models.participant import Participant
+from app.models.participantAttendanceCounter import ParticipantAttendanceCounter
+from app.models.participantAttendanceRisk import ParticipantAttendanceRisk
 from app.models.schedule import Schedule
+from app.models.syncTombstone import SyncTombstone
+from app.services.attendance_summary_service import (
+    has_capacity,
+    apply_participant_counter_changes,
+    increment_participant_counter,
+    lock_session_summary,
+    refresh_session_summary,
+)
+from app.services.attendance_risk_service import compute_attendance_risk
+from app.services.participant_search_service import participant_search
+from app.services.schedule_occurrence_service import ScheduleRule, schedule_occurrences
+from app.services.sync_service import record_tombstones
+from app.utils.cache import TTLCache
+from app.utils.db_dialect import dialect_insert
 from app.utils.responses import error_response, success_response
+from app.utils.spreadsheet_stream import stream_csv, stream_xlsx
+from app.utils.validations.attendance_validation import format_date, parse_attendance_date
 from app import db
 
+# Sesiones del día por fecha. Se invalida en cada escritura de este proceso;
+# el TTL acota el desfase entre workers de gunicorn.
+today_sessions_cache = TTLCache(maxsize=7, ttl=60)
+
 
 class AttendanceController:
 
     def get_participants(self, program=None):
         # Lista participantes activos con porcentaje de asistencia calculado
         try:
-            query = Participant.query
+            counters = ParticipantAttendanceCounter
+            query = db.session.query(
+                Participant.external_id,
+                Participant.firstName,
+                Participant.lastName,
+                Participant.dni,
+                Participant.email,
+                Participant.phone,
+                Participant.status,
+                Participant.program,
+                counters.total,
+                counters.present,
+            ).outerjoin(counters, counters.participant_id == Participant.id)
             if program:
-                query = query.filter_by(program=program)
+                query = query.filter(Participant.program == program)
 
-            participants = query.all()
             result = []
-            for p in participants:
+            for row in query.all():
                 result.append(
                     {
-                        "external_id": p.external_id,
-                        "first_name": p.firstName,
-                        "last_name": p.lastName,
-                        "dni": p.dni,
-                        "email": getattr(p, "email", None),
-                        "phone": getattr(p, "phone", None),
-                        "status": getattr(p, "status", "active"),
-                        "program": getattr(p, "program", None),
-                        "attendance_percentage": self._calculate_attendance_percentage(
-                            p.id
+                        "external_id": row.external_id,
+                        "first_name": row.firstName,
+                        "last_name": row.lastName,
+                        "dni": row.dni,
+                        "email": row.email,
+                        "phone": row.phone,
+                        "status": row.status or "active",
+                        "program": row.program,
+                        "attendance_percentage": self._percentage(
+                            row.present, row.total
                         ),
                     }
                 )
@@ -43,29 +85,68 @@ class AttendanceController:
         # Retorna horarios/sesiones activas del sistema
         try:
             schedules = Schedule.query.filter_by(status="active").all()
-            result = []
-            for s in schedules:
-                result.append(
-                    {
-                        "external_id": s.external_id,
-                        "name": s.name,
-                        "day_of_week": s.dayOfWeek,
-                        "start_time": s.startTime,
-                        "end_time": s.endTime,
-                        "max_slots": s.maxSlots,
-                        "program": s.program,
-                        "specific_date": s.specificDate,
-                        "start_date": s.startDate,
-                        "end_date": s.endDate,
-                        "is_recurring": s.isRecurring,
-                        "location": s.location,
-                        "description": s.description,
-                    }
-                )
+            result = [self._serialize_schedule(s) for s in schedules]
             return success_response(msg="Horarios obtenidos correctamente", data=result)
         except Exception as e:
             return error_response(msg="Error interno", code=500, data={"error": str(e)})
 
+    def _serialize_schedule(self, s):
+        return {
+            "external_id": s.external_id,
+            "name": s.name,
+            "day_of_week": s.dayOfWeek,
+            "start_time": s.startTime,
+            "end_time": s.endTime,
+            "max_slots": s.maxSlots,
+            "program": s.program,
+            "specific_date": format_date(s.specificDate),
+            "start_date": format_date(s.startDate),
+            "end_date": format_date(s.endDate),
+            "is_recurring": s.isRecurring,
+            "location": s.location,
+            "description": s.description,
+        }
+
+    CALENDAR_MAX_DAYS = 366
+
+    def get_calendar(self, date_from, date_to, program=None):
+        # Ocurrencias concretas (fecha, inicio, fin) de los horarios activos en un rango
+        try:
+            errors = {}
+            window_start, date_error = parse_attendance_date(date_from)
+            if date_error or not window_start:
+                errors["from"] = date_error or "Fecha de inicio requerida"
+            window_end, date_error = parse_attendance_date(date_to)
+            if date_error or not window_end:
+                errors["to"] = date_error or "Fecha de fin requerida"
+            if not errors and window_end < window_start:
+                errors["to"] = "La fecha de fin debe ser posterior a la fecha de inicio"
+            if not errors and (window_end - window_start).days > self.CALENDAR_MAX_DAYS:
+                errors["to"] = f"El rango máximo es de {self.CALENDAR_MAX_DAYS} días"
+            if errors:
+                return error_response(msg="Error de validación", data=errors, code=400)
+
+            result = [
+                {
+                    "date": day.isoformat(),
+                    "start_time": rule.start_time,
+                    "end_time": rule.end_time,
+                    "schedule": {
+                        "external_id": rule.external_id,
+                        "name": rule.name,
+                        "program": rule.program,
+                        "location": rule.location,
+                        "is_recurring": rule.specific_date is None,
+                    },
+                }
+                for day, rule in schedule_occurrences.occurrences(
+                    window_start, window_end, program
+                )
+            ]
+            return success_response(msg="Calendario obtenido correctamente", data=result)
+        except Exception as e:
+            return error_response(msg="Error interno", code=500, data={"error": str(e)})
+
     def create_schedule(self, data):
         # Crea nueva sesión con validaciones de horario, capacidad y solapamiento
         try:
@@ -156,9 +237,17 @@ class AttendanceController:
                     errors["max_slots"] = "El número de cupos debe ser numérico"
 
             # Validar fechas
-            from datetime import date as date_class
-
-            hoy = date_class.today().isoformat()
+            specific_date, date_error = parse_attendance_date(specific_date)
+            if date_error:
+                errors["specific_date"] = date_error
+            start_date, date_error = parse_attendance_date(start_date)
+            if date_error:
+                errors["start_date"] = date_error
+            end_date, date_error = parse_attendance_date(end_date)
+            if date_error:
+                errors["end_date"] = date_error
+
+            hoy = date.today()
 
             if specific_date and specific_date < hoy:
                 errors["specific_date"] = "No se puede crear sesión con fecha pasada"
@@ -175,23 +264,21 @@ class AttendanceController:
             if errors:
                 return error_response(msg="Error de validación", data=errors, code=400)
 
-            # Validación de solapamiento de horarios para sesiones recurrentes
-            if day_of_week:
-                overlaps = Schedule.query.filter(
-                    Schedule.dayOfWeek == day_of_week.upper(),
-                    Schedule.program == program,
-                    Schedule.startTime < end_time,
-                    Schedule.endTime > start_time,
-                ).first()
-
-                if overlaps:
-                    return error_response(
-                        msg="Error de validación",
-                        data={
-                            "schedule": f"El horario se solapa con otro existente: {overlaps.name}"
-                        },
-                        code=400,
-                    )
+            # Validación de solapamiento (recurrentes y de fecha específica, con rango de fechas)
+            overlaps = schedule_occurrences.find_overlaps(
+                ScheduleRule(
+                    None, None, name, program, location, day_of_week,
+                    specific_date, start_date, end_date, start_time, end_time,
+                )
+            )
+            if overlaps:
+                return error_response(
+                    msg="Error de validación",
+                    data={
+                        "schedule": f"El horario se solapa con otro existente: {overlaps[0].name}"
+                    },
+                    code=400,
+                )
 
             nuevo_schedule = Schedule(
                 name=name,
@@ -213,6 +300,7 @@ class AttendanceController:
             )
             db.session.add(nuevo_schedule)
             db.session.commit()
+            today_sessions_cache.clear()
 
             return success_response(
                 msg="Horario creado exitosamente",
@@ -268,18 +356,33 @@ class AttendanceController:
             # Actualizar fecha específica (IMPORTANTE para sesiones de fecha específica)
             specific_date = data.get("specific_date") or data.get("specificDate")
             if specific_date is not None:
-                schedule.specificDate = specific_date
+                schedule.specificDate, date_error = parse_attendance_date(specific_date)
+                if date_error:
+                    return error_response(
+                        msg="Error de validación", code=400,
+                        data={"specific_date": date_error},
+                    )
                 print(f"DEBUG - Actualizado specificDate: {specific_date}")
 
             # Actualizar fecha de inicio
             start_date = data.get("start_date") or data.get("startDate")
             if start_date is not None:
-                schedule.startDate = start_date
+                schedule.startDate, date_error = parse_attendance_date(start_date)
+                if date_error:
+                    return error_response(
+                        msg="Error de validación", code=400,
+                        data={"start_date": date_error},
+                    )
 
             # Actualizar fecha de fin
             end_date = data.get("end_date") or data.get("endDate")
             if end_date is not None:
-                schedule.endDate = end_date
+                schedule.endDate, date_error = parse_attendance_date(end_date)
+                if date_error:
+                    return error_response(
+                        msg="Error de validación", code=400,
+                        data={"end_date": date_error},
+                    )
 
             # Actualizar si es recurrente
             is_recurring = data.get("is_recurring") if "is_recurring" in data else data.get("isRecurring")
@@ -297,7 +400,24 @@ class AttendanceController:
             if description is not None:
                 schedule.description = description
 
+            try:
+                overlaps = schedule_occurrences.find_overlaps(
+                    ScheduleRule.from_schedule(schedule)
+                )
+            except (ValueError, TypeError):
+                overlaps = []
+            if overlaps:
+                db.session.rollback()
+                return error_response(
+                    msg="Error de validación",
+                    data={
+                        "schedule": f"El horario se solapa con otro existente: {overlaps[0].name}"
+                    },
+                    code=400,
+                )
+
             db.session.commit()
+            today_sessions_cache.clear()
             print(f"DEBUG - Schedule actualizado correctamente: specificDate={schedule.specificDate}, dayOfWeek={schedule.dayOfWeek}")
             
             return success_response(
@@ -322,6 +442,7 @@ class AttendanceController:
                 )
             schedule.status = "inactive"
             db.session.commit()
+            today_sessions_cache.clear()
             return success_response(msg="Horario eliminado correctamente (Soft Delete)")
         except Exception as e:
             db.session.rollback()
@@ -332,8 +453,6 @@ class AttendanceController:
     def get_today_sessions(self):
         # Obtiene sesiones programadas para hoy: recurrentes + fecha específica
         try:
-            from datetime import date as date_class
-
             # Mapeo de días: 0=Lunes, 1=Martes, ... 6=Domingo
             dias_semana = [
                 "Lunes",
@@ -344,12 +463,26 @@ class AttendanceController:
                 "Sábado",
                 "Domingo",
             ]
-            hoy_date = date_class.today().isoformat()
+            hoy_date = date.today()
             hoy_dia = dias_semana[datetime.now().weekday()]
 
+            cached = today_sessions_cache.get(hoy_date)
+            if cached is not None:
+                return success_response(
+                    msg=f"Sesiones de hoy obtenidas correctamente", data=cached
+                )
+
+            # Conteo de asistencias de hoy desde el resumen diario por sesión
+            summary = AttendanceDailySummary
+
             # Consulta: sesiones recurrentes del día + sesiones específicas de hoy
             schedules = (
-                Schedule.query.filter(Schedule.status == "active")
+                db.session.query(Schedule, summary.total)
+                .outerjoin(
+                    summary,
+                    and_(summary.schedule_id == Schedule.id, summary.date == hoy_date),
+                )
+                .filter(Schedule.status == "active")
                 .filter(
                     db.or_(
                         Schedule.dayOfWeek == hoy_dia, Schedule.specificDate == hoy_date
@@ -359,12 +492,9 @@ class AttendanceController:
             )
 
             result = []
-            for s in schedules:
+            for s, attendances_count in schedules:
                 # Determinar estado: completada si ya tiene asistencias registradas
-                attendances_count = Attendance.query.filter_by(
-                    schedule_id=s.id, date=hoy_date
-                ).count()
-
+                attendances_count = attendances_count or 0
                 status = "completada" if attendances_count > 0 else "pendiente"
 
                 result.append(
@@ -375,7 +505,7 @@ class AttendanceController:
                         "start_time": s.startTime,
                         "end_time": s.endTime,
                         "program": s.program,
-                        "specific_date": s.specificDate,
+                        "specific_date": format_date(s.specificDate),
                         "is_recurring": s.isRecurring,
                         "location": s.location,
                         "status": status,
@@ -383,164 +513,611 @@ class AttendanceController:
                         "has_attendances": attendances_count > 0,
                     }
                 )
+            today_sessions_cache.set(hoy_date, result)
             return success_response(
                 msg=f"Sesiones de hoy obtenidas correctamente", data=result
             )
         except Exception as e:
             return error_response(msg="Error interno", code=500, data={"error": str(e)})
 
+    HISTORY_MAX_LIMIT = 500
+    HISTORY_STREAM_BATCH = 1000
+
     def get_history(
         self, date_from=None, date_to=None, schedule_id=None, day_filter=None,
-        search_dni=None, search_name=None, participant_id=None
+        search_dni=None, search_name=None, participant_id=None, limit=None, cursor=None
     ):
-        # Historial de asistencias con filtros de fecha, sesión, día y búsqueda por participante
+        # Historial de asistencias con filtros de fecha, sesión, día y búsqueda por participante.
+        # Con limit/cursor pagina por keyset sobre (date, id) en orden descendente.
         try:
             print(f"DEBUG - Filtros recibidos: date_from={date_from}, date_to={date_to}, schedule_id={schedule_id}, day_filter={day_filter}")
             print(f"DEBUG - Búsqueda: dni={search_dni}, name={search_name}, participant_id={participant_id}")
-            
-            from sqlalchemy import func, or_
-            
-            query = Attendance.query.join(Schedule).join(Participant)
-            
-            # Filtro por DNI del participante (búsqueda exacta o parcial)
-            if search_dni:
-                query = query.filter(Participant.dni.ilike(f"%{search_dni}%"))
-                print(f"DEBUG - Aplicando filtro DNI: {search_dni}")
-            
-            # Filtro por nombre del participante (búsqueda parcial en nombre y apellido)
-            if search_name:
-                search_term = f"%{search_name}%"
+
+            try:
+                query = self._history_query(
+                    date_from, date_to, schedule_id, day_filter,
+                    search_dni, search_name, participant_id,
+                )
+            except ValueError as e:
+                return error_response(
+                    msg="Error de validación", code=400, data={"date": str(e)}
+                )
+
+            if limit is None and cursor is None:
+                result = [self._serialize_history(a) for a in query.all()]
+                print(f"DEBUG - Resultado final: {len(result)} asistencias")
+                return success_response(msg="Historial obtenido correctamente", data=result)
+
+            try:
+                limit = min(max(int(limit or 50), 1), self.HISTORY_MAX_LIMIT)
+            except (TypeError, ValueError):
+                return error_response(
+                    msg="Error de validación", code=400,
+                    data={"limit": "El límite debe ser numérico"},
+                )
+
+            if cursor:
+                try:
+                    cursor_date, cursor_id = self._decode_cursor(cursor)
+                except ValueError:
+                    return error_response(
+                        msg="Error de validación", code=400,
+                        data={"cursor": "Cursor inválido"},
+                    )
                 query = query.filter(
                     or_(
-                        Participant.firstName.ilike(search_term),
-                        Participant.lastName.ilike(search_term),
-                        func.concat(Participant.firstName, ' ', Participant.lastName).ilike(search_term)
+                        Attendance.date < cursor_date,
+                        and_(Attendance.date == cursor_date, Attendance.id < cursor_id),
                     )
                 )
-                print(f"DEBUG - Aplicando filtro nombre: {search_name}")
-            
-            # Filtro por ID del participante (para ver historial individual)
-            if participant_id:
-                participant = Participant.query.filter_by(external_id=participant_id).first()
-                if participant:
-                    query = query.filter(Attendance.participant_id == participant.id)
-                    print(f"DEBUG - Aplicando filtro participant_id: {participant_id}")
-
-            if date_from:
-                query = query.filter(Attendance.date >= date_from)
-                print(f"DEBUG - Aplicando filtro date_from: {date_from}")
-                
-            if date_to:
-                query = query.filter(Attendance.date <= date_to)
-                print(f"DEBUG - Aplicando filtro date_to: {date_to}")
-
-            if schedule_id:
-                schedule = Schedule.query.filter_by(external_id=schedule_id).first()
-                if schedule:
-                    query = query.filter(Attendance.schedule_id == schedule.id)
-                    print(f"DEBUG - Aplicando filtro schedule_id: {schedule_id}")
-
-            if day_filter:
-                print(f"DEBUG - Aplicando filtro day_of_week: '{day_filter}'")
-                # Convertir a mayúsculas para comparación case-insensitive
-                day_filter_upper = day_filter.upper()
-                print(f"DEBUG - day_filter convertido a mayúsculas: '{day_filter_upper}'")
-                
-                # Mapear nombre del día a número de día de la semana (PostgreSQL: 0=Sunday, 1=Monday, etc.)
-                day_mapping = {
-                    'DOMINGO': 0,
-                    'LUNES': 1,
-                    'MARTES': 2,
-                    'MIERCOLES': 3,
-                    'MIÉRCOLES': 3,
-                    'JUEVES': 4,
-                    'VIERNES': 5,
-                    'SABADO': 6,
-                    'SÁBADO': 6
-                }
-                
-                day_number = day_mapping.get(day_filter_upper)
-                print(f"DEBUG - Día mapeado a número: {day_number}")
-                
-                if day_number is not None:
-                    from sqlalchemy import func, cast, Date
-                    # Filtrar por el día de la semana de la fecha de asistencia
-                    # En PostgreSQL, EXTRACT(DOW FROM date) devuelve 0=Sunday, 1=Monday, etc.
-                    query = query.filter(func.extract('dow', cast(Attendance.date, Date)) == day_number)
-                    print(f"DEBUG - Filtrando asistencias del día {day_filter_upper} (dow={day_number})")
-
-            attendances = query.order_by(Attendance.date.desc()).all()
-            print(f"DEBUG - Total asistencias encontradas después de filtros: {len(attendances)}")
-            
+
+            # Se pide un registro extra para saber si existe otra página
+            attendances = query.limit(limit + 1).all()
+            page = attendances[:limit]
+            next_cursor = None
+            if len(attendances) > limit:
+                next_cursor = self._encode_cursor(page[-1].date, page[-1].id)
+
+            return success_response(
+                msg="Historial obtenido correctamente",
+                data={
+                    "items": [self._serialize_history(a) for a in page],
+                    "next_cursor": next_cursor,
+                    "limit": limit,
+                },
+            )
+        except Exception as e:
+            return error_response(msg="Error interno", code=500, data={"error": str(e)})
+
+    def stream_history(
+        self, date_from=None, date_to=None, schedule_id=None, day_filter=None,
+        search_dni=None, search_name=None, participant_id=None
+    ):
+        # Generador NDJSON: una asistencia por línea leída con cursor del lado del servidor.
+        # Los filtros se validan antes de devolver el generador (ValueError si son inválidos).
+        statement = self._history_query(
+            date_from, date_to, schedule_id, day_filter,
+            search_dni, search_name, participant_id,
+        ).statement.execution_options(yield_per=self.HISTORY_STREAM_BATCH)
+        return self._ndjson_rows(statement)
+
+    def _ndjson_rows(self, statement):
+        for a in db.session.execute(statement).scalars():
+            yield json.dumps(self._serialize_history(a), ensure_ascii=False) + "\n"
+
+    EXPORT_HEADER = [
+        "Fecha", "Estado", "DNI", "Nombres", "Apellidos", "Programa",
+        "Sesión", "Día", "Hora inicio", "Hora fin", "Ubicación",
+    ]
+
+    def export_history(
+        self, export_format="csv", date_from=None, date_to=None, schedule_id=None,
+        day_filter=None, search_dni=None, search_name=None, participant_id=None
+    ):
+        # Exportación CSV/XLSX del historial con los mismos filtros de get_history.
+        # Igual que stream_history: valida antes de devolver el generador (ValueError).
+        if export_format not in ("csv", "xlsx"):
+            raise ValueError("Formato no soportado, use csv o xlsx")
+        statement = self._history_query(
+            date_from, date_to, schedule_id, day_filter,
+            search_dni, search_name, participant_id,
+            columns=(
+                Attendance.date, Attendance.status, Participant.dni,
+                Participant.firstName, Participant.lastName, Schedule.program,
+                Schedule.name, Schedule.dayOfWeek, Schedule.startTime,
+                Schedule.endTime, Schedule.location,
+            ),
+        ).statement.execution_options(yield_per=self.HISTORY_STREAM_BATCH)
+        rows = self._export_rows(statement)
+        if export_format == "xlsx":
+            return stream_xlsx(self.EXPORT_HEADER, rows, sheet_name="Asistencias")
+        return stream_csv(self.EXPORT_HEADER, rows)
+
+    def _export_rows(self, statement):
+        for row in db.session.execute(statement):
+            yield (format_date(row.date), *row[1:])
+
+    def _history_query(
+        self, date_from=None, date_to=None, schedule_id=None, day_filter=None,
+        search_dni=None, search_name=None, participant_id=None, columns=None
+    ):
+        # Método interno: consulta filtrada con horario y participante cargados en el mismo JOIN.
+        # Con `columns` devuelve solo esas columnas (filas, sin objetos del ORM).
+        if columns:
+            query = db.session.query(*columns).select_from(Attendance)
+        else:
+            query = Attendance.query.options(
+                contains_eager(Attendance.schedule),
+                contains_eager(Attendance.participant),
+            )
+        query = query.join(Attendance.schedule).join(Attendance.participant)
+
+        # Filtro por DNI del participante (búsqueda parcial, indexada)
+        if search_dni:
+            query = query.filter(
+                Attendance.participant_id.in_(
+                    participant_search.matching_ids(search_dni, field="dni")
+                )
+            )
+
+        # Filtro por nombre del participante (nombre, apellido o nombre completo)
+        if search_name:
+            query = query.filter(
+                Attendance.participant_id.in_(
+                    participant_search.matching_ids(search_name, field="name")
+                )
+            )
+
+        # Filtro por ID del participante (para ver historial individual)
+        if participant_id:
+            query = query.filter(Participant.external_id == participant_id)
+
+        date_from, date_error = parse_attendance_date(date_from)
+        if date_error:
+            raise ValueError(date_error)
+        if date_from:
+            query = query.filter(Attendance.date >= date_from)
+
+        date_to, date_error = parse_attendance_date(date_to)
+        if date_error:
+            raise ValueError(date_error)
+        if date_to:
+            query = query.filter(Attendance.date <= date_to)
+
+        if schedule_id:
+            query = query.filter(Schedule.external_id == schedule_id)
+
+        if day_filter:
+            # Mapear nombre del día a número de día de la semana (PostgreSQL: 0=Sunday, 1=Monday, etc.)
+            day_mapping = {
+                'DOMINGO': 0,
+                'LUNES': 1,
+                'MARTES': 2,
+                'MIERCOLES': 3,
+                'MIÉRCOLES': 3,
+                'JUEVES': 4,
+                'VIERNES': 5,
+                'SABADO': 6,
+                'SÁBADO': 6
+            }
+
+            day_number = day_mapping.get(day_filter.upper())
+            if day_number is not None:
+                # En PostgreSQL, EXTRACT(DOW FROM date) devuelve 0=Sunday, 1=Monday, etc.
+                query = query.filter(func.extract('dow', Attendance.date) == day_number)
+
+        return query.order_by(Attendance.date.desc(), Attendance.id.desc())
+
+    def _serialize_history(self, a):
+        # Método interno: formato de una asistencia en el historial
+        return {
+            "external_id": a.external_id,
+            "date": format_date(a.date),
+            "status": a.status,
+            "participant": {
+                "external_id": a.participant.external_id,
+                "first_name": a.participant.firstName,
+                "last_name": a.participant.lastName,
+                "dni": a.participant.dni,
+            },
+            "schedule": {
+                "external_id": a.schedule.external_id,
+                "name": a.schedule.name,
+                "day_of_week": a.schedule.dayOfWeek or "",
+                "start_time": a.schedule.startTime,
+                "end_time": a.schedule.endTime,
+                "program": a.schedule.program,
+                "location": a.schedule.location or "",
+                "description": a.schedule.description or "",
+            },
+        }
+
+    def _encode_cursor(self, date_value, attendance_id):
+        # Método interno: cursor opaco con la última posición (date, id) entregada
+        raw = f"{date_value}|{attendance_id}".encode()
+        return base64.urlsafe_b64encode(raw).decode()
+
+    def _decode_cursor(self, cursor):
+        try:
+            date_value, attendance_id = (
+                base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+            )
+            return date.fromisoformat(date_value), int(attendance_id)
+        except Exception:
+            raise ValueError("Cursor inválido")
+
+    OCCUPANCY_MOVING_WINDOW = 4
+    WEEKDAY_NAMES = ["Domingo", "Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado"]
+
+    def get_occupancy(self, date_from, date_to, program=None):
+        # Ocupación por horario y por día de la semana, calculada en SQL sobre el resumen diario
+        try:
+            errors = {}
+            date_from, date_error = parse_attendance_date(date_from)
+            if date_error or not date_from:
+                errors["date_from"] = date_error or "Fecha de inicio requerida"
+            date_to, date_error = parse_attendance_date(date_to)
+            if date_error or not date_to:
+                errors["date_to"] = date_error or "Fecha de fin requerida"
+            if not errors and date_to < date_from:
+                errors["date_to"] = "La fecha de fin debe ser posterior a la fecha de inicio"
+            if errors:
+                return error_response(msg="Error de validación", data=errors, code=400)
+
+            summary = AttendanceDailySummary
+            # Las sesiones sin registros (p. ej. eliminadas) no cuentan como dictadas
+            conditions = [summary.date >= date_from, summary.date <= date_to, summary.total > 0]
+            if program:
+                conditions.append(Schedule.program == program)
+            sessions = (
+                db.session.query(
+                    Schedule.external_id.label("schedule_external_id"),
+                    Schedule.name.label("name"),
+                    Schedule.program.label("program"),
+                    Schedule.maxSlots.label("max_slots"),
+                    func.extract("dow", summary.date).label("weekday"),
+                    summary.date.label("date"),
+                    summary.present.label("present"),
+                    summary.absent.label("absent"),
+                    (summary.present * 1.0 / func.nullif(Schedule.maxSlots, 0)).label("fill_rate"),
+                )
+                .join(Schedule, Schedule.id == summary.schedule_id)
+                .filter(*conditions)
+                .subquery()
+            )
+
+            by_schedule = self._occupancy_stats(
+                sessions,
+                [sessions.c.schedule_external_id, sessions.c.name, sessions.c.program, sessions.c.max_slots],
+            )
+            by_weekday = self._occupancy_stats(sessions, [sessions.c.weekday])
+
+            return success_response(
+                msg="Ocupación obtenida correctamente",
+                data={
+                    "date_from": date_from.isoformat(),
+                    "date_to": date_to.isoformat(),
+                    "by_schedule": [
+                        dict(
+                            self._occupancy_row(row),
+                            external_id=row.schedule_external_id,
+                            name=row.name,
+                            program=row.program,
+                            max_slots=row.max_slots,
+                        )
+                        for row in by_schedule
+                    ],
+                    "by_weekday": [
+                        dict(
+                            self._occupancy_row(row),
+                            weekday=int(row.weekday),
+                            day_name=self.WEEKDAY_NAMES[int(row.weekday)],
+                        )
+                        for row in by_weekday
+                    ],
+                },
+            )
+        except Exception as e:
+            return error_response(msg="Error interno", code=500, data={"error": str(e)})
+
+    def _occupancy_stats(self, sessions, keys):
+        # Método interno: agrega por `keys` con media móvil (ventana) para la tendencia
+        key_names = [k.name for k in keys]
+        daily = (
+            db.session.query(
+                *keys,
+                sessions.c.date,
+                func.sum(sessions.c.present).label("present"),
+                func.sum(sessions.c.absent).label("absent"),
+                func.avg(sessions.c.fill_rate).label("fill_rate"),
+            )
+            .group_by(*keys, sessions.c.date)
+            .subquery()
+        )
+        partition = [daily.c[name] for name in key_names]
+        windowed = db.session.query(
+            daily,
+            func.avg(daily.c.fill_rate)
+            .over(
+                partition_by=partition,
+                order_by=daily.c.date,
+                rows=(-(self.OCCUPANCY_MOVING_WINDOW - 1), 0),
+            )
+            .label("moving_fill"),
+            func.row_number().over(partition_by=partition, order_by=daily.c.date).label("first_rank"),
+            func.row_number().over(partition_by=partition, order_by=daily.c.date.desc()).label("last_rank"),
+        ).subquery()
+        group = [windowed.c[name] for name in key_names]
+        return (
+            db.session.query(
+                *group,
+                func.count().label("sessions"),
+                func.sum(windowed.c.present).label("present"),
+                func.sum(windowed.c.absent).label("absent"),
+                func.avg(windowed.c.fill_rate).label("fill_rate"),
+                (
+                    func.max(case((windowed.c.last_rank == 1, windowed.c.moving_fill)))
+                    - func.max(case((windowed.c.first_rank == 1, windowed.c.moving_fill)))
+                ).label("trend"),
+            )
+            .group_by(*group)
+            .order_by(*group)
+            .all()
+        )
+
+    def _occupancy_row(self, row):
+        # Método interno: tasas en porcentaje con 2 decimales
+        marked = (row.present or 0) + (row.absent or 0)
+        return {
+            "sessions": row.sessions,
+            "present": row.present or 0,
+            "absent": row.absent or 0,
+            "fill_rate": round(float(row.fill_rate or 0) * 100, 2),
+            "present_ratio": self._percentage(row.present, marked),
+            "trend": round(float(row.trend or 0) * 100, 2),
+        }
+
+    MATRIX_MAX_DAYS = 366
+
+    def get_attendance_matrix(self, date_from, date_to, program=None):
+        # Matriz participantes × sesiones en bits (formato de numpy.packbits, orden "big"):
+        # una fila de ceil(sesiones / 8) bytes por participante, codificada en base64.
+        try:
+            errors = {}
+            date_from, date_error = parse_attendance_date(date_from)
+            if date_error or not date_from:
+                errors["date_from"] = date_error or "Fecha de inicio requerida"
+            date_to, date_error = parse_attendance_date(date_to)
+            if date_error or not date_to:
+                errors["date_to"] = date_error or "Fecha de fin requerida"
+            if not errors and date_to < date_from:
+                errors["date_to"] = "La fecha de fin debe ser posterior a la fecha de inicio"
+            if not errors and (date_to - date_from).days > self.MATRIX_MAX_DAYS:
+                errors["date_to"] = f"El rango máximo es de {self.MATRIX_MAX_DAYS} días"
+            if errors:
+                return error_response(msg="Error de validación", data=errors, code=400)
+
+            query = (
+                db.session.query(
+                    Participant.external_id,
+                    Attendance.date,
+                    Schedule.external_id,
+                    Attendance.status == Attendance.Status.PRESENT,
+                )
+                .join(Participant, Attendance.participant_id == Participant.id)
+                .join(Schedule, Attendance.schedule_id == Schedule.id)
+                .filter(Attendance.date >= date_from, Attendance.date <= date_to)
+                .order_by(Participant.id, Attendance.date, Schedule.id)
+            )
+            if program:
+                query = query.filter(Schedule.program == program)
+            rows = query.all()
+
+            sessions = sorted({(day, schedule_ext) for _, day, schedule_ext, _ in rows})
+            column = {session: i for i, session in enumerate(sessions)}
+            width = len(sessions)
+
+            # Cada fila es un entero de `width` bits (columna 0 = bit más significativo)
+            participants, recorded, present = [], [], []
+            for participant_ext, day, schedule_ext, is_present in rows:
+                if not participants or participants[-1] != participant_ext:
+                    participants.append(participant_ext)
+                    recorded.append(0)
+                    present.append(0)
+                bit = 1 << (width - 1 - column[(day, schedule_ext)])
+                recorded[-1] |= bit
+                if is_present:
+                    present[-1] |= bit
+
+            return success_response(
+                msg="Matriz de asistencia obtenida correctamente",
+                data={
+                    "shape": [len(participants), width],
+                    "bit_order": "big",
+                    "row_bytes": (width + 7) // 8,
+                    "participants": participants,
+                    "dates": [day.isoformat() for day, _ in sessions],
+                    "schedules": [schedule_ext for _, schedule_ext in sessions],
+                    "present": self._pack_rows(present, width),
+                    "recorded": self._pack_rows(recorded, width),
+                },
+            )
+        except Exception as e:
+            return error_response(msg="Error interno", code=500, data={"error": str(e)})
+
+    def _pack_rows(self, rows, width):
+        # Método interno: filas de bits -> bytes contiguos (relleno con ceros a la derecha)
+        row_bytes = (width + 7) // 8
+        padding = row_bytes * 8 - width
+        packed = b"".join((row << padding).to_bytes(row_bytes, "big") for row in rows)
+        return base64.b64encode(packed).decode("ascii")
+
+    AT_RISK_MAX_LIMIT = 200
+
+    def get_at_risk(self, program=None, limit=None, min_absences=None):
+        # Participantes ordenados por riesgo de abandono. Solo lee la tabla precalculada
+        # (participant_attendance_risk), su costo no depende del volumen de asistencias.
+        try:
+            try:
+                limit = min(max(int(limit or 50), 1), self.AT_RISK_MAX_LIMIT)
+                min_absences = int(min_absences or 0)
+            except ValueError:
+                return error_response(
+                    msg="Error de validación",
+                    code=400,
+                    data={"limit": "limit y min_absences deben ser números enteros"},
+                )
+
+            risk = ParticipantAttendanceRisk
+            query = (
+                db.session.query(
+                    risk,
+                    Participant.external_id,
+                    Participant.firstName,
+                    Participant.lastName,
+                    Participant.dni,
+                    Participant.program,
+                )
+                .join(Participant, Participant.id == risk.participant_id)
+                .filter(Participant.status != "INACTIVO")
+            )
+            if program:
+                query = query.filter(Participant.program == program)
+            if min_absences:
+                query = query.filter(
+                    risk.streak_status == Attendance.Status.ABSENT,
+                    risk.streak_length >= min_absences,
+                )
+            rows = query.order_by(risk.risk_score.desc(), risk.participant_id).limit(limit)
+
             result = []
-            for a in attendances:
-                print(f"DEBUG - Procesando asistencia: fecha={a.date}, sesión='{a.schedule.name}', día='{a.schedule.dayOfWeek}'")
+            computed_at = None
+            for r, external_id, first_name, last_name, dni, participant_program in rows:
+                computed_at = computed_at or r.computed_at
                 result.append(
                     {
-                        "external_id": a.external_id,
-                        "date": a.date,
-                        "status": a.status,
-                        "participant": {
-                            "external_id": a.participant.external_id,
-                            "first_name": a.participant.firstName,
-                            "last_name": a.participant.lastName,
-                            "dni": a.participant.dni,
-                        },
-                        "schedule": {
-                            "external_id": a.schedule.external_id,
-                            "name": a.schedule.name,
-                            "day_of_week": a.schedule.dayOfWeek or "",
-                            "start_time": a.schedule.startTime,
-                            "end_time": a.schedule.endTime,
-                            "program": a.schedule.program,
-                            "location": a.schedule.location or "",
-                            "description": a.schedule.description or "",
-                        },
+                        "participant_external_id": external_id,
+                        "first_name": first_name,
+                        "last_name": last_name,
+                        "dni": dni,
+                        "program": participant_program,
+                        "streak_status": r.streak_status,
+                        "streak_length": r.streak_length,
+                        "last_attended": format_date(r.last_attended),
+                        "present_30d": r.present_30d,
+                        "total_30d": r.total_30d,
+                        "attendance_rate_30d": (
+                            None if r.attendance_rate_30d is None
+                            else round(r.attendance_rate_30d * 100, 2)
+                        ),
+                        "risk_score": round(r.risk_score, 4),
                     }
                 )
-            
-            print(f"DEBUG - Resultado final: {len(result)} asistencias")
-            return success_response(msg="Historial obtenido correctamente", data=result)
+            return success_response(
+                msg="Participantes en riesgo obtenidos correctamente",
+                data={
+                    "computed_at": computed_at.isoformat() if computed_at else None,
+                    "participants": result,
+                },
+            )
         except Exception as e:
             return error_response(msg="Error interno", code=500, data={"error": str(e)})
 
-    def get_session_detail(self, schedule_id, date):
-        # Detalle completo de participantes y estados de una sesión específica
+    def refresh_at_risk(self):
+        # Recalcula la tabla de riesgo bajo demanda (el mismo trabajo del cron nocturno)
         try:
-            schedule = Schedule.query.filter_by(external_id=schedule_id).first()
-            if not schedule:
+            rows = compute_attendance_risk()
+            db.session.commit()
+            return success_response(
+                msg="Riesgo de asistencia recalculado", data={"participants": rows}
+            )
+        except Exception as e:
+            db.session.rollback()
+            return error_response(msg="Error interno", code=500, data={"error": str(e)})
+
+    def get_session_detail(self, schedule_id, date, if_none_match=None):
+        # Detalle completo de participantes y estados de una sesión específica.
+        # Se consulta en bucle mientras la sesión está abierta: la versión (cantidad de
+        # registros + última modificación) viaja como ETag y permite responder 304.
+        try:
+            session_date, date_error = parse_attendance_date(date)
+            if date_error:
+                return error_response(msg=date_error, data={"date": date}, code=400)
+
+            version = (
+                db.session.query(
+                    Schedule.id,
+                    func.count(Attendance.id),
+                    func.max(Attendance.updated_at),
+                    func.max(Participant.updated_at),
+                )
+                .outerjoin(
+                    Attendance,
+                    and_(Attendance.schedule_id == Schedule.id, Attendance.date == session_date),
+                )
+                .outerjoin(Participant, Attendance.participant_id == Participant.id)
+                .filter(Schedule.external_id == schedule_id)
+                .group_by(Schedule.id)
+                .first()
+            )
+            if not version:
                 return error_response(msg="Horario no encontrado", data={}, code=404)
 
-            attendances = Attendance.query.filter_by(
-                schedule_id=schedule.id, date=date
-            ).all()
+            schedule_pk, *stamp = version
+            etag = '"{}"'.format(
+                hashlib.md5(f"{schedule_pk}|{session_date}|{stamp}".encode()).hexdigest()
+            )
+            if if_none_match and (
+                if_none_match.strip() == "*"
+                or etag in [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+            ):
+                return dict(success_response(msg="Sin cambios", code=304), etag=etag)
+
+            rows = (
+                db.session.query(
+                    Attendance.status,
+                    Participant.external_id,
+                    Participant.firstName,
+                    Participant.lastName,
+                    Participant.dni,
+                    Participant.email,
+                )
+                .join(Participant, Attendance.participant_id == Participant.id)
+                .filter(Attendance.schedule_id == schedule_pk, Attendance.date == session_date)
+                .order_by(Attendance.id)
+            )
 
             result = []
-            for a in attendances:
+            for row in rows:
                 result.append(
                     {
-                        "participant_external_id": a.participant.external_id,
-                        "status": a.status,
-                        "participant_name": f"{a.participant.firstName} {a.participant.lastName}",
+                        "participant_external_id": row.external_id,
+                        "status": row.status,
+                        "participant_name": f"{row.firstName} {row.lastName}",
                         "participant": {
-                            "external_id": a.participant.external_id,
-                            "first_name": a.participant.firstName,
-                            "last_name": a.participant.lastName,
-                            "dni": a.participant.dni,
-                            "email": getattr(a.participant, "email", None),
-                            "img": "https://i.pravatar.cc/150?u="
-                            + a.participant.external_id,
+                            "external_id": row.external_id,
+                            "first_name": row.firstName,
+                            "last_name": row.lastName,
+                            "dni": row.dni,
+                            "email": row.email,
+                            "img": "https://i.pravatar.cc/150?u=" + row.external_id,
                         },
                     }
                 )
 
-            return success_response(msg="Detalle de sesión obtenido", data=result)
+            return dict(
+                success_response(msg="Detalle de sesión obtenido", data=result), etag=etag
+            )
         except Exception as e:
             return error_response(msg="Error", code=500, data={"error": str(e)})
 
     def delete_session_attendance(self, schedule_id, date):
         # Elimina todos los registros de asistencia de una fecha específica
         try:
+            session_date, date_error = parse_attendance_date(date)
+            if date_error:
+                return error_response(msg=date_error, data={"date": date}, code=400)
+
             schedule = Schedule.query.filter_by(external_id=schedule_id).first()
             if not schedule:
                 return error_response(
@@ -549,8 +1126,22 @@ class AttendanceController:
                     data={"schedule_external_id": schedule_id},
                 )
 
-            Attendance.query.filter_by(schedule_id=schedule.id, date=date).delete()
+            # Con la sesión bloqueada, lo leído es exactamente lo que se borra
+            lock_session_summary(schedule.id, session_date)
+            session_attendances = Attendance.query.filter_by(
+                schedule_id=schedule.id, date=session_date
+            )
+            deleted = session_attendances.with_entities(
+                Attendance.participant_id, Attendance.external_id, Attendance.status
+            ).all()
+            session_attendances.delete()
+            record_tombstones("attendance", [row.external_id for row in deleted])
+            refresh_session_summary(schedule.id, session_date)
+            apply_participant_counter_changes(
+                (row.participant_id, row.status, None) for row in deleted
+            )
             db.session.commit()
+            today_sessions_cache.invalidate(session_date)
 
             return success_response(
                 msg="Registros de asistencia eliminados para la fecha"
@@ -559,19 +1150,332 @@ class AttendanceController:
             db.session.rollback()
             return error_response(msg="Error", code=500, data={"error": str(e)})
 
+    def _active_enrollment(self, day):
+        # Método interno: condición de inscripción vigente en la fecha `day`
+        return and_(
+            Enrollment.start_date <= day,
+            or_(Enrollment.end_date.is_(None), Enrollment.end_date >= day),
+        )
+
+    def get_session_roster(self, schedule_id, date):
+        # Participantes inscritos en el horario vigentes en la fecha, con su marca si existe.
+        # Un solo JOIN indexado por (schedule_id, start_date, end_date).
+        try:
+            session_date, date_error = parse_attendance_date(date)
+            if date_error or not session_date:
+                return error_response(
+                    msg=date_error or "Fecha requerida", data={"date": date}, code=400
+                )
+
+            rows = (
+                db.session.query(
+                    Participant.external_id,
+                    Participant.firstName,
+                    Participant.lastName,
+                    Participant.dni,
+                    Participant.status,
+                    Attendance.status.label("attendance_status"),
+                )
+                .select_from(Enrollment)
+                .join(Schedule, Schedule.id == Enrollment.schedule_id)
+                .join(Participant, Participant.id == Enrollment.participant_id)
+                .outerjoin(
+                    Attendance,
+                    and_(
+                        Attendance.participant_id == Enrollment.participant_id,
+                        Attendance.schedule_id == Enrollment.schedule_id,
+                        Attendance.date == session_date,
+                    ),
+                )
+                .filter(
+                    Schedule.external_id == schedule_id,
+                    self._active_enrollment(session_date),
+                )
+                .order_by(Participant.lastName, Participant.firstName, Participant.id)
+                .all()
+            )
+            if not rows and not Schedule.query.filter_by(external_id=schedule_id).count():
+                return error_response(
+                    msg="Horario no encontrado",
+                    code=404,
+                    data={"schedule_external_id": schedule_id},
+                )
+
+            return success_response(
+                msg="Lista de la sesión obtenida correctamente",
+                data=[
+                    {
+                        "participant_external_id": row.external_id,
+                        "first_name": row.firstName,
+                        "last_name": row.lastName,
+                        "dni": row.dni,
+                        "participant_status": row.status,
+                        "status": row.attendance_status,
+                    }
+                    for row in rows
+                ],
+            )
+        except Exception as e:
+            return error_response(msg="Error interno", code=500, data={"error": str(e)})
+
+    def enroll_participants(self, schedule_id, data):
+        # Inscribe participantes en un horario desde start_date (por defecto hoy)
+        try:
+            data = data or {}
+            external_ids = data.get("participant_external_ids")
+            errors = {}
+            if not isinstance(external_ids, list) or not external_ids:
+                errors["participant_external_ids"] = "Debe enviar una lista de participantes"
+            start_date, date_error = parse_attendance_date(data.get("start_date"))
+            if date_error:
+                errors["start_date"] = date_error
+            end_date, date_error = parse_attendance_date(data.get("end_date"))
+            if date_error:
+                errors["end_date"] = date_error
+            start_date = start_date or date.today()
+            if not errors and end_date and end_date < start_date:
+                errors["end_date"] = "La fecha de fin debe ser posterior a la fecha de inicio"
+            if errors:
+                return error_response(msg="Error de validación", code=400, data=errors)
+
+            schedule = Schedule.query.filter_by(external_id=schedule_id).first()
+            if not schedule:
+                return error_response(
+                    msg="Horario no encontrado",
+                    code=404,
+                    data={"schedule_external_id": schedule_id},
+                )
+
+            ids_by_external = dict(
+                db.session.query(Participant.external_id, Participant.id).filter(
+                    Participant.external_id.in_(external_ids)
+                )
+            )
+            # Ya inscritos con una inscripción que sigue vigente al inicio
+            already = {
+                pid
+                for (pid,) in db.session.query(Enrollment.participant_id).filter(
+                    Enrollment.schedule_id == schedule.id,
+                    Enrollment.participant_id.in_(list(ids_by_external.values())),
+                    or_(Enrollment.end_date.is_(None), Enrollment.end_date >= start_date),
+                )
+            }
+
+            enrolled, skipped, not_found = [], [], []
+            for external_id in dict.fromkeys(external_ids):
+                participant_id = ids_by_external.get(external_id)
+                if participant_id is None:
+                    not_found.append(external_id)
+                elif participant_id in already:
+                    skipped.append(external_id)
+                else:
+                    db.session.add(
+                        Enrollment(
+                            participant_id=participant_id,
+                            schedule_id=schedule.id,
+                            start_date=start_date,
+                            end_date=end_date,
+                        )
+                    )
+                    enrolled.append(external_id)
+            db.session.commit()
+
+            return success_response(
+                msg=f"Se inscribieron {len(enrolled)} participantes",
+                data={"enrolled": enrolled, "already_enrolled": skipped, "not_found": not_found},
+            )
+        except Exception as e:
+            db.session.rollback()
+            return error_response(msg="Error interno", code=500, data={"error": str(e)})
+
+    def end_enrollment(self, schedule_id, participant_external_id, data=None):
+        # Da de baja la inscripción desde end_date (por defecto hoy): ese día ya no aparece
+        # en la lista. Se guarda el último día vigente (end_date - 1) para conservar el
+        # historial; las inscripciones que aún no empezaban se eliminan.
+        try:
+            end_date, date_error = parse_attendance_date((data or {}).get("end_date"))
+            if date_error:
+                return error_response(
+                    msg="Error de validación", code=400, data={"end_date": date_error}
+                )
+            end_date = end_date or date.today()
+            last_day = end_date - timedelta(days=1)
+
+            enrollments = (
+                Enrollment.query.join(Schedule, Schedule.id == Enrollment.schedule_id)
+                .join(Participant, Participant.id == Enrollment.participant_id)
+                .filter(
+                    Schedule.external_id == schedule_id,
+                    Participant.external_id == participant_external_id,
+                    or_(Enrollment.end_date.is_(None), Enrollment.end_date >= end_date),
+                )
+                .all()
+            )
+            if not enrollments:
+                return error_response(msg="Inscripción no encontrada", code=404)
+            deleted = 0
+            for enrollment in enrollments:
+                if enrollment.start_date >= end_date:
+                    db.session.delete(enrollment)
+                    deleted += 1
+                else:
+                    enrollment.end_date = last_day
+            db.session.commit()
+            return success_response(
+                msg="Inscripción finalizada",
+                data={
+                    "end_date": end_date.isoformat(),
+                    "last_active_date": last_day.isoformat(),
+                    "deleted": deleted,
+                },
+            )
+        except Exception as e:
+            db.session.rollback()
+            return error_response(msg="Error interno", code=500, data={"error": str(e)})
+
+    def _percentage(self, present, total):
+        # Método interno: porcentaje redondeado a 2 decimales (0 si no hay registros)
+        if not total:
+            return 0
+        return round(((present or 0) / total) * 100, 2)
+
     def _calculate_attendance_percentage(self, participant_id):
         # Método interno: calcula porcentaje de asistencias de un participante
         try:
-            total = Attendance.query.filter_by(participant_id=participant_id).count()
-            if total == 0:
+            row = db.session.get(ParticipantAttendanceCounter, participant_id)
+            if not row:
                 return 0
-            present = Attendance.query.filter_by(
-                participant_id=participant_id, status=Attendance.Status.PRESENT
-            ).count()
-            return round((present / total) * 100, 2)
+            return self._percentage(row.present, row.total)
         except:
             return 0
 
+    def _upsert_attendances(self, rows):
+        # Método interno: INSERT ... ON CONFLICT DO UPDATE sobre (participante, horario, fecha)
+        stmt = dialect_insert(Attendance).values(rows)
+        return stmt.on_conflict_do_update(
+            index_elements=["participant_id", "schedule_id", "date"],
+            set_={"status": stmt.excluded.status, "updated_at": stmt.excluded.updated_at},
+        )
+
+    def check_in(self, data):
+        # Registro individual (kiosco): idempotente y respetando el cupo de la sesión
+        try:
+            data = data or {}
+            errors = {}
+            if not data.get("schedule_external_id"):
+                errors["schedule_external_id"] = "El campo schedule_external_id es requerido"
+            if not data.get("dni") and not data.get("participant_external_id"):
+                errors["participant"] = "Debe enviar dni o participant_external_id"
+            fecha, date_error = parse_attendance_date(data.get("date"))
+            if date_error:
+                errors["date"] = date_error
+            if errors:
+                return error_response(msg="Error de validación", code=400, data=errors)
+            fecha = fecha or date.today()
+
+            participant_query = db.session.query(
+                Participant.id, Participant.external_id, Participant.firstName,
+                Participant.lastName, Participant.status,
+            )
+            if data.get("participant_external_id"):
+                participant_query = participant_query.filter(
+                    Participant.external_id == data["participant_external_id"]
+                )
+            else:
+                participant_query = participant_query.filter(
+                    Participant.dni == str(data["dni"]).strip()
+                )
+            participant = participant_query.first()
+            if not participant:
+                return error_response(msg="Participante no encontrado", code=404)
+            if participant.status == "INACTIVO":
+                return error_response(msg="Participante inactivo", code=403)
+
+            schedule = (
+                db.session.query(Schedule.id, Schedule.maxSlots)
+                .filter(
+                    Schedule.external_id == data["schedule_external_id"],
+                    Schedule.status == "active",
+                )
+                .first()
+            )
+            if not schedule:
+                return error_response(
+                    msg="Horario no encontrado",
+                    code=404,
+                    data={"schedule_external_id": data["schedule_external_id"]},
+                )
+
+            # Desde aquí la sesión queda bloqueada hasta el commit/rollback
+            session_summary = lock_session_summary(schedule.id, fecha)
+            current = (
+                db.session.query(Attendance.id, Attendance.status)
+                .filter_by(participant_id=participant.id, schedule_id=schedule.id, date=fecha)
+                .first()
+            )
+
+            response_data = {
+                "participant_external_id": participant.external_id,
+                "participant_name": f"{participant.firstName} {participant.lastName}",
+                "schedule_external_id": data["schedule_external_id"],
+                "date": fecha.isoformat(),
+                "status": Attendance.Status.PRESENT,
+                "max_slots": schedule.maxSlots,
+            }
+
+            if current and current.status == Attendance.Status.PRESENT:
+                occupied = session_summary.present
+                db.session.commit()
+                return success_response(
+                    msg="Asistencia ya registrada",
+                    data=dict(response_data, already_checked_in=True, occupied=occupied),
+                )
+
+            if not has_capacity(session_summary, schedule.maxSlots, 1):
+                db.session.rollback()
+                return error_response(
+                    msg="La sesión no tiene cupos disponibles",
+                    code=409,
+                    data={"max_slots": schedule.maxSlots, "occupied": session_summary.present},
+                )
+
+            if current:
+                db.session.execute(
+                    Attendance.__table__.update()
+                    .where(Attendance.id == current.id)
+                    .values(status=Attendance.Status.PRESENT)
+                )
+                if current.status == Attendance.Status.ABSENT:
+                    session_summary.absent -= 1
+            else:
+                db.session.execute(
+                    Attendance.__table__.insert().values(
+                        external_id=str(uuid.uuid4()),
+                        participant_id=participant.id,
+                        schedule_id=schedule.id,
+                        date=fecha,
+                        status=Attendance.Status.PRESENT,
+                    )
+                )
+                session_summary.total += 1
+            session_summary.present += 1
+            session_summary.updated_at = datetime.utcnow()
+            occupied = session_summary.present
+            increment_participant_counter(
+                participant.id, total=0 if current else 1, present=1
+            )
+
+            db.session.commit()
+            today_sessions_cache.invalidate(fecha)
+
+            return success_response(
+                msg="Asistencia registrada",
+                data=dict(response_data, already_checked_in=False, occupied=occupied),
+            )
+        except Exception as e:
+            db.session.rollback()
+            return error_response(msg="Error interno", code=500, data={"error": str(e)})
+
     def register_public_attendance(self, data):
         # Endpoint público que utiliza registro masivo
         return self.register_bulk_attendance(data)
@@ -607,48 +1511,356 @@ class AttendanceController:
                     data={"schedule_external_id": data.get("schedule_external_id")},
                 )
 
-            fecha = data.get("date", date.today().isoformat())
-            registros_creados = []
+            fecha, date_error = parse_attendance_date(data.get("date"))
+            if date_error:
+                return error_response(
+                    msg="Error de validación", code=400, data={"date": date_error}
+                )
+            fecha = fecha or date.today()
 
+            # Último estado por participante (la lista puede traer repetidos)
+            marks = {}
+            skipped = 0
             for item in data["attendances"]:
                 if "participant_external_id" not in item or "status" not in item:
+                    skipped += 1
                     continue
+                marks[item["participant_external_id"]] = item["status"]
+
+            # Resolver todos los participantes con una sola consulta IN
+            ids_by_external = {}
+            if marks:
+                ids_by_external = dict(
+                    db.session.query(Participant.external_id, Participant.id)
+                    .filter(Participant.external_id.in_(list(marks)))
+                    .all()
+                )
 
-                participant = Participant.query.filter_by(
-                    external_id=item["participant_external_id"]
-                ).first()
-                if not participant:
+            rows = []
+            registros_creados = []
+            for external_id, status in marks.items():
+                participant_id = ids_by_external.get(external_id)
+                if participant_id is None:
+                    skipped += 1
                     continue
+                rows.append(
+                    {
+                        "external_id": str(uuid.uuid4()),
+                        "participant_id": participant_id,
+                        "schedule_id": schedule.id,
+                        "date": fecha,
+                        "status": status,
+                    }
+                )
+                registros_creados.append(
+                    {"participant_external_id": external_id, "status": status}
+                )
 
-                existing = Attendance.query.filter_by(
-                    participant_id=participant.id, schedule_id=schedule.id, date=fecha
-                ).first()
+            inserted = updated = 0
+            if rows:
+                # Reserva de cupos: bloquea la sesión y lee el estado actual ya serializado
+                session_summary = lock_session_summary(schedule.id, fecha)
+                existing = dict(
+                    db.session.query(Attendance.participant_id, Attendance.status).filter(
+                        Attendance.schedule_id == schedule.id,
+                        Attendance.date == fecha,
+                        Attendance.participant_id.in_([r["participant_id"] for r in rows]),
+                    )
+                )
+                present_delta = sum(
+                    (r["status"] == Attendance.Status.PRESENT)
+                    - (existing.get(r["participant_id"]) == Attendance.Status.PRESENT)
+                    for r in rows
+                )
+                if not has_capacity(session_summary, schedule.maxSlots, present_delta):
+                    occupied = session_summary.present
+                    db.session.rollback()
+                    return error_response(
+                        msg="La sesión no tiene cupos disponibles",
+                        code=409,
+                        data={
+                            "max_slots": schedule.maxSlots,
+                            "occupied": occupied,
+                            "requested": present_delta,
+                        },
+                    )
+                updated = len(existing)
+                inserted = len(rows) - updated
+                db.session.execute(self._upsert_attendances(rows))
+                refresh_session_summary(schedule.id, fecha)
+                apply_participant_counter_changes(
+                    (r["participant_id"], existing.get(r["participant_id"]), r["status"])
+                    for r in rows
+                )
+
+            db.session.commit()
+            today_sessions_cache.invalidate(fecha)
+
+            return success_response(
+                msg=f"Se procesaron {len(registros_creados)} asistencias",
+                data={
+                    "total": len(registros_creados),
+                    "inserted": inserted,
+                    "updated": updated,
+                    "skipped": skipped,
+                    "attendances": registros_creados,
+                },
+            )
+        except Exception as e:
+            db.session.rollback()
+            return error_response(msg="Error interno", code=500, data={"error": str(e)})
 
-                if existing:
-                    existing.status = item["status"]
+    # ---------- Sincronización offline ----------
+
+    SYNC_CURSOR_OVERLAP = timedelta(seconds=5)
+    SYNC_INITIAL_DAYS = 30
+    SYNC_MAX_MARKS = 500
+
+    def get_sync_changes(self, since=None, program=None):
+        # Cambios desde el cursor: filas modificadas (updated_at) y eliminadas (tombstones)
+        try:
+            since_at = None
+            if since:
+                try:
+                    since_at = datetime.fromisoformat(str(since))
+                except ValueError:
+                    return error_response(
+                        msg="Error de validación", code=400, data={"since": "Cursor inválido"}
+                    )
+
+            # El cursor se fija antes de leer y con un margen hacia atrás para no perder
+            # transacciones que confirmaron tarde; el cliente aplica los cambios de forma
+            # idempotente, así que repetir algunas filas no es un problema.
+            next_cursor = datetime.utcnow() - self.SYNC_CURSOR_OVERLAP
+
+            schedules = Schedule.query
+            participants = db.session.query(
+                Participant.external_id,
+                Participant.firstName,
+                Participant.lastName,
+                Participant.dni,
+                Participant.program,
+                Participant.status,
+            )
+            attendances = (
+                db.session.query(
+                    Attendance.external_id,
+                    Attendance.date,
+                    Attendance.status,
+                    Participant.external_id.label("participant_external_id"),
+                    Schedule.external_id.label("schedule_external_id"),
+                )
+                .join(Participant, Attendance.participant_id == Participant.id)
+                .join(Schedule, Attendance.schedule_id == Schedule.id)
+            )
+            if since_at:
+                schedules = schedules.filter(Schedule.updated_at >= since_at)
+                participants = participants.filter(Participant.updated_at >= since_at)
+                attendances = attendances.filter(Attendance.updated_at >= since_at)
+            else:
+                # Primera sincronización: horarios activos y asistencias recientes
+                schedules = schedules.filter(Schedule.status == "active")
+                attendances = attendances.filter(
+                    Attendance.date >= date.today() - timedelta(days=self.SYNC_INITIAL_DAYS)
+                )
+            if program:
+                schedules = schedules.filter(Schedule.program == program)
+                participants = participants.filter(Participant.program == program)
+                attendances = attendances.filter(Schedule.program == program)
+
+            deleted = {"attendances": [], "participants": [], "schedules": []}
+            changed_schedules = []
+            for s in schedules:
+                if s.status == "active":
+                    changed_schedules.append(self._serialize_schedule(s))
                 else:
-                    nuevo = Attendance(
-                        participant_id=participant.id,
-                        schedule_id=schedule.id,
-                        date=fecha,
-                        status=item["status"],
+                    deleted["schedules"].append(s.external_id)
+
+            if since_at:
+                tombstones = db.session.query(
+                    SyncTombstone.entity, SyncTombstone.external_id
+                ).filter(SyncTombstone.deleted_at >= since_at)
+                for entity, external_id in tombstones:
+                    deleted.setdefault(f"{entity}s", []).append(external_id)
+
+            return success_response(
+                msg="Cambios obtenidos correctamente",
+                data={
+                    "next_cursor": next_cursor.isoformat(),
+                    "full": since_at is None,
+                    "schedules": changed_schedules,
+                    "participants": [
+                        {
+                            "external_id": p.external_id,
+                            "first_name": p.firstName,
+                            "last_name": p.lastName,
+                            "dni": p.dni,
+                            "program": p.program,
+                            "status": p.status,
+                        }
+                        for p in participants
+                    ],
+                    "attendances": [
+                        {
+                            "external_id": a.external_id,
+                            "participant_external_id": a.participant_external_id,
+                            "schedule_external_id": a.schedule_external_id,
+                            "date": format_date(a.date),
+                            "status": a.status,
+                        }
+                        for a in attendances
+                    ],
+                    "deleted": deleted,
+                },
+            )
+        except Exception as e:
+            return error_response(msg="Error interno", code=500, data={"error": str(e)})
+
+    def upload_sync_marks(self, data):
+        # Marcas encoladas offline; cada una trae una clave de idempotencia generada
+        # por el cliente, de modo que reintentar el mismo lote no duplica nada.
+        try:
+            marks = (data or {}).get("marks")
+            if not isinstance(marks, list):
+                return error_response(
+                    msg="Error de validación",
+                    code=400,
+                    data={"marks": "El campo marks es requerido y debe ser una lista"},
+                )
+            if len(marks) > self.SYNC_MAX_MARKS:
+                return error_response(
+                    msg="Error de validación",
+                    code=400,
+                    data={"marks": f"Máximo {self.SYNC_MAX_MARKS} marcas por lote"},
+                )
+
+            results, pending = [], {}
+            for item in marks:
+                item = item if isinstance(item, dict) else {}
+                key = str(item.get("idempotency_key") or "").strip()
+                result = {"idempotency_key": key or None}
+                results.append(result)
+
+                fecha, date_error = parse_attendance_date(item.get("date"))
+                if not key or len(key) > 64:
+                    error = "idempotency_key es requerido (máximo 64 caracteres)"
+                elif key in pending:
+                    error = None
+                    result["result"] = "duplicate"
+                elif not item.get("schedule_external_id") or not item.get("participant_external_id"):
+                    error = "schedule_external_id y participant_external_id son requeridos"
+                elif item.get("status") not in (Attendance.Status.PRESENT, Attendance.Status.ABSENT):
+                    error = "status debe ser 'present' o 'absent'"
+                elif date_error or not fecha:
+                    error = date_error or "La fecha es requerida"
+                else:
+                    error = None
+                    pending[key] = (result, item, fecha)
+                if error:
+                    result.update(result="rejected", error=error)
+
+            # Claves ya aplicadas en envíos anteriores
+            if pending:
+                for (key,) in db.session.query(AttendanceSyncReceipt.idempotency_key).filter(
+                    AttendanceSyncReceipt.idempotency_key.in_(list(pending))
+                ):
+                    pending.pop(key)[0]["result"] = "duplicate"
+
+            schedule_ids, participant_ids = {}, {}
+            if pending:
+                schedule_ids = dict(
+                    db.session.query(Schedule.external_id, Schedule.id).filter(
+                        Schedule.external_id.in_(
+                            {item["schedule_external_id"] for _, item, _ in pending.values()}
+                        )
+                    )
+                )
+                participant_ids = dict(
+                    db.session.query(Participant.external_id, Participant.id).filter(
+                        Participant.external_id.in_(
+                            {item["participant_external_id"] for _, item, _ in pending.values()}
+                        )
                     )
-                    db.session.add(nuevo)
+                )
 
-                registros_creados.append(
+            rows, receipts = {}, []
+            for key, (result, item, fecha) in pending.items():
+                schedule_id = schedule_ids.get(item["schedule_external_id"])
+                participant_id = participant_ids.get(item["participant_external_id"])
+                if schedule_id is None or participant_id is None:
+                    result.update(
+                        result="rejected",
+                        error="Horario no encontrado" if schedule_id is None
+                        else "Participante no encontrado",
+                    )
+                    continue
+                # Si el lote trae varias marcas para la misma asistencia, gana la última
+                rows[(participant_id, schedule_id, fecha)] = {
+                    "external_id": str(uuid.uuid4()),
+                    "participant_id": participant_id,
+                    "schedule_id": schedule_id,
+                    "date": fecha,
+                    "status": item["status"],
+                }
+                receipts.append(
                     {
-                        "participant_external_id": item["participant_external_id"],
+                        "idempotency_key": key,
+                        "schedule_id": schedule_id,
+                        "participant_id": participant_id,
+                        "date": fecha,
                         "status": item["status"],
+                        "received_at": datetime.utcnow(),
                     }
                 )
-
+                result["result"] = "applied"
+
+            if rows:
+                # Se bloquean las sesiones en orden fijo para no chocar con otros lotes.
+                # No se aplica el cupo: las marcas offline registran asistencias ya ocurridas.
+                sessions = sorted({(schedule_id, fecha) for _, schedule_id, fecha in rows})
+                for schedule_id, fecha in sessions:
+                    lock_session_summary(schedule_id, fecha)
+                # Estados previos (ya serializados por los bloqueos) para los contadores
+                previous = {}
+                for schedule_id, fecha in sessions:
+                    session_participants = [
+                        participant_id
+                        for participant_id, row_schedule_id, row_fecha in rows
+                        if (row_schedule_id, row_fecha) == (schedule_id, fecha)
+                    ]
+                    for participant_id, status in db.session.query(
+                        Attendance.participant_id, Attendance.status
+                    ).filter(
+                        Attendance.schedule_id == schedule_id,
+                        Attendance.date == fecha,
+                        Attendance.participant_id.in_(session_participants),
+                    ):
+                        previous[(participant_id, schedule_id, fecha)] = status
+                db.session.execute(self._upsert_attendances(list(rows.values())))
+                for schedule_id, fecha in sessions:
+                    refresh_session_summary(schedule_id, fecha)
+                apply_participant_counter_changes(
+                    (key[0], previous.get(key), row["status"]) for key, row in rows.items()
+                )
+                db.session.execute(
+                    dialect_insert(AttendanceSyncReceipt)
+                    .values(receipts)
+                    .on_conflict_do_nothing(index_elements=["idempotency_key"])
+                )
             db.session.commit()
+            for fecha in {fecha for _, _, fecha in rows}:
+                today_sessions_cache.invalidate(fecha)
 
+            counts = {"applied": 0, "duplicate": 0, "rejected": 0}
+            for result in results:
+                counts[result["result"]] += 1
             return success_response(
-                msg=f"Se procesaron {len(registros_creados)} asistencias",
+                msg=f"Se aplicaron {counts['applied']} marcas",
                 data={
-                    "total": len(registros_creados),
-                    "attendances": registros_creados,
+                    "applied": counts["applied"],
+                    "duplicates": counts["duplicate"],
+                    "rejected": counts["rejected"],
+                    "results": results,
                 },
             )
         except Exception as e:
@@ -1,12 +1,20 @@
 from app.models.participant import Participant
 from app.models.responsible import Responsible
 from app.models.user import User
+from app.services.java_outbox_service import java_outbox
 from app.services.java_sync_service import java_sync
+from app.services.participant_search_service import participant_search
 from app.utils.constants.message import ERROR_VALIDATION, INVALID_DATA, REQUIRED_FIELD
 from app.utils.responses import error_response, success_response
 from flask import request
 from app import db
+from sqlalchemy import literal, select, union_all
 from werkzeug.security import generate_password_hash
+from datetime import datetime
+import base64
+import csv
+import io
+import re
 import uuid
 
 from app.utils.validations.user_validation import (
@@ -19,6 +27,12 @@ from app.utils.validations.user_validation import (
     validate_required_fields,
 )
 
+# Patrones de validación de participantes (compilados una sola vez)
+EMAIL_RE = re.compile(r"^[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+$")
+NAME_RE = re.compile(r"^[a-zA-ZáéíóúÁÉÍÓÚñÑüÜ]+$")
+RESPONSIBLE_NAME_RE = re.compile(r"^[a-zA-ZáéíóúÁÉÍÓÚñÑüÜ ]+$")
+DANGEROUS_ADDRESS_RE = re.compile(r'[<>"\';{}]')
+
 
 class UserController:
     def _get_token(self):
@@ -67,26 +81,85 @@ class UserController:
 
         return is_ascending or is_descending
 
-    def get_users(self):
+    # Campos disponibles en el listado (nombre en la respuesta -> columna)
+    USER_LIST_FIELDS = {
+        "external_id": Participant.external_id,
+        "firstName": Participant.firstName,
+        "lastName": Participant.lastName,
+        "email": Participant.email,
+        "dni": Participant.dni,
+        "age": Participant.age,
+        "status": Participant.status,
+        "type": Participant.type,
+        "java_external": Participant.java_external,
+        "program": Participant.program,
+        "phone": Participant.phone,
+    }
+    USER_LIST_DEFAULT_FIELDS = (
+        "external_id", "firstName", "lastName", "email", "dni",
+        "age", "status", "type", "java_external",
+    )
+    USER_LIST_MAX_LIMIT = 500
+
+    def get_users(
+        self, status=None, program=None, participant_type=None, fields=None,
+        limit=None, cursor=None,
+    ):
+        """
+        Lista participantes leyendo solo las columnas pedidas (filas Core, sin
+        hidratar objetos del ORM). Sin limit/cursor responde la lista completa;
+        con limit/cursor responde {items, next_cursor, limit} ordenado por id.
+        """
         try:
-            participants = Participant.query.all()
-
-            data = [
-                {
-                    "external_id": p.external_id,
-                    "firstName": p.firstName,
-                    "lastName": p.lastName,
-                    "email": p.email,
-                    "dni": p.dni,
-                    "age": p.age,
-                    "status": p.status,
-                    "type": p.type,
-                    "java_external": p.java_external,
-                }
-                for p in participants
-            ]
+            names = (
+                [f.strip() for f in fields.split(",") if f.strip()]
+                if fields else list(self.USER_LIST_DEFAULT_FIELDS)
+            )
+            unknown = [name for name in names if name not in self.USER_LIST_FIELDS]
+            if unknown or not names:
+                return error_response(
+                    "Campos no válidos",
+                    code=400,
+                    data={"fields": unknown, "allowed": list(self.USER_LIST_FIELDS)},
+                )
 
-            return success_response(msg="Usuarios listados correctamente", data=data)
+            query = select(
+                Participant.id, *[self.USER_LIST_FIELDS[name].label(name) for name in names]
+            ).order_by(Participant.id)
+            if status:
+                query = query.where(Participant.status == status)
+            if program:
+                query = query.where(Participant.program == program)
+            if participant_type:
+                query = query.where(Participant.type == participant_type)
+
+            paginated = limit is not None or cursor is not None
+            if paginated:
+                try:
+                    limit = min(max(int(limit or 50), 1), self.USER_LIST_MAX_LIMIT)
+                    after_id = int(base64.urlsafe_b64decode(cursor).decode()) if cursor else None
+                except (TypeError, ValueError):
+                    return error_response("Parámetros de paginación inválidos", code=400)
+                if after_id is not None:
+                    query = query.where(Participant.id > after_id)
+                query = query.limit(limit + 1)
+
+            rows = db.session.execute(query).all()
+            data = [{name: row._mapping[name] for name in names} for row in rows]
+
+            if not paginated:
+                return success_response(msg="Usuarios listados correctamente", data=data)
+
+            next_cursor = None
+            if len(rows) > limit:
+                data = data[:limit]
+                next_cursor = base64.urlsafe_b64encode(
+                    str(rows[limit - 1].id).encode()
+                ).decode()
+            return success_response(
+                msg="Usuarios listados correctamente",
+                data={"items": data, "next_cursor": next_cursor, "limit": limit},
+            )
         except Exception:
             return error_response("Error interno del servidor", code=500)
 
@@ -236,8 +309,6 @@ class UserController:
 
     def change_status(self, external_id, new_state):
         """RF010: Cambiar estado (Activar/Inactivar) y sincroniza con Java."""
-        token = self._get_token()
-
         try:
             # Validar que el estado sea válido
             if new_state not in ["ACTIVO", "INACTIVO"]:
@@ -252,24 +323,21 @@ class UserController:
                     msg="Participant not found",
                 )
 
+            changed = participant.status != new_state
             participant.status = new_state
-            db.session.commit()
 
-            java_external = participant.java_external
-            if token and java_external:
-                java_result = java_sync.change_state(java_external, token)
-                if java_result and java_result.get("success"):
-                    print(
-                        f"[UserServiceDB] Estado sincronizado con Java para {java_external}"
-                    )
-                else:
-                    print(
-                        f"[UserServiceDB] No se pudo sincronizar estado con Java: {java_result}"
-                    )
+            # La sincronización con Java se encola en la misma transacción
+            # (el worker usa la cuenta de servicio, no el token de esta petición)
+            outbox_id = None
+            if changed and participant.java_external:
+                outbox_id = java_outbox.enqueue_state_change(participant)
+            external_id = participant.external_id
+            db.session.commit()
+            java_outbox.notify()
 
             return success_response(
                 msg=f"Status updated to {new_state}",
-                data={"external_id": participant.external_id},
+                data={"external_id": external_id, "java_sync_id": outbox_id},
             )
 
         except Exception:
@@ -315,7 +383,7 @@ class UserController:
 
             is_minor = age < 18
 
-            validation_result = self._validate_participant(
+            validation_result, existing = self._validate_participant(
                 participant_data, responsible_data, is_minor
             )
             if validation_result:
@@ -332,60 +400,260 @@ class UserController:
 
             # Si el DNI pertenece a un User (docente/pasante), vincular participante a ese usuario
             dni_str = str(participant_data.get("dni", "")).strip()
-            existing_user = User.query.filter_by(dni=dni_str).first()
-            user_id = existing_user.id if existing_user else None
+            user_id = existing.get(("user_dni", dni_str))
 
+            # Participante y responsable en una sola transacción (un flush, un commit)
             participant = self._build_participant(
                 participant_data, is_minor, program, user_id=user_id
             )
             db.session.add(participant)
+
+            # 5. Responsable (solo iniciación/menores)
+            responsible = None
+            if is_minor:
+                responsible = self._create_responsible(responsible_data, participant)
+
+            # Se leen los ids antes del commit para no recargar las filas después
+            db.session.flush()
+            created = {
+                "participant_external_id": participant.external_id,
+                "responsible_external_id": (
+                    responsible.external_id if responsible else None
+                ),
+            }
             db.session.commit()
 
-            p_fresh = Participant.query.filter_by(
-                external_id=participant.external_id
-            ).first()
+            # try:
+            #     self._sync_with_java(participant, participant_data, token, is_minor)
+            # except Exception as e:
+            #     print(f"[Warning] Error sincronizando con Java: {e}")
 
-            try:
-                # 5. Responsable (solo iniciación/menores)
-                responsible = None
-                if is_minor and p_fresh:
-                    responsible = self._create_responsible(responsible_data, p_fresh.id)
+            return success_response(
+                msg="Participante registrado correctamente", data=created
+            )
 
-                if responsible:
-                    db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            return error_response("Error interno del servidor", code=500)
 
-                # try:
-                #     self._sync_with_java(participant, participant_data, token, is_minor)
-                # except Exception as e:
-                #     print(f"[Warning] Error sincronizando con Java: {e}")
+    IMPORT_MAX_ROWS = 2000
+    IMPORT_BATCH_SIZE = 500
+    IMPORT_CSV_FIELDS = (
+        "firstName", "lastName", "dni", "age", "phone", "email", "address",
+        "type", "program", "responsibleName", "responsibleDni", "responsiblePhone",
+    )
 
-                return success_response(
-                    msg="Participante registrado correctamente",
-                    data={
-                        "participant_external_id": participant.external_id,
-                        "responsible_external_id": (
-                            responsible.external_id if responsible else None
-                        ),
-                    },
+    def import_participants(self, rows=None, csv_text=None, dry_run=False):
+        """
+        Importación masiva de participantes (JSON o CSV).
+        Valida todas las filas en una pasada: formato, duplicados dentro del lote y
+        una sola consulta de duplicados en la base. Inserta las filas válidas (con
+        sus responsables) por lotes en una sola transacción. Con dry_run solo valida.
+        """
+        try:
+            if csv_text is not None:
+                rows = self._rows_from_csv(csv_text)
+            if not isinstance(rows, list) or not rows:
+                return error_response("No se recibieron participantes para importar", code=400)
+            if len(rows) > self.IMPORT_MAX_ROWS:
+                return error_response(
+                    f"Máximo {self.IMPORT_MAX_ROWS} participantes por importación", code=400
                 )
 
-            except Exception as e:
-                db.session.delete(p_fresh)
-                db.session.commit()
-                return error_response(f"Error creando responsable: {str(e)}", 500)
+            # 1. Formato de todas las filas (sin consultar la base)
+            checked = []
+            for data in rows:
+                participant, responsible = self._split_import_row(data)
+                is_minor = isinstance(participant.get("age"), int) and participant["age"] < 18
+                errors, identity = self._participant_format_errors(
+                    participant, responsible, is_minor
+                )
+                checked.append((participant, responsible, is_minor, errors, identity))
+
+            # 2. Duplicados contra la base: una sola consulta para todo el lote
+            existing = self._identity_probe(
+                dnis=[i["dni"] for *_, i in checked] + [i["responsible_dni"] for *_, i in checked],
+                emails=[i["email"] for *_, i in checked],
+            )
+
+            # 3. Duplicados dentro del lote (la primera aparición es la válida)
+            responsible_dnis = {i["responsible_dni"] for *_, i in checked if i["responsible_dni"]}
+            seen_dnis, seen_emails = {}, {}
+            valid, report = [], []
+            for position, (participant, responsible, is_minor, errors, identity) in enumerate(
+                checked, start=1
+            ):
+                errors.update(self._duplicate_errors(identity, existing))
+                dni, email = identity["dni"], identity["email"]
+                if dni and "dni" not in errors:
+                    if dni in seen_dnis:
+                        errors["dni"] = f"DNI repetido en la fila {seen_dnis[dni]}"
+                    elif dni in responsible_dnis:
+                        errors["dni"] = "El DNI figura como responsable en este lote"
+                    else:
+                        seen_dnis[dni] = position
+                if email and "email" not in errors:
+                    if email in seen_emails:
+                        errors["email"] = f"Correo repetido en la fila {seen_emails[email]}"
+                    else:
+                        seen_emails[email] = position
+                responsible_dni = identity["responsible_dni"]
+                if responsible_dni and "responsibleDni" not in errors and responsible_dni in seen_dnis:
+                    errors["responsibleDni"] = "El DNI figura como participante en este lote"
+
+                if errors:
+                    report.append({"row": position, "dni": participant.get("dni"), "errors": errors})
+                else:
+                    user_id = existing.get(("user_dni", dni))
+                    valid.append((participant, responsible if is_minor else None, user_id))
 
+            created = 0
+            if valid and not dry_run:
+                created = self._insert_participant_batch(valid)
+
+            return success_response(
+                msg=(
+                    "Validación de importación completada" if dry_run
+                    else "Importación de participantes completada"
+                ),
+                data={
+                    "dry_run": dry_run,
+                    "total": len(rows),
+                    "valid": len(valid),
+                    "invalid": len(report),
+                    "created": created,
+                    "errors": report,
+                },
+            )
+
+        except csv.Error:
+            return error_response("Archivo CSV inválido", code=400)
         except Exception as e:
             db.session.rollback()
             return error_response("Error interno del servidor", code=500)
 
+    def _rows_from_csv(self, text):
+        """Convierte el CSV (con encabezado) en filas con las mismas claves del JSON."""
+        reader = csv.DictReader(io.StringIO(text.lstrip("\ufeff")))
+        return [
+            {key.strip(): (value or "").strip() for key, value in row.items() if key}
+            for row in reader
+        ]
+
+    def _split_import_row(self, data):
+        """
+        Normaliza una fila de importación a (participante, responsable).
+        Acepta el formato de /save-participants ({participant, responsible}) o una
+        fila plana con responsibleName/responsibleDni/responsiblePhone.
+        """
+        if not isinstance(data, dict):
+            return {}, None
+        if isinstance(data.get("participant"), dict):
+            participant = dict(data["participant"])
+            responsible = data.get("responsible")
+        else:
+            participant = {k: v for k, v in data.items() if not k.startswith("responsible")}
+            responsible = data.get("responsible")
+            if not isinstance(responsible, dict) and any(
+                data.get(k) for k in ("responsibleName", "responsibleDni", "responsiblePhone")
+            ):
+                responsible = {
+                    "name": data.get("responsibleName"),
+                    "dni": data.get("responsibleDni"),
+                    "phone": data.get("responsiblePhone"),
+                }
+        # En CSV todo llega como texto; los campos vacíos equivalen a ausentes
+        participant = {k: v for k, v in participant.items() if v not in ("", None)}
+        if isinstance(participant.get("age"), str) and participant["age"].strip().isdigit():
+            participant["age"] = int(participant["age"])
+        return participant, responsible if isinstance(responsible, dict) else None
+
+    def _insert_participant_batch(self, valid):
+        """
+        Inserta participantes y responsables por lotes (executemany) en una sola
+        transacción. Retorna la cantidad de participantes creados.
+        """
+        participant_table = Participant.__table__
+        responsible_table = Responsible.__table__
+        now = datetime.utcnow()
+        for start in range(0, len(valid), self.IMPORT_BATCH_SIZE):
+            batch = valid[start:start + self.IMPORT_BATCH_SIZE]
+            participant_rows, responsibles = [], {}
+            for data, responsible, user_id in batch:
+                external_id = str(uuid.uuid4())
+                participant_rows.append({
+                    "external_id": external_id,
+                    "firstName": data.get("firstName"),
+                    "lastName": data.get("lastName"),
+                    "age": data.get("age"),
+                    "dni": str(data.get("dni")).strip(),
+                    "phone": data.get("phone"),
+                    "email": data.get("email") or None,
+                    "address": data.get("address"),
+                    "status": "ACTIVO",
+                    "type": data.get("type", "EXTERNO"),
+                    "program": data.get("program"),
+                    "user_id": user_id,
+                    "updated_at": now,
+                })
+                if responsible:
+                    responsibles[external_id] = responsible
+            db.session.execute(participant_table.insert(), participant_rows)
+
+            if responsibles:
+                # Ids generados, en una consulta por lote
+                ids = dict(
+                    db.session.execute(
+                        select(Participant.external_id, Participant.id).where(
+                            Participant.external_id.in_(list(responsibles))
+                        )
+                    ).all()
+                )
+                db.session.execute(
+                    responsible_table.insert(),
+                    [
+                        {
+                            "external_id": str(uuid.uuid4()),
+                            "name": responsible.get("name"),
+                            "dni": str(responsible.get("dni")).strip(),
+                            "phone": responsible.get("phone"),
+                            "participant_id": ids[external_id],
+                        }
+                        for external_id, responsible in responsibles.items()
+                    ],
+                )
+        # El trie de búsqueda se invalida solo (participant_search escucha los INSERT de Core)
+        db.session.commit()
+        return len(valid)
+
     def _validate_participant(self, participant, responsible, is_minor):
         """
         Valida los datos del participante y del responsable.
-        Retorna un error_response si hay errores, o None si todo es válido.
+        Retorna (error_response o None, coincidencias de _identity_probe).
         """
-        import re
+        errors, identity = self._participant_format_errors(participant, responsible, is_minor)
+
+        # Duplicados en una sola consulta, solo si el formato es válido
+        existing = {}
+        if not errors:
+            existing = self._identity_probe(
+                dnis=[identity["dni"], identity["responsible_dni"]], emails=[identity["email"]]
+            )
+            errors.update(self._duplicate_errors(identity, existing))
 
+        if errors:
+            return error_response("Errores de validación", data=errors), existing
+
+        return None, existing
+
+    def _participant_format_errors(self, participant, responsible, is_minor):
+        """
+        Validaciones de formato y reglas (sin consultar la base).
+        Retorna (errores, identidad) donde identidad tiene el DNI, correo y DNI del
+        responsable con formato válido, para verificar duplicados después.
+        """
         errors = {}
+        probe_dni = probe_email = probe_responsible_dni = None
         friendly_names = {
             "firstName": "Nombre",
             "lastName": "Apellido",
@@ -430,13 +698,7 @@ class UserController:
             elif self._is_sequential(dni_str):
                 errors["dni"] = "DNI no puede ser un número secuencial"
             else:
-                # Permitir mismo DNI que un User (docente/pasante): esa persona puede ser también participante
-                if (
-                    Participant.query.filter_by(dni=dni_str).first()
-                    or Responsible.query.filter_by(dni=dni_str).first()
-                ):
-                    errors["dni"] = "El DNI ya está registrado"
-                # Si existe solo en User, no rechazar; en create_participant se vinculará con user_id
+                probe_dni = dni_str
 
         # ========== VALIDACIÓN DE TELÉFONO ==========
         phone = participant.get("phone")
@@ -459,13 +721,12 @@ class UserController:
         email = participant.get("email")
         if email:
             email_str = str(email).strip()
-            email_pattern = r"^[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+$"
-            if not re.match(email_pattern, email_str):
+            if not EMAIL_RE.match(email_str):
                 errors["email"] = "Formato de correo electrónico inválido"
             elif len(email_str) > 100:
                 errors["email"] = "Email no puede tener más de 100 caracteres"
-            elif Participant.query.filter_by(email=email).first():
-                errors["email"] = "El correo ya está registrado"
+            else:
+                probe_email = email
 
         # ========== VALIDACIÓN DE EDAD (1-80 años) ==========
         age = participant.get("age")
@@ -504,12 +765,11 @@ class UserController:
         if firstName:
             firstName_str = str(firstName).strip()
             # Solo letras y acentos permitidos (sin espacios)
-            name_pattern = r"^[a-zA-ZáéíóúÁÉÍÓÚñÑüÜ]+$"
             if len(firstName_str) < 2:
                 errors["firstName"] = "Nombre debe tener al menos 2 caracteres"
             elif len(firstName_str) > 50:
                 errors["firstName"] = "Nombre no puede tener más de 50 caracteres"
-            elif not re.match(name_pattern, firstName_str):
+            elif not NAME_RE.match(firstName_str):
                 errors["firstName"] = (
                     "Nombre solo puede contener letras (sin espacios) y no puede contener caracteres no permitidos"
                 )
@@ -517,12 +777,11 @@ class UserController:
         lastName = participant.get("lastName")
         if lastName:
             lastName_str = str(lastName).strip()
-            name_pattern = r"^[a-zA-ZáéíóúÁÉÍÓÚñÑüÜ]+$"
             if len(lastName_str) < 2:
                 errors["lastName"] = "Apellido debe tener al menos 2 caracteres"
             elif len(lastName_str) > 50:
                 errors["lastName"] = "Apellido no puede tener más de 50 caracteres"
-            elif not re.match(name_pattern, lastName_str):
+            elif not NAME_RE.match(lastName_str):
                 errors["lastName"] = (
                     "Apellido solo puede contener letras (sin espacios) y no puede contener caracteres no permitidos"
                 )
@@ -534,8 +793,7 @@ class UserController:
             if len(address_str) > 200:
                 errors["address"] = "Dirección no puede tener más de 200 caracteres"
             # No caracteres peligrosos para SQL injection o XSS
-            dangerous_pattern = r'[<>"\';{}]'
-            if re.search(dangerous_pattern, address_str):
+            if DANGEROUS_ADDRESS_RE.search(address_str):
                 errors["address"] = "Dirección contiene caracteres no permitidos"
 
         # ========== VALIDACIÓN DE TYPE ==========
@@ -570,12 +828,11 @@ class UserController:
                 # Validar nombre del responsable
                 resp_name = responsible.get("name")
                 if resp_name:
-                    name_pattern = r"^[a-zA-ZáéíóúÁÉÍÓÚñÑüÜ ]+$"
                     if len(resp_name.strip()) < 2:
                         errors["responsibleName"] = (
                             "Nombre debe tener al menos 2 caracteres"
                         )
-                    elif not re.match(name_pattern, resp_name.strip()):
+                    elif not RESPONSIBLE_NAME_RE.match(resp_name.strip()):
                         errors["responsibleName"] = "Nombre solo puede contener letras"
 
                 # Validar DNI del responsable
@@ -595,8 +852,7 @@ class UserController:
                             "DNI no puede ser un número secuencial"
                         )
                     else:
-                        if Participant.query.filter_by(dni=dni_str).first():
-                            errors["responsibleDni"] = "El DNI ya está registrado"
+                        probe_responsible_dni = dni_str
 
                 # Validar teléfono del responsable
                 responsible_phone = responsible.get("phone")
@@ -627,10 +883,61 @@ class UserController:
                             "El DNI del responsable no puede ser igual al del participante"
                         )
 
-        if errors:
-            return error_response("Errores de validación", data=errors)
+        identity = {
+            "dni": probe_dni,
+            "email": probe_email,
+            "responsible_dni": probe_responsible_dni,
+        }
+        return errors, identity
 
-        return None
+    def _duplicate_errors(self, identity, existing):
+        """Errores de duplicado para una identidad según el resultado de _identity_probe."""
+        errors = {}
+        # Permitir mismo DNI que un User (docente/pasante): esa persona puede ser también
+        # participante; al crearlo se vincula con user_id
+        dni = identity.get("dni")
+        if dni and (
+            ("participant_dni", dni) in existing or ("responsible_dni", dni) in existing
+        ):
+            errors["dni"] = "El DNI ya está registrado"
+        email = identity.get("email")
+        if email and ("participant_email", email) in existing:
+            errors["email"] = "El correo ya está registrado"
+        responsible_dni = identity.get("responsible_dni")
+        if responsible_dni and ("participant_dni", responsible_dni) in existing:
+            errors["responsibleDni"] = "El DNI ya está registrado"
+        return errors
+
+    def _identity_probe(self, dnis=(), emails=()):
+        """
+        Busca en una sola consulta (UNION ALL) los DNI y correos ya usados por
+        participantes, responsables y usuarios. Retorna {(tipo, valor): id}.
+        """
+        dnis = sorted({str(d) for d in dnis if d})
+        emails = sorted({str(e) for e in emails if e})
+        probes = []
+        if dnis:
+            probes += [
+                select(literal("participant_dni"), Participant.dni, Participant.id).where(
+                    Participant.dni.in_(dnis)
+                ),
+                select(literal("responsible_dni"), Responsible.dni, Responsible.id).where(
+                    Responsible.dni.in_(dnis)
+                ),
+                select(literal("user_dni"), User.dni, User.id).where(User.dni.in_(dnis)),
+            ]
+        if emails:
+            probes.append(
+                select(literal("participant_email"), Participant.email, Participant.id).where(
+                    Participant.email.in_(emails)
+                )
+            )
+        if not probes:
+            return {}
+        return {
+            (kind, value): row_id
+            for kind, value, row_id in db.session.execute(union_all(*probes))
+        }
 
     def _build_participant(self, data, is_minor, program=None, user_id=None):
         """
@@ -651,15 +958,16 @@ class UserController:
             user_id=user_id,
         )
 
-    def _create_responsible(self, data, participant_id):
+    def _create_responsible(self, data, participant):
         """
-        Crea una instancia de Responsible vinculada al participante por su ID.
+        Crea una instancia de Responsible vinculada al participante; ambos se
+        insertan en el mismo flush.
         """
         responsible = Responsible(
             name=data.get("name"),
             dni=data.get("dni"),
             phone=data.get("phone"),
-            participant_id=participant_id,
+            participant=participant,
         )
         db.session.add(responsible)
         return responsible
@@ -757,13 +1065,11 @@ class UserController:
 
     def update_profile(self, external_id, data, token_auth):
         """
-        Actualiza el perfil de un usuario y sincroniza con Java.
+        Actualiza el perfil de un usuario y encola su sincronización con Java.
         external_id: ID del usuario logueado (de la BD local)
         data: JSON con { firstName, lastName, phone, address, ... }
-        token_auth: No se usa - se obtiene token fresco de Java
+        token_auth: No se usa - el worker obtiene un token fresco de Java
         """
-        import requests
-
         try:
             # Validar si es cuenta admin/mock - no se puede modificar
             if external_id == "usuario-mock-bypass":
@@ -773,15 +1079,10 @@ class UserController:
                     403,
                 )
 
-            print(f"[UserService] Buscando usuario con external_id: {external_id}")
-
             user = User.query.filter_by(external_id=external_id).first()
             if not user:
-                print(f"[UserService] Usuario no encontrado")
                 return error_response("Usuario no encontrado", 404)
 
-            print(f"[UserService] Usuario encontrado: {user.firstName} {user.lastName}")
-
             if "firstName" in data:
                 user.firstName = data["firstName"]
             if "lastName" in data:
@@ -791,86 +1092,9 @@ class UserController:
             if "address" in data:
                 user.address = data["address"]
 
-            db.session.commit()
-            print(f"[UserService] Datos actualizados en BD local")
-
-            java_synced = False
-            java_error_msg = None
-
-            try:
-                print(
-                    f"[UserService] Haciendo login a Java para obtener external y token frescos..."
-                )
-
-                java_login_resp = requests.post(
-                    "http://localhost:8096/api/person/login",
-                    json={
-                        "email": user.email,
-                        "password": data.get("password", "12345678"),
-                    },
-                    timeout=5,
-                )
-
-                print(
-                    f"[UserService] Java login response: {java_login_resp.status_code}"
-                )
-
-                if java_login_resp.status_code == 200:
-                    java_data = java_login_resp.json().get("data", {})
-                    java_external = java_data.get("external")
-                    java_token = java_data.get("token")
-
-                    print(f"[UserService] Java external FRESCO: {java_external}")
-                    print(
-                        f"[UserService] Java token FRESCO: {java_token[:30] if java_token else 'None'}..."
-                    )
-
-                    if java_external and java_token:
-                        rol_java = "EXTERNOS"
-                        if user.role == "ESTUDIANTE":
-                            rol_java = "ESTUDIANTES"
-                        elif user.role == "DOCENTE":
-                            rol_java = "DOCENTES"
-                        elif user.role == "ADMINISTRATIVO":
-                            rol_java = "ADMINISTRATIVOS"
-
-                        payload_java = {
-                            "first_name": user.firstName,
-                            "last_name": user.lastName,
-                            "external": java_external,
-                            "type_identification": "CEDULA",
-                            "type_stament": rol_java,
-                            "direction": (
-                                user.address if user.address else "Sin dirección"
-                            ),
-                            "phono": user.phone if user.phone else "0000000000",
-                        }
-
-                        print(f"[UserService] Payload para Java: {payload_java}")
-
-                        java_resp = java_sync.update_person_in_java(
-                            payload_java, java_token
-                        )
-
-                        if java_resp and java_resp.get("status") == "success":
-                            java_synced = True
-                            print(f"[UserService] Sincronizado con Java exitosamente")
-                        else:
-                            java_error_msg = (
-                                java_resp.get("message")
-                                if java_resp
-                                else "Sin respuesta"
-                            )
-                            print(f"[UserService] Java update falló: {java_error_msg}")
-                    else:
-                        java_error_msg = "No se obtuvo external/token de Java"
-                else:
-                    java_error_msg = f"Login Java falló: {java_login_resp.status_code}"
-                    print(f"[UserService] {java_error_msg}")
-
-            except requests.exceptions.RequestException as e:
-                java_error_msg = f"Error conexión Java: {str(e)}"
-                print(f"[UserService] {java_error_msg}")
+            # Cambio local y fila del outbox en la misma transacción; Java se
+            # actualiza en segundo plano (ver java_outbox_service)
+            outbox_id = java_outbox.enqueue_profile_update(user)
 
             response_data = {
                 "external_id": user.external_id,
@@ -882,18 +1106,16 @@ class UserController:
                 "address": user.address,
                 "role": user.role,
                 "status": user.status,
-                "java_synced": java_synced,
+                "java_synced": False,
+                "java_sync_id": outbox_id,
             }
+            db.session.commit()
+            java_outbox.notify()
 
-            if java_synced:
-                return success_response(
-                    msg="Perfil actualizado correctamente", data=response_data
-                )
-            else:
-                return success_response(
-                    msg=f"Perfil actualizado localmente. Java: {java_error_msg}",
-                    data=response_data,
-                )
+            return success_response(
+                msg="Perfil actualizado correctamente. La sincronización con Java está en cola",
+                data=response_data,
+            )
 
         except Exception as e:
             db.session.rollback()
@@ -921,6 +1143,24 @@ class UserController:
         except Exception as e:
             return error_response("Error interno del servidor", code=500)
 
+    def search_participants(self, q, limit=10):
+        """Autocompletado de participantes por DNI o nombre, ordenado por relevancia."""
+        if not q or not str(q).strip():
+            return error_response("Parámetro q requerido", code=400)
+
+        try:
+            limit = min(max(int(limit or 10), 1), 50)
+        except (TypeError, ValueError):
+            return error_response("El límite debe ser numérico", code=400)
+
+        try:
+            return success_response(
+                msg="Participantes encontrados",
+                data=participant_search.search(q, limit=limit),
+            )
+        except Exception:
+            return error_response("Error interno del servidor", code=500)
+
     def get_participant_by_id(self, external_id):
         """
         Obtiene un participante por su external_id con su responsable (si tiene).
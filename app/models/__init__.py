@@ -12,6 +12,14 @@ from .test import Test
 from .testExercise import TestExercise
 from .user import User
 from.activityLog import ActivityLog
+from .attendanceDailySummary import AttendanceDailySummary
+from .participantAttendanceCounter import ParticipantAttendanceCounter
+from .syncTombstone import SyncTombstone
+from .attendanceSyncReceipt import AttendanceSyncReceipt
+from .participantAttendanceRisk import ParticipantAttendanceRisk
+from .enrollment import Enrollment
+from .javaSyncOutbox import JavaSyncOutbox
+from .javaPersonSnapshot import JavaPersonSnapshot
 
 __all__ = [
     "Attendance",
@@ -27,5 +35,13 @@ __all__ = [
     "Test",
     "TestExercise",
     "User",
-    "ActivityLog"
+    "ActivityLog",
+    "AttendanceDailySummary",
+    "ParticipantAttendanceCounter",
+    "SyncTombstone",
+    "AttendanceSyncReceipt",
+    "ParticipantAttendanceRisk",
+    "Enrollment",
+    "JavaSyncOutbox",
+    "JavaPersonSnapshot",
 ]
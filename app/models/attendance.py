@@ -1,19 +1,32 @@
+from datetime import datetime
 from app import db
 import uuid
 
 class Attendance(db.Model):
     __tablename__ = "attendance"
+    __table_args__ = (
+        db.UniqueConstraint(
+            "participant_id", "schedule_id", "date", name="uq_attendance_participant_schedule_date"
+        ),
+        db.Index("ix_attendance_schedule_date", "schedule_id", "date"),
+        db.Index("ix_attendance_participant_date", "participant_id", "date"),
+        db.Index("ix_attendance_participant_status", "participant_id", "status"),
+        db.Index("ix_attendance_updated_at", "updated_at"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     external_id = db.Column(
         db.String(36), default=lambda: str(uuid.uuid4()), unique=True, nullable=False
     )
-    date = db.Column(db.String(50), nullable=False)
+    date = db.Column(db.Date, nullable=False)
     status = db.Column(db.String(20), nullable=False)
     participant_id = db.Column(
         db.Integer, db.ForeignKey("participant.id"), nullable=False
     )
     schedule_id = db.Column(db.Integer, db.ForeignKey("schedule.id"), nullable=False)
+    updated_at = db.Column(
+        db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False
+    )
 
     participant = db.relationship("Participant", backref=db.backref("attendances", lazy=True))
     schedule = db.relationship("Schedule", backref=db.backref("attendances", lazy=True))
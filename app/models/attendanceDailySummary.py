@@ -0,0 +1,19 @@
+from datetime import datetime
+from app import db
+
+
+class AttendanceDailySummary(db.Model):
+    """Totales de asistencia por sesión (horario + fecha), derivados de `attendance`."""
+
+    __tablename__ = "attendance_daily_summary"
+    __table_args__ = (db.Index("ix_attendance_daily_summary_date", "date"),)
+
+    schedule_id = db.Column(db.Integer, db.ForeignKey("schedule.id"), primary_key=True)
+    date = db.Column(db.Date, primary_key=True)
+    present = db.Column(db.Integer, nullable=False, default=0)
+    absent = db.Column(db.Integer, nullable=False, default=0)
+    total = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f"<AttendanceDailySummary {self.schedule_id} {self.date}>"
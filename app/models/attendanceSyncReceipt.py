@@ -0,0 +1,19 @@
+from datetime import datetime
+from app import db
+
+
+class AttendanceSyncReceipt(db.Model):
+    """Claves de idempotencia de las marcas subidas desde clientes offline ya aplicadas."""
+
+    __tablename__ = "attendance_sync_receipt"
+    __table_args__ = (db.Index("ix_attendance_sync_receipt_received_at", "received_at"),)
+
+    idempotency_key = db.Column(db.String(64), primary_key=True)
+    schedule_id = db.Column(db.Integer, db.ForeignKey("schedule.id"), nullable=False)
+    participant_id = db.Column(db.Integer, db.ForeignKey("participant.id"), nullable=False)
+    date = db.Column(db.Date, nullable=False)
+    status = db.Column(db.String(20), nullable=False)
+    received_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f"<AttendanceSyncReceipt {self.idempotency_key}>"
@@ -0,0 +1,33 @@
+from datetime import datetime
+from app import db
+import uuid
+
+
+class Enrollment(db.Model):
+    """Inscripción de un participante en un horario durante un rango de fechas."""
+
+    __tablename__ = "enrollment"
+    __table_args__ = (
+        db.UniqueConstraint(
+            "participant_id", "schedule_id", "start_date", name="uq_enrollment_participant_schedule_start"
+        ),
+        db.Index("ix_enrollment_schedule_dates", "schedule_id", "start_date", "end_date"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    external_id = db.Column(
+        db.String(36), default=lambda: str(uuid.uuid4()), unique=True, nullable=False
+    )
+    participant_id = db.Column(db.Integer, db.ForeignKey("participant.id"), nullable=False)
+    schedule_id = db.Column(db.Integer, db.ForeignKey("schedule.id"), nullable=False)
+    start_date = db.Column(db.Date, nullable=False)
+    end_date = db.Column(db.Date, nullable=True)  # Último día vigente (incluido); None = sin fin
+    updated_at = db.Column(
+        db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False
+    )
+
+    participant = db.relationship("Participant", backref=db.backref("enrollments", lazy=True))
+    schedule = db.relationship("Schedule", backref=db.backref("enrollments", lazy=True))
+
+    def __repr__(self):
+        return f"<Enrollment {self.participant_id} {self.schedule_id}>"
@@ -0,0 +1,19 @@
+from datetime import datetime
+from app import db
+
+
+class JavaPersonSnapshot(db.Model):
+    """
+    Checkpoint de la conciliación con Java: huella de cada persona remota tal
+    como se vio en la última ejecución, para procesar solo las que cambiaron.
+    """
+
+    __tablename__ = "java_person_snapshot"
+
+    identification = db.Column(db.String(20), primary_key=True)
+    external_id = db.Column(db.String(100), nullable=True)
+    digest = db.Column(db.String(40), nullable=False)
+    seen_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<JavaPersonSnapshot {self.identification}>"
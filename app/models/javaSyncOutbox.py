@@ -0,0 +1,33 @@
+from datetime import datetime
+from app import db
+
+
+class JavaSyncOutbox(db.Model):
+    """
+    Operación pendiente contra el API de personas (Java). Se escribe en la misma
+    transacción que el cambio local y la entrega un worker en segundo plano.
+    """
+
+    __tablename__ = "java_sync_outbox"
+    __table_args__ = (
+        db.Index("ix_java_sync_outbox_due", "status", "next_attempt_at"),
+        db.Index("ix_java_sync_outbox_key", "coalesce_key", "status"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    operation = db.Column(db.String(30), nullable=False)  # "update_profile", "change_state"
+    entity_external_id = db.Column(db.String(36), nullable=False)
+    coalesce_key = db.Column(db.String(80), nullable=False)
+    payload = db.Column(db.JSON, nullable=False, default=dict)
+    # PENDING -> PROCESSING -> DONE | FAILED; CANCELLED si dos cambios se anulan
+    status = db.Column(db.String(20), nullable=False, default="PENDING")
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = db.Column(
+        db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow
+    )
+
+    def __repr__(self):
+        return f"<JavaSyncOutbox {self.operation} {self.entity_external_id} {self.status}>"
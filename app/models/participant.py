@@ -1,3 +1,4 @@
+from datetime import datetime
 from app import db
 import uuid
 
@@ -20,6 +21,9 @@ class Participant(db.Model):
     program = db.Column(db.String(50), nullable=True)  # "INICIACION" or "FUNCIONAL"
     java_external = db.Column(db.String(100), nullable=True)  # ID externo del microservicio Java
     user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=True)  # Si también es User (docente/pasante)
+    updated_at = db.Column(
+        db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False, index=True
+    )
     assessments = db.relationship("Assessment", backref="participant", lazy=True)
 
 
@@ -0,0 +1,16 @@
+from datetime import datetime
+from app import db
+
+
+class ParticipantAttendanceCounter(db.Model):
+    """Contadores de asistencia por participante, derivados de `attendance`."""
+
+    __tablename__ = "participant_attendance_counter"
+
+    participant_id = db.Column(db.Integer, db.ForeignKey("participant.id"), primary_key=True)
+    total = db.Column(db.Integer, nullable=False, default=0)
+    present = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f"<ParticipantAttendanceCounter {self.participant_id}>"
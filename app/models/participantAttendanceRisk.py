@@ -0,0 +1,22 @@
+from datetime import datetime
+from app import db
+
+
+class ParticipantAttendanceRisk(db.Model):
+    """Racha actual y tasa de asistencia reciente por participante (precalculadas)."""
+
+    __tablename__ = "participant_attendance_risk"
+    __table_args__ = (db.Index("ix_participant_attendance_risk_score", "risk_score"),)
+
+    participant_id = db.Column(db.Integer, db.ForeignKey("participant.id"), primary_key=True)
+    streak_status = db.Column(db.String(20), nullable=False)  # estado del último registro
+    streak_length = db.Column(db.Integer, nullable=False, default=0)
+    last_attended = db.Column(db.Date, nullable=True)
+    present_30d = db.Column(db.Integer, nullable=False, default=0)
+    total_30d = db.Column(db.Integer, nullable=False, default=0)
+    attendance_rate_30d = db.Column(db.Float, nullable=True)  # None si no hubo sesiones
+    risk_score = db.Column(db.Float, nullable=False, default=0)
+    computed_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f"<ParticipantAttendanceRisk {self.participant_id}>"
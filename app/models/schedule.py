@@ -1,3 +1,4 @@
+from datetime import datetime
 from app import db
 import uuid
 
@@ -16,13 +17,16 @@ class Schedule(db.Model):
     maxSlots = db.Column(db.Integer, nullable=False, default=30)
     program = db.Column(db.String(100), nullable=False)
     
-    startDate = db.Column(db.String(10), nullable=True)
-    endDate = db.Column(db.String(10), nullable=True)
-    specificDate = db.Column(db.String(10), nullable=True)
+    startDate = db.Column(db.Date, nullable=True)
+    endDate = db.Column(db.Date, nullable=True)
+    specificDate = db.Column(db.Date, nullable=True)
     isRecurring = db.Column(db.Boolean, default=True)
     location = db.Column(db.String(200), nullable=True)
     description = db.Column(db.String(500), nullable=True)
     status = db.Column(db.String(20), default="active")
+    updated_at = db.Column(
+        db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False, index=True
+    )
 
     def __repr__(self):
         return f"<Schedule {self.name}>"
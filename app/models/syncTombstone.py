@@ -0,0 +1,17 @@
+from datetime import datetime
+from app import db
+
+
+class SyncTombstone(db.Model):
+    """Registro de filas eliminadas, para que los clientes offline las borren al sincronizar."""
+
+    __tablename__ = "sync_tombstone"
+    __table_args__ = (db.Index("ix_sync_tombstone_deleted_at", "deleted_at"),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    entity = db.Column(db.String(20), nullable=False)  # "attendance", "participant", "schedule"
+    external_id = db.Column(db.String(36), nullable=False)
+    deleted_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f"<SyncTombstone {self.entity} {self.external_id}>"
@@ -1,4 +1,4 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify, stream_with_context
 from app.controllers.attendance_controller import AttendanceController
 from app.utils.jwt_required import jwt_required
 
@@ -30,6 +30,16 @@ def get_schedules():
     return response_handler(result)
 
 
+@attendance_bp.route("/attendance/v2/public/schedules/calendar", methods=["GET"])
+@jwt_required
+def get_calendar():
+    # Ocurrencias de los horarios en un rango: ?from=YYYY-MM-DD&to=YYYY-MM-DD&program=
+    result = controller.get_calendar(
+        request.args.get("from"), request.args.get("to"), request.args.get("program")
+    )
+    return response_handler(result)
+
+
 @attendance_bp.route("/attendance/v2/public/schedules", methods=["POST"])
 @jwt_required
 def create_schedule():
@@ -55,29 +65,93 @@ def delete_schedule(schedule_id):
     result = controller.delete_schedule(schedule_id)
     return response_handler(result)
 
+@attendance_bp.route("/attendance/v2/public/sessions/today", methods=["GET"])
+@jwt_required
+def get_today_sessions():
+    # Sesiones programadas para hoy con su conteo de asistencias
+    result = controller.get_today_sessions()
+    return response_handler(result)
+
 @attendance_bp.route("/attendance/v2/public/history", methods=["GET"])
 @jwt_required
 def get_history():
     # Historial con filtros de rango de fechas, sesión y búsqueda por participante
-    date_from = request.args.get("date_from") or request.args.get("startDate")
-    date_to = request.args.get("date_to") or request.args.get("endDate")
-    schedule_id = request.args.get("schedule_id") or request.args.get("scheduleId")
-    day_filter = request.args.get("day_of_week")
-    # Nuevos filtros de búsqueda por participante
-    search_dni = request.args.get("dni")
-    search_name = request.args.get("name") or request.args.get("search")
-    participant_id = request.args.get("participant_id") or request.args.get("participantId")
-    
-    result = controller.get_history(date_from, date_to, schedule_id, day_filter, search_dni, search_name, participant_id)
+    filters = _history_filters()
+
+    # Modo streaming: una asistencia por línea (NDJSON), memoria constante
+    if request.args.get("format") == "ndjson":
+        try:
+            rows = controller.stream_history(**filters)
+        except ValueError as e:
+            return response_handler(
+                {"status": "error", "msg": "Error de validación", "data": {"date": str(e)}, "code": 400}
+            )
+        return Response(stream_with_context(rows), mimetype="application/x-ndjson")
+
+    # Paginación por cursor (opcional): ?limit=50&cursor=<next_cursor>
+    limit = request.args.get("limit")
+    cursor = request.args.get("cursor")
+
+    result = controller.get_history(**filters, limit=limit, cursor=cursor)
     return response_handler(result)
 
 
+def _history_filters():
+    return {
+        "date_from": request.args.get("date_from") or request.args.get("startDate"),
+        "date_to": request.args.get("date_to") or request.args.get("endDate"),
+        "schedule_id": request.args.get("schedule_id") or request.args.get("scheduleId"),
+        "day_filter": request.args.get("day_of_week"),
+        # Filtros de búsqueda por participante
+        "search_dni": request.args.get("dni"),
+        "search_name": request.args.get("name") or request.args.get("search"),
+        "participant_id": request.args.get("participant_id") or request.args.get("participantId"),
+    }
+
+
+EXPORT_MIMETYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+
+@attendance_bp.route("/attendance/v2/export", methods=["GET"])
+@jwt_required
+def export_history():
+    # Exportación del historial a hoja de cálculo: ?format=csv|xlsx + filtros del historial
+    export_format = (request.args.get("format") or "csv").lower()
+    try:
+        chunks = controller.export_history(export_format, **_history_filters())
+    except ValueError as e:
+        return response_handler(
+            {"status": "error", "msg": "Error de validación", "data": {"error": str(e)}, "code": 400}
+        )
+    return Response(
+        stream_with_context(chunks),
+        mimetype=EXPORT_MIMETYPES[export_format],
+        headers={
+            "Content-Disposition": f"attachment; filename=asistencias.{export_format}"
+        },
+    )
+
+
 @attendance_bp.route("/attendance/v2/public/history/session/<schedule_id>/<date>", methods=["GET"])
 @jwt_required
 def get_session_detail(schedule_id, date):
-    # Detalle completo de participantes en una sesión específica
-    result = controller.get_session_detail(schedule_id, date)
-    return response_handler(result)
+    # Detalle completo de participantes en una sesión específica (con ETag / 304)
+    result = controller.get_session_detail(
+        schedule_id, date, request.headers.get("If-None-Match")
+    )
+    etag = result.pop("etag", None)
+    if result.get("code") == 304:
+        response = Response(status=304)
+    else:
+        response, status_code = response_handler(result)
+        response.status_code = status_code
+    if etag:
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = "no-cache"
+    return response
 
 
 @attendance_bp.route("/attendance/v2/public/history/session/<schedule_id>/<date>", methods=["DELETE"])
@@ -95,10 +169,111 @@ def delete_session_attendance_legacy(schedule_id, date):
     result = controller.delete_session_attendance(schedule_id, date)
     return response_handler(result)
 
+@attendance_bp.route("/attendance/v2/public/checkin", methods=["POST"])
+@jwt_required
+def check_in():
+    # Registro individual desde el kiosco (DNI o external_id + horario)
+    data = request.get_json(silent=True) or {}
+    result = controller.check_in(data)
+    return response_handler(result)
+
+
 @attendance_bp.route("/attendance/v2/public/register", methods=["POST"])
 @jwt_required
 def register_public_attendance():
     # Endpoint principal para registro desde dashboard
     data = request.json
     result = controller.register_public_attendance(data)
-    return response_handler(result)
\ No newline at end of file
+    return response_handler(result)
+
+
+@attendance_bp.route("/attendance/v2/analytics/occupancy", methods=["GET"])
+@jwt_required
+def get_occupancy():
+    # Ocupación y tendencia por horario y día de la semana: ?date_from=&date_to=&program=
+    result = controller.get_occupancy(
+        request.args.get("date_from") or request.args.get("from"),
+        request.args.get("date_to") or request.args.get("to"),
+        request.args.get("program"),
+    )
+    return response_handler(result)
+
+
+@attendance_bp.route("/attendance/v2/sync", methods=["GET"])
+@jwt_required
+def get_sync_changes():
+    # Sincronización offline: ?since=<next_cursor anterior>&program= (sin since = carga inicial)
+    result = controller.get_sync_changes(
+        request.args.get("since"), request.args.get("program")
+    )
+    return response_handler(result)
+
+
+@attendance_bp.route("/attendance/v2/sync/attendances", methods=["POST"])
+@jwt_required
+def upload_sync_marks():
+    # Lote de marcas encoladas offline, cada una con su idempotency_key
+    data = request.get_json(silent=True) or {}
+    result = controller.upload_sync_marks(data)
+    return response_handler(result)
+
+
+@attendance_bp.route("/attendance/v2/analytics/at-risk", methods=["GET"])
+@jwt_required
+def get_at_risk():
+    # Participantes en riesgo (rachas de ausencias): ?program=&limit=&min_absences=
+    result = controller.get_at_risk(
+        request.args.get("program"),
+        request.args.get("limit"),
+        request.args.get("min_absences"),
+    )
+    return response_handler(result)
+
+
+@attendance_bp.route("/attendance/v2/analytics/at-risk/refresh", methods=["POST"])
+@jwt_required
+def refresh_at_risk():
+    # Recalcula el riesgo bajo demanda (normalmente lo hace el cron nocturno)
+    result = controller.refresh_at_risk()
+    return response_handler(result)
+
+
+@attendance_bp.route("/attendance/v2/analytics/matrix", methods=["GET"])
+@jwt_required
+def get_attendance_matrix():
+    # Matriz participantes × sesiones en bits: ?date_from=&date_to=&program=
+    result = controller.get_attendance_matrix(
+        request.args.get("date_from") or request.args.get("from"),
+        request.args.get("date_to") or request.args.get("to"),
+        request.args.get("program"),
+    )
+    return response_handler(result)
+
+
+@attendance_bp.route("/attendance/v2/public/sessions/<schedule_id>/<date>/roster", methods=["GET"])
+@jwt_required
+def get_session_roster(schedule_id, date):
+    # Inscritos de la sesión con su marca de asistencia (si ya fue tomada)
+    result = controller.get_session_roster(schedule_id, date)
+    return response_handler(result)
+
+
+@attendance_bp.route("/attendance/v2/schedules/<schedule_id>/enrollments", methods=["POST"])
+@jwt_required
+def enroll_participants(schedule_id):
+    # Inscribe participantes: {"participant_external_ids": [...], "start_date", "end_date"}
+    data = request.get_json(silent=True) or {}
+    result = controller.enroll_participants(schedule_id, data)
+    return response_handler(result)
+
+
+@attendance_bp.route(
+    "/attendance/v2/schedules/<schedule_id>/enrollments/<participant_external_id>",
+    methods=["DELETE"],
+)
+@jwt_required
+def end_enrollment(schedule_id, participant_external_id):
+    # Baja de la inscripción desde end_date, que ya no aparece en la lista (opcional {"end_date": "YYYY-MM-DD"})
+    data = request.get_json(silent=True) or {}
+    result = controller.end_enrollment(schedule_id, participant_external_id, data)
+    return response_handler(result)
@@ -21,10 +21,34 @@ def refresh():
     return response_handler(controller.refresh())
 
 
+@auth_bp.route("/health", methods=["GET"])
+def health():
+    # La app sigue operativa sin Java (responde 200); el circuito indica si está degradada
+    from app.services.java_sync_service import java_sync
+
+    circuit = java_sync.http.circuit()
+    status = "ok" if circuit["state"] == "CLOSED" else "degraded"
+    return jsonify({"status": status, "java_circuit": circuit}), 200
+
+
 @auth_bp.route("/health/db", methods=["GET"])
 def db_health():
     try:
         db.session.execute(text("SELECT 1"))
         return jsonify({"db": "ok"}), 200
     except Exception:
-        return jsonify({"db": "error"}), 500
\ No newline at end of file
+        return jsonify({"db": "error"}), 500
+
+@auth_bp.route("/health/java", methods=["GET"])
+def java_health():
+    # Métricas del cliente HTTP del API de personas y estado del outbox
+    from app.services.java_outbox_service import java_outbox
+    from app.services.java_sync_service import java_sync
+
+    return jsonify({
+        "java_http": java_sync.http.stats(),
+        "java_circuit": java_sync.http.circuit(),
+        "identification_cache": java_sync.identification_cache_stats(),
+        "outbox": java_outbox.stats(),
+        "outbox_backlog": java_outbox.backlog(),
+    }), 200
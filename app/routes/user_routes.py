@@ -15,7 +15,16 @@ def response_handler(result):
 @user_bp.route("/users", methods=["GET"])
 @jwt_required
 def listar_users():
-    result = controller.get_users()
+    # Filtros: ?status=&program=&type=; proyección: ?fields=dni,firstName;
+    # paginación opcional: ?limit=50&cursor=<next_cursor>
+    result = controller.get_users(
+        status=request.args.get("status"),
+        program=request.args.get("program"),
+        participant_type=request.args.get("type"),
+        fields=request.args.get("fields"),
+        limit=request.args.get("limit"),
+        cursor=request.args.get("cursor"),
+    )
     return response_handler(result)
 
 
@@ -47,6 +56,27 @@ def create_participant():
     return response_handler(controller.create_participant(data))
 
 
+@user_bp.route("/participants/import", methods=["POST"])
+@jwt_required
+def import_participants():
+    """
+    Importación masiva: JSON {"participants": [...]}, archivo CSV (campo "file")
+    o cuerpo text/csv. Con ?dry_run=true solo valida y reporta errores por fila.
+    """
+    dry_run = request.args.get("dry_run", "false").lower() in ("1", "true", "yes")
+    upload = request.files.get("file")
+    if upload:
+        csv_text = upload.read().decode("utf-8-sig", errors="replace")
+        return response_handler(controller.import_participants(csv_text=csv_text, dry_run=dry_run))
+    if request.mimetype == "text/csv":
+        csv_text = request.get_data(as_text=True)
+        return response_handler(controller.import_participants(csv_text=csv_text, dry_run=dry_run))
+
+    data = request.get_json(silent=True) or {}
+    rows = data.get("participants") if isinstance(data, dict) else data
+    return response_handler(controller.import_participants(rows=rows, dry_run=dry_run))
+
+
 @user_bp.route("/save-user", methods=["POST"])
 @jwt_required
 def create_user():
@@ -121,6 +151,15 @@ def update_user_profile():
         return jsonify({"status": "error", "msg": f"Error: {str(e)}", "code": 500}), 500
 
 
+@user_bp.route("/participants/search", methods=["GET"])
+@jwt_required
+def search_participants():
+    """Autocompletado de participantes: /participants/search?q=<dni o nombre>&limit=10"""
+    q = request.args.get("q", "")
+    limit = request.args.get("limit", 10)
+    return response_handler(controller.search_participants(q, limit))
+
+
 @user_bp.route("/participants/<string:external_id>", methods=["GET"])
 def get_participant(external_id):
     """Obtiene un participante por su external_id con su responsable (si tiene)"""
@@ -0,0 +1,83 @@
+"""
+Detección de participantes en riesgo de abandono.
+Calcula con funciones de ventana sobre `attendance` la racha actual (presente o
+ausente), la última asistencia y la tasa de los últimos 30 días, y guarda el
+resultado en participant_attendance_risk. Se ejecuta cada noche con
+`flask compute-attendance-risk` (cron) o bajo demanda desde la API.
+"""
+from datetime import date, datetime, timedelta
+
+import click
+from sqlalchemy import and_, case, func, literal, select
+
+from app import db
+from app.models.attendance import Attendance
+from app.models.participantAttendanceRisk import ParticipantAttendanceRisk
+
+RATE_WINDOW_DAYS = 30
+
+
+def _risk_rows(today):
+    window_start = today - timedelta(days=RATE_WINDOW_DAYS)
+    newest_first = (Attendance.date.desc(), Attendance.id.desc())
+    ranked = select(
+        Attendance.participant_id,
+        Attendance.date,
+        Attendance.status,
+        func.row_number()
+        .over(partition_by=Attendance.participant_id, order_by=newest_first)
+        .label("position"),
+        func.first_value(Attendance.status)
+        .over(partition_by=Attendance.participant_id, order_by=newest_first)
+        .label("latest_status"),
+    ).where(Attendance.date <= today).subquery()
+
+    is_present = ranked.c.status == Attendance.Status.PRESENT
+    in_window = ranked.c.date > window_start
+    # La racha termina en el primer registro (del más reciente hacia atrás) con otro estado
+    streak_length = func.coalesce(
+        func.min(case((ranked.c.status != ranked.c.latest_status, ranked.c.position))) - 1,
+        func.count(),
+    )
+    present_30d = func.sum(case((and_(in_window, is_present), 1), else_=0))
+    total_30d = func.sum(case((in_window, 1), else_=0))
+    rate_30d = present_30d * 1.0 / func.nullif(total_30d, 0)
+    absent_streak = case(
+        (func.max(ranked.c.latest_status) == Attendance.Status.ABSENT, streak_length),
+        else_=0,
+    )
+    # Las ausencias seguidas dominan; la tasa reciente desempata (0..1)
+    risk_score = absent_streak + 1 - func.coalesce(rate_30d, 0)
+
+    return ParticipantAttendanceRisk.__table__.insert().from_select(
+        [
+            "participant_id", "streak_status", "streak_length", "last_attended",
+            "present_30d", "total_30d", "attendance_rate_30d", "risk_score", "computed_at",
+        ],
+        select(
+            ranked.c.participant_id,
+            func.max(ranked.c.latest_status),
+            streak_length,
+            func.max(case((is_present, ranked.c.date))),
+            present_30d,
+            total_30d,
+            rate_30d,
+            risk_score,
+            literal(datetime.utcnow()),
+        ).group_by(ranked.c.participant_id),
+    )
+
+
+def compute_attendance_risk(today=None):
+    """Recalcula toda la tabla de riesgo en la transacción actual. Retorna el número de filas."""
+    db.session.execute(ParticipantAttendanceRisk.__table__.delete())
+    db.session.execute(_risk_rows(today or date.today()))
+    return db.session.query(func.count(ParticipantAttendanceRisk.participant_id)).scalar()
+
+
+@click.command("compute-attendance-risk")
+def compute_attendance_risk_command():
+    """Recalcula participant_attendance_risk (pensado para ejecutarse cada noche)."""
+    rows = compute_attendance_risk()
+    db.session.commit()
+    click.echo(f"Riesgo de asistencia calculado para {rows} participantes")
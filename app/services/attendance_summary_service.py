@@ -0,0 +1,208 @@
+"""
+Resúmenes de asistencia mantenidos de forma incremental:
+- attendance_daily_summary: totales por sesión (horario + fecha).
+- participant_attendance_counter: totales por participante.
+Se actualizan en la misma transacción que las escrituras de asistencia y se
+pueden reconstruir con `flask rebuild-attendance-summaries`.
+"""
+from datetime import datetime
+
+import click
+from sqlalchemy import case, func, literal, select
+
+from app import db
+from app.models.attendance import Attendance
+from app.models.attendanceDailySummary import AttendanceDailySummary
+from app.models.participantAttendanceCounter import ParticipantAttendanceCounter
+from app.utils.db_dialect import dialect_insert
+from app.utils.validations.attendance_validation import parse_attendance_date
+
+
+def _count_status(status):
+    return func.sum(case((Attendance.status == status, 1), else_=0))
+
+
+def _insert_from(model, columns, query):
+    return model.__table__.insert().from_select(columns, query)
+
+
+def _session_rows(*conditions):
+    return _insert_from(
+        AttendanceDailySummary,
+        ["schedule_id", "date", "present", "absent", "total", "updated_at"],
+        select(
+            Attendance.schedule_id,
+            Attendance.date,
+            _count_status(Attendance.Status.PRESENT),
+            _count_status(Attendance.Status.ABSENT),
+            func.count(Attendance.id),
+            literal(datetime.utcnow()),
+        )
+        .where(*conditions)
+        .group_by(Attendance.schedule_id, Attendance.date),
+    )
+
+
+def _participant_rows(*conditions):
+    return _insert_from(
+        ParticipantAttendanceCounter,
+        ["participant_id", "total", "present", "updated_at"],
+        select(
+            Attendance.participant_id,
+            func.count(Attendance.id),
+            _count_status(Attendance.Status.PRESENT),
+            literal(datetime.utcnow()),
+        )
+        .where(*conditions)
+        .group_by(Attendance.participant_id),
+    )
+
+
+def refresh_session_summary(schedule_id, day):
+    """
+    Recalcula la fila de la sesión desde sus asistencias (acotado a una sesión).
+    La fila se actualiza en lugar de borrarse: otra transacción puede estar esperando
+    su bloqueo en lock_session_summary. No hace commit: usa la transacción actual.
+    """
+    _ensure_session_row(schedule_id, day)
+    session = (Attendance.schedule_id == schedule_id, Attendance.date == day)
+    db.session.execute(
+        AttendanceDailySummary.__table__.update()
+        .where(
+            AttendanceDailySummary.schedule_id == schedule_id,
+            AttendanceDailySummary.date == day,
+        )
+        .values(
+            present=select(
+                func.coalesce(_count_status(Attendance.Status.PRESENT), 0)
+            ).where(*session).scalar_subquery(),
+            absent=select(
+                func.coalesce(_count_status(Attendance.Status.ABSENT), 0)
+            ).where(*session).scalar_subquery(),
+            total=select(func.count(Attendance.id)).where(*session).scalar_subquery(),
+            updated_at=datetime.utcnow(),
+        )
+    )
+
+
+def apply_participant_counter_changes(changes):
+    """
+    Aplica a los contadores los cambios de asistencia [(participant_id, estado
+    anterior, estado nuevo)], con None si la asistencia no existía o se borró.
+    Los estados anteriores deben leerse con la sesión ya bloqueada
+    (lock_session_summary). Solo suma deltas (ON CONFLICT DO UPDATE), así que
+    dos transacciones sobre el mismo participante en sesiones distintas no
+    chocan ni recalculan su historial. No hace commit.
+    """
+    deltas = {}
+    for participant_id, old_status, new_status in changes:
+        total, present = deltas.get(participant_id, (0, 0))
+        deltas[participant_id] = (
+            total + (new_status is not None) - (old_status is not None),
+            present
+            + (new_status == Attendance.Status.PRESENT)
+            - (old_status == Attendance.Status.PRESENT),
+        )
+    now = datetime.utcnow()
+    rows = [
+        {"participant_id": participant_id, "total": total, "present": present, "updated_at": now}
+        # Orden fijo de filas bloqueadas: evita deadlocks entre lotes concurrentes
+        for participant_id, (total, present) in sorted(deltas.items())
+        if total or present
+    ]
+    if rows:
+        db.session.execute(_counter_upsert(), rows)
+
+
+def _ensure_session_row(schedule_id, day):
+    db.session.execute(
+        dialect_insert(AttendanceDailySummary)
+        .values(
+            schedule_id=schedule_id, date=day, present=0, absent=0, total=0,
+            updated_at=datetime.utcnow(),
+        )
+        .on_conflict_do_nothing(index_elements=["schedule_id", "date"])
+    )
+
+
+def lock_session_summary(schedule_id, day):
+    """
+    Bloquea (SELECT ... FOR UPDATE) la fila resumen de la sesión, creándola si no existe.
+    Es la reserva de cupos: serializa las escrituras de una misma sesión sin bloquear
+    las demás, hasta el commit/rollback de la transacción.
+    """
+    _ensure_session_row(schedule_id, day)
+    return (
+        AttendanceDailySummary.query.filter_by(schedule_id=schedule_id, date=day)
+        .with_for_update()
+        .populate_existing()
+        .one()
+    )
+
+
+def has_capacity(session_summary, max_slots, present_delta):
+    """True si la sesión (ya bloqueada) admite `present_delta` presentes más."""
+    return present_delta <= 0 or session_summary.present + present_delta <= max_slots
+
+
+def increment_participant_counter(participant_id, total=0, present=0):
+    """Suma a los contadores del participante (crea la fila si no existe)."""
+    db.session.execute(
+        _counter_upsert(),
+        {
+            "participant_id": participant_id, "total": total, "present": present,
+            "updated_at": datetime.utcnow(),
+        },
+    )
+
+
+def _counter_upsert():
+    stmt = dialect_insert(ParticipantAttendanceCounter)
+    table = ParticipantAttendanceCounter.__table__
+    return stmt.on_conflict_do_update(
+        index_elements=["participant_id"],
+        set_={
+            "total": table.c.total + stmt.excluded.total,
+            "present": table.c.present + stmt.excluded.present,
+            "updated_at": stmt.excluded.updated_at,
+        },
+    )
+
+
+def rebuild_daily_summary(date_from=None, date_to=None):
+    """Reconstruye el resumen por sesión (todo o un rango de fechas) desde `attendance`."""
+    summary_range, attendance_range = [], []
+    if date_from:
+        summary_range.append(AttendanceDailySummary.date >= date_from)
+        attendance_range.append(Attendance.date >= date_from)
+    if date_to:
+        summary_range.append(AttendanceDailySummary.date <= date_to)
+        attendance_range.append(Attendance.date <= date_to)
+
+    db.session.execute(AttendanceDailySummary.__table__.delete().where(*summary_range))
+    db.session.execute(_session_rows(*attendance_range))
+
+
+def rebuild_participant_counters():
+    """Reconstruye todos los contadores por participante desde `attendance`."""
+    db.session.execute(ParticipantAttendanceCounter.__table__.delete())
+    db.session.execute(_participant_rows())
+
+
+@click.command("rebuild-attendance-summaries")
+@click.option("--date-from", default=None, help="Fecha inicial (YYYY-MM-DD) del resumen por sesión")
+@click.option("--date-to", default=None, help="Fecha final (YYYY-MM-DD) del resumen por sesión")
+def rebuild_attendance_summaries_command(date_from, date_to):
+    """Reconstruye attendance_daily_summary y participant_attendance_counter."""
+    date_from, error_from = parse_attendance_date(date_from)
+    date_to, error_to = parse_attendance_date(date_to)
+    if error_from or error_to:
+        raise click.BadParameter(error_from or error_to)
+
+    rebuild_daily_summary(date_from, date_to)
+    rebuild_participant_counters()
+    db.session.commit()
+    click.echo(
+        f"Resúmenes reconstruidos: {AttendanceDailySummary.query.count()} sesiones, "
+        f"{ParticipantAttendanceCounter.query.count()} participantes"
+    )
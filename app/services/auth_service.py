@@ -1,5 +1,6 @@
-import requests
 from app.config.config import Config
+from app.services.java_sync_service import java_sync
+from app.utils.circuit_breaker import CircuitOpenError
 from app.utils.responses import error_response
 from app.utils.jwt import generate_token
 from werkzeug.security import check_password_hash
@@ -66,10 +67,11 @@ class AuthService:
             return
 
         try:
-            response = requests.post(
-                f"{Config.PERSON_API_URL}/login",
+            response = java_sync.http.post(
+                f"{java_sync.base_url}/login",
+                operation="login_sync",
                 json={"email": email, "password": password},
-                timeout=3,
+                timeout=(Config.JAVA_HTTP_CONNECT_TIMEOUT, 3),
             )
 
             if response.status_code == 200:
@@ -83,10 +85,11 @@ class AuthService:
 
     def _java_login(self, email, password):
         try:
-            response = requests.post(
-                f"{Config.PERSON_API_URL}/login",
+            response = java_sync.http.post(
+                f"{java_sync.base_url}/login",
+                operation="login",
                 json={"email": email, "password": password},
-                timeout=3,
+                timeout=(Config.JAVA_HTTP_CONNECT_TIMEOUT, 3),
             )
 
             if response.status_code != 200:
@@ -103,6 +106,11 @@ class AuthService:
                 "code": 200,
             }
 
+        except CircuitOpenError:
+            # Java está caído: se responde de inmediato en lugar de esperar el timeout
+            return error_response(
+                "El sistema externo no está disponible temporalmente. Intente más tarde", 503
+            )
         except Exception:
             return error_response("No se pudo conectar al sistema externo", 500)
 
@@ -0,0 +1,378 @@
+"""
+Outbox de sincronización con el API de personas (Java).
+Los controladores encolan la operación en la misma transacción que el cambio
+local y responden apenas se confirma el commit; un worker en segundo plano
+(hilos dentro de la app o el comando `flask java-outbox-worker`) la entrega
+con reintentos y backoff exponencial.
+
+Varios workers (hilos o procesos) pueden drenar la tabla a la vez: cada fila
+se reclama con un UPDATE condicional y queda "arrendada" durante LEASE_SECONDS.
+Si el arriendo vence (el worker murió a mitad del envío), las operaciones
+idempotentes se vuelven a reclamar; un change_state queda FAILED, porque no se
+sabe si Java lo aplicó y repetirlo desharía el cambio.
+
+El payload nunca guarda contraseñas ni tokens: el worker se autentica en Java
+con la cuenta de servicio de la configuración (JAVA_SERVICE_EMAIL/PASSWORD).
+"""
+import threading
+from datetime import datetime, timedelta
+
+import click
+from sqlalchemy import and_, func, or_, select
+
+from app import db
+from app.config.config import Config
+from app.models.javaSyncOutbox import JavaSyncOutbox
+from app.models.user import User
+from app.services.java_sync_service import java_sync
+from app.utils.cache import TTLCache
+
+
+JAVA_ROLES = {
+    "ESTUDIANTE": "ESTUDIANTES",
+    "DOCENTE": "DOCENTES",
+    "ADMINISTRATIVO": "ADMINISTRATIVOS",
+}
+
+
+class JavaOutboxService:
+    """Encola, coalesce y entrega las operaciones pendientes contra Java."""
+
+    MAX_ATTEMPTS = 6
+    BASE_DELAY_SECONDS = 5
+    MAX_DELAY_SECONDS = 600
+    LEASE_SECONDS = 60
+    BATCH_SIZE = 20
+    POLL_SECONDS = 5
+    SERVICE_TOKEN_TTL_SECONDS = 600
+
+    def __init__(self):
+        self.service_email = Config.JAVA_SERVICE_EMAIL
+        self.service_password = Config.JAVA_SERVICE_PASSWORD
+        self._service_token = TTLCache(maxsize=1, ttl=self.SERVICE_TOKEN_TTL_SECONDS)
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+        self._start_lock = threading.Lock()
+        self._start_refused = False
+
+    # ---------- Encolado (dentro de la transacción del controlador) ----------
+
+    def enqueue_profile_update(self, user):
+        """
+        Encola la actualización del perfil de `user` en Java. Si ya hay una
+        pendiente para el mismo usuario se reutiliza: el worker envía los datos
+        vigentes del usuario al momento de la entrega. Retorna el id de la fila.
+        """
+        payload = {"email": user.email}
+        key = f"update_profile:{user.external_id}"
+        row = self._pending(key)
+        if row:
+            row.payload = payload
+            row.next_attempt_at = datetime.utcnow()
+        else:
+            row = JavaSyncOutbox(
+                operation="update_profile",
+                entity_external_id=user.external_id,
+                coalesce_key=key,
+                payload=payload,
+            )
+            db.session.add(row)
+        db.session.flush()
+        return row.id
+
+    def enqueue_state_change(self, participant):
+        """
+        Encola el cambio de estado de `participant` en Java. El endpoint de Java
+        alterna el estado, así que dos cambios pendientes se anulan entre sí,
+        pero solo si el pendiente nunca se envió (attempts = 0): un intento
+        previo pudo haberse aplicado en Java.
+        Retorna el id de la fila, o None si se canceló contra una pendiente.
+        """
+        key = f"change_state:{participant.external_id}"
+        row = self._pending(key, unsent=True)
+        if row:
+            self._finish(row, "CANCELLED", "Anulado por un cambio de estado posterior")
+            db.session.flush()
+            return None
+        row = JavaSyncOutbox(
+            operation="change_state",
+            entity_external_id=participant.external_id,
+            coalesce_key=key,
+            payload={"java_external": participant.java_external},
+        )
+        db.session.add(row)
+        db.session.flush()
+        return row.id
+
+    def notify(self):
+        """Despierta a los hilos del worker (llamar después del commit)."""
+        self._wake.set()
+
+    def _pending(self, key, unsent=False):
+        query = JavaSyncOutbox.query.filter_by(coalesce_key=key, status="PENDING")
+        if unsent:
+            query = query.filter_by(attempts=0)
+        return query.order_by(JavaSyncOutbox.id.desc()).first()
+
+    # ---------- Entrega ----------
+
+    def process_due(self, now=None, limit=None):
+        """Entrega las filas vencidas. Retorna {"DONE": n, "PENDING": n, "FAILED": n}."""
+        results = {"DONE": 0, "PENDING": 0, "FAILED": 0}
+        breaker = java_sync.http.breaker
+        if breaker and not breaker.available():
+            # Con el circuito abierto no se gastan intentos: se espera a que Java vuelva
+            return results
+        if not self.configured():
+            # Sin cuenta de servicio no hay cómo autenticarse: las filas esperan
+            # (se avisa una vez al iniciar el worker y en /api/health/java)
+            return results
+
+        now = now or datetime.utcnow()
+        self._fail_expired_toggles(now)
+        due_ids = db.session.scalars(
+            select(JavaSyncOutbox.id)
+            .where(self._claimable(JavaSyncOutbox.__table__.c, now))
+            .order_by(JavaSyncOutbox.next_attempt_at, JavaSyncOutbox.id)
+            .limit(limit or self.BATCH_SIZE)
+        ).all()
+        db.session.commit()
+
+        for outbox_id in due_ids:
+            row = self._claim(outbox_id, now)
+            if row is None:
+                continue  # la tomó otro worker
+            # Ante un error inesperado, un cambio de estado pudo haberse aplicado
+            retryable = row.operation != "change_state"
+            try:
+                error, retryable = self._deliver(row)
+            except Exception as e:
+                error = str(e)
+            if error is not None:
+                # El token de servicio pudo vencer: el próximo intento vuelve a iniciar sesión
+                self._service_token.clear()
+            if error is None:
+                self._finish(row, "DONE")
+            elif not retryable or row.attempts >= self.MAX_ATTEMPTS:
+                self._finish(row, "FAILED", error)
+            else:
+                delay = min(self.BASE_DELAY_SECONDS * 2 ** (row.attempts - 1), self.MAX_DELAY_SECONDS)
+                row.status = "PENDING"
+                row.last_error = error
+                row.next_attempt_at = datetime.utcnow() + timedelta(seconds=delay)
+            results[row.status] += 1
+            db.session.commit()
+        return results
+
+    def configured(self):
+        return bool(self.service_email and self.service_password)
+
+    def _claimable(self, columns, now):
+        """Filas vencidas: pendientes, o arriendos vencidos de operaciones idempotentes."""
+        return and_(
+            columns.next_attempt_at <= now,
+            or_(
+                columns.status == "PENDING",
+                and_(columns.status == "PROCESSING", columns.operation != "change_state"),
+            ),
+        )
+
+    def _fail_expired_toggles(self, now):
+        """
+        Un change_state con el arriendo vencido pudo llegar a Java antes de que
+        su worker muriera: se cierra como FAILED en lugar de reenviarlo.
+        """
+        table = JavaSyncOutbox.__table__
+        db.session.execute(
+            table.update()
+            .where(
+                table.c.operation == "change_state",
+                table.c.status == "PROCESSING",
+                table.c.next_attempt_at <= now,
+            )
+            .values(
+                status="FAILED",
+                last_error="Entrega desconocida: el worker no terminó el envío a Java",
+                updated_at=datetime.utcnow(),
+            )
+        )
+        db.session.commit()
+
+    def _claim(self, outbox_id, now):
+        """Reclama la fila con un UPDATE condicional; None si otro worker ganó."""
+        table = JavaSyncOutbox.__table__
+        claimed = db.session.execute(
+            table.update()
+            .where(table.c.id == outbox_id, self._claimable(table.c, now))
+            .values(
+                status="PROCESSING",
+                attempts=table.c.attempts + 1,
+                next_attempt_at=datetime.utcnow() + timedelta(seconds=self.LEASE_SECONDS),
+            )
+        ).rowcount
+        db.session.commit()
+        return db.session.get(JavaSyncOutbox, outbox_id) if claimed else None
+
+    def _finish(self, row, status, error=None):
+        row.status = status
+        row.last_error = error
+
+    def _deliver(self, row):
+        """
+        Ejecuta la operación en Java. Retorna (error, reintentable); error es
+        None si tuvo éxito.
+        """
+        token, error = self._get_service_token()
+        if error:
+            return error, True
+        if row.operation == "update_profile":
+            return self._deliver_profile_update(row, token), True
+        if row.operation == "change_state":
+            result = java_sync.change_state(row.payload.get("java_external"), token)
+            if result.get("success"):
+                return None, False
+            # change_state alterna el estado: solo se reintenta si Java seguro no lo aplicó
+            return str(result.get("error")), result.get("retryable", False)
+        return f"Operación desconocida: {row.operation}", False
+
+    def _get_service_token(self):
+        """Token de la cuenta de servicio, reutilizado hasta SERVICE_TOKEN_TTL_SECONDS. Retorna (token, error)."""
+        token = self._service_token.get("token")
+        if token:
+            return token, None
+        response = java_sync.http.post(
+            f"{java_sync.base_url}/login",
+            operation="login_service",
+            json={"email": self.service_email, "password": self.service_password},
+        )
+        if response.status_code != 200:
+            return None, f"Login de servicio en Java falló: {response.status_code}"
+        token = (response.json().get("data") or {}).get("token")
+        if not token:
+            return None, "No se obtuvo token de servicio de Java"
+        self._service_token.set("token", token)
+        return token, None
+
+    def _deliver_profile_update(self, row, token):
+        user = User.query.filter_by(external_id=row.entity_external_id).first()
+        if not user:
+            return "Usuario no encontrado"
+
+        java_external = user.java_external
+        if not java_external:
+            found = java_sync.search_by_identification(user.dni, token)
+            if not found.get("found"):
+                return found.get("error") or "Persona no encontrada en Java"
+            java_external = found["data"]["external_id"]
+
+        # Se envían los datos vigentes: varias ediciones pendientes se entregan en una
+        java_resp = java_sync.update_person_in_java(
+            {
+                "first_name": user.firstName,
+                "last_name": user.lastName,
+                "external": java_external,
+                "type_identification": "CEDULA",
+                "type_stament": JAVA_ROLES.get(user.role, "EXTERNOS"),
+                "direction": user.address if user.address else "Sin dirección",
+                "phono": user.phone if user.phone else "0000000000",
+            },
+            token,
+        )
+        if java_resp and java_resp.get("status") == "success":
+            return None
+        return java_resp.get("message") if java_resp else "Sin respuesta"
+
+    def stats(self):
+        """Cantidad de filas por estado."""
+        rows = db.session.execute(
+            select(JavaSyncOutbox.status, func.count()).group_by(JavaSyncOutbox.status)
+        ).all()
+        return dict(rows)
+
+    def backlog(self):
+        """Filas aún no entregadas a Java y antigüedad de la más vieja (para /api/health/java)."""
+        count, oldest = db.session.execute(
+            select(func.count(), func.min(JavaSyncOutbox.created_at)).where(
+                JavaSyncOutbox.status.in_(("PENDING", "PROCESSING"))
+            )
+        ).one()
+        return {
+            "undelivered": count,
+            "oldest_undelivered_seconds": (
+                int((datetime.utcnow() - oldest).total_seconds()) if oldest else None
+            ),
+            "service_account_configured": self.configured(),
+            "worker_threads": len(self._threads),
+        }
+
+    # ---------- Hilos del worker ----------
+
+    def start(self, app, workers=1):
+        """
+        Inicia `workers` hilos daemon que drenan el outbox dentro de la app. Sin
+        cuenta de servicio no los inicia y lo registra una sola vez como error.
+        """
+        with self._start_lock:
+            if self._threads or self._start_refused:
+                return
+            if not self.configured():
+                self._start_refused = True
+                app.logger.error(
+                    "Outbox de Java sin worker: defina JAVA_SERVICE_EMAIL y "
+                    "JAVA_SERVICE_PASSWORD. Los cambios de perfil y estado quedan en "
+                    "cola sin llegar a Java (ver GET /api/health/java)."
+                )
+                return
+            self._stop.clear()
+            for index in range(workers):
+                thread = threading.Thread(
+                    target=self.run_forever, args=(app,), name=f"java-outbox-{index}", daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout=5)
+        self._threads = []
+
+    def run_forever(self, app):
+        while not self._stop.is_set():
+            with app.app_context():
+                try:
+                    self.process_due()
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"[JavaOutbox] Error procesando el outbox: {e}")
+                finally:
+                    db.session.remove()
+            self._wake.wait(self.POLL_SECONDS)
+            self._wake.clear()
+
+
+# Instancia global del servicio
+java_outbox = JavaOutboxService()
+
+
+@click.command("java-outbox-worker")
+@click.option("--once", is_flag=True, help="Procesa las filas vencidas y termina.")
+def java_outbox_worker_command(once):
+    """Entrega las operaciones pendientes del outbox de Java (proceso separado)."""
+    if not java_outbox.configured():
+        raise click.ClickException(
+            "Defina JAVA_SERVICE_EMAIL y JAVA_SERVICE_PASSWORD para entregar el outbox de Java"
+        )
+    if once:
+        results = java_outbox.process_due(limit=10_000)
+        click.echo(f"Outbox de Java procesado: {results}")
+        return
+    from flask import current_app
+
+    click.echo("Worker del outbox de Java iniciado (Ctrl+C para salir)")
+    try:
+        java_outbox.run_forever(current_app._get_current_object())
+    except KeyboardInterrupt:
+        pass
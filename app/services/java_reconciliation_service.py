@@ -0,0 +1,213 @@
+"""
+Conciliación de personas entre el API de Java y las tablas locales.
+Recorre /all_filter en streaming (sin cargar la lista completa), cruza cada
+persona con un índice en memoria por DNI de participantes y usuarios, y corrige
+en lotes los `java_external` desactualizados.
+
+/all_filter no permite filtrar por fecha de cambio, así que el checkpoint es la
+tabla java_person_snapshot: guarda una huella (sha1) de cada persona tal como se
+vio la última vez. En las siguientes ejecuciones se omiten las personas cuya
+huella no cambió y cuyo registro local ya coincide.
+
+Se ejecuta con `flask reconcile-java-persons` (cron o bajo demanda).
+"""
+import hashlib
+import json
+from datetime import datetime
+
+import click
+import requests
+from sqlalchemy import bindparam, select
+
+from app import db
+from app.models.javaPersonSnapshot import JavaPersonSnapshot
+from app.models.participant import Participant
+from app.models.user import User
+from app.services.java_sync_service import java_sync
+from app.utils.db_dialect import dialect_insert
+
+LOCAL_MODELS = {"participant": Participant, "user": User}
+# Máximo de ejemplos por categoría en el reporte
+SAMPLE_SIZE = 20
+
+
+def person_digest(person):
+    """Huella estable de una persona de Java (independiente del orden de las claves)."""
+    canonical = json.dumps(person, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha1(canonical.encode("utf-8")).hexdigest()
+
+
+class JavaReconciliationService:
+    """Compara Java contra participant/users y corrige los java_external."""
+
+    BATCH_SIZE = 500
+
+    def reconcile(self, token, dry_run=False, full=False, batch_size=None):
+        """
+        Ejecuta una conciliación. Con dry_run no escribe nada (ni correcciones ni
+        checkpoint); con full ignora el checkpoint y revisa a todas las personas.
+        Retorna el reporte con los conteos y ejemplos de cada diferencia.
+        """
+        batch_size = batch_size or self.BATCH_SIZE
+        index = self._dni_index()
+        snapshots = dict(
+            db.session.execute(
+                select(JavaPersonSnapshot.identification, JavaPersonSnapshot.digest)
+            ).all()
+        )
+        unseen_local = set(index)
+        report = {
+            "dry_run": dry_run,
+            "full": full,
+            "complete": False,
+            "received": 0,
+            "unchanged": 0,
+            "processed": 0,
+            "mismatched": 0,
+            "fixed": 0,
+            "missing_local": 0,
+            "missing_remote": 0,
+            "mismatches": [],
+            "missing_local_sample": [],
+            "missing_remote_sample": [],
+        }
+        pending = {"fixes": {kind: [] for kind in LOCAL_MODELS}, "snapshots": []}
+
+        try:
+            for person in java_sync.iter_all_persons(token):
+                if not isinstance(person, dict):
+                    continue
+                dni = str(person.get("identification") or "").strip()
+                if not dni:
+                    continue
+                report["received"] += 1
+                unseen_local.discard(dni)
+
+                digest = person_digest(person)
+                # Lo que queda en `snapshots` al final son personas que ya no están en Java
+                previous = snapshots.pop(dni, None)
+                external = person.get("external")
+                local = index.get(dni, [])
+                stale = [row for row in local if external and row[2] != external]
+
+                if previous == digest and not stale and not full:
+                    report["unchanged"] += 1
+                    continue
+
+                report["processed"] += 1
+                if not local:
+                    report["missing_local"] += 1
+                    self._sample(report["missing_local_sample"], {"dni": dni, "java_external": external})
+                for kind, local_id, local_external in stale:
+                    report["mismatched"] += 1
+                    pending["fixes"][kind].append({"b_id": local_id, "b_java_external": external})
+                    self._sample(report["mismatches"], {
+                        "dni": dni,
+                        "kind": kind,
+                        "local_java_external": local_external,
+                        "java_external": external,
+                    })
+                if previous != digest:
+                    pending["snapshots"].append({
+                        "identification": dni,
+                        "external_id": external,
+                        "digest": digest,
+                        "seen_at": datetime.utcnow(),
+                    })
+
+                if sum(map(len, pending["fixes"].values())) + len(pending["snapshots"]) >= batch_size:
+                    report["fixed"] += self._flush(pending, dry_run)
+        except (requests.exceptions.RequestException, ValueError) as e:
+            # Lo ya enviado queda guardado: la próxima ejecución sigue desde ahí
+            report["fixed"] += self._flush(pending, dry_run)
+            report["error"] = str(e)
+            return report
+
+        report["fixed"] += self._flush(pending, dry_run)
+
+        # Solo con la lista completa se sabe qué falta en Java
+        for dni in sorted(unseen_local):
+            for kind, _, local_external in index[dni]:
+                if local_external:
+                    report["missing_remote"] += 1
+                    self._sample(report["missing_remote_sample"], {
+                        "dni": dni, "kind": kind, "java_external": local_external,
+                    })
+        if snapshots and not dry_run:
+            self._delete_snapshots(list(snapshots), batch_size)
+        report["complete"] = True
+        return report
+
+    def _dni_index(self):
+        """dni -> [(tipo, id, java_external)] de participantes y usuarios, en una consulta por tabla."""
+        index = {}
+        for kind, model in LOCAL_MODELS.items():
+            rows = db.session.execute(select(model.dni, model.id, model.java_external))
+            for dni, local_id, java_external in rows:
+                index.setdefault(str(dni).strip(), []).append((kind, local_id, java_external))
+        return index
+
+    def _flush(self, pending, dry_run):
+        """Aplica el lote pendiente (correcciones y checkpoint) y lo vacía. Retorna las filas corregidas."""
+        fixed = 0
+        if not dry_run:
+            for kind, rows in pending["fixes"].items():
+                if not rows:
+                    continue
+                table = LOCAL_MODELS[kind].__table__
+                db.session.execute(
+                    table.update()
+                    .where(table.c.id == bindparam("b_id"))
+                    .values(java_external=bindparam("b_java_external")),
+                    rows,
+                )
+                fixed += len(rows)
+            if pending["snapshots"]:
+                stmt = dialect_insert(JavaPersonSnapshot)
+                db.session.execute(
+                    stmt.on_conflict_do_update(
+                        index_elements=[JavaPersonSnapshot.identification],
+                        set_={
+                            "external_id": stmt.excluded.external_id,
+                            "digest": stmt.excluded.digest,
+                            "seen_at": stmt.excluded.seen_at,
+                        },
+                    ),
+                    pending["snapshots"],
+                )
+            db.session.commit()
+        for rows in pending["fixes"].values():
+            rows.clear()
+        pending["snapshots"].clear()
+        return fixed
+
+    def _delete_snapshots(self, identifications, batch_size):
+        for start in range(0, len(identifications), batch_size):
+            chunk = identifications[start:start + batch_size]
+            db.session.execute(
+                JavaPersonSnapshot.__table__.delete().where(
+                    JavaPersonSnapshot.identification.in_(chunk)
+                )
+            )
+        db.session.commit()
+
+    def _sample(self, bucket, item):
+        if len(bucket) < SAMPLE_SIZE:
+            bucket.append(item)
+
+
+# Instancia global del servicio
+java_reconciliation = JavaReconciliationService()
+
+
+@click.command("reconcile-java-persons")
+@click.option("--token", envvar="JAVA_SYNC_TOKEN", help="Token del API de Java (o JAVA_SYNC_TOKEN).")
+@click.option("--dry-run", is_flag=True, help="Solo reporta las diferencias, sin corregir.")
+@click.option("--full", is_flag=True, help="Ignora el checkpoint y revisa a todas las personas.")
+@click.option("--batch-size", type=int, default=JavaReconciliationService.BATCH_SIZE, show_default=True)
+def reconcile_java_persons_command(token, dry_run, full, batch_size):
+    """Concilia las personas de Java con participantes y usuarios locales."""
+    report = java_reconciliation.reconcile(token, dry_run=dry_run, full=full, batch_size=batch_size)
+    click.echo(json.dumps(report, indent=2, ensure_ascii=False, default=str))
+    if report.get("error"):
+        raise click.ClickException(f"Conciliación incompleta: {report['error']}")
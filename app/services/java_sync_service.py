@@ -2,16 +2,53 @@
 Servicio de sincronización con el microservicio de usuarios Java.
 Maneja todas las comunicaciones con la API externa de personas.
 """
+import copy
+import threading
+
 import requests
+from urllib3.exceptions import NewConnectionError
+
 from app.config.config import Config
+from app.utils.cache import TTLCache
+from app.utils.circuit_breaker import CircuitBreaker, CircuitOpenError
+from app.utils.http_client import PooledHttpClient
+from app.utils.json_stream import iter_json_array
+
+# Cliente compartido (pool keep-alive + circuit breaker) para todas las llamadas
+# al API de personas
+java_http = PooledHttpClient(
+    pool_size=Config.JAVA_HTTP_POOL_SIZE,
+    connect_timeout=Config.JAVA_HTTP_CONNECT_TIMEOUT,
+    read_timeout=Config.JAVA_HTTP_READ_TIMEOUT,
+    retries=Config.JAVA_HTTP_RETRIES,
+    backoff=Config.JAVA_HTTP_BACKOFF,
+    breaker=CircuitBreaker(
+        "java_person_api",
+        failure_threshold=Config.JAVA_CIRCUIT_FAILURES,
+        reset_timeout=Config.JAVA_CIRCUIT_RESET_SECONDS,
+        half_open_probes=Config.JAVA_CIRCUIT_HALF_OPEN_PROBES,
+    ),
+)
 
 
 class JavaSyncService:
     """Sincroniza datos con el microservicio Java de usuarios."""
 
-    def __init__(self):
+    def __init__(self, http=None):
         self.base_url = Config.PERSON_API_URL
-        self.timeout = 5
+        self.http = http or java_http
+        # Búsquedas por identificación: encontrados con TTL largo, no encontrados
+        # con TTL corto (caché negativa). Los errores no se guardan.
+        self.identification_cache = TTLCache(
+            maxsize=Config.JAVA_ID_CACHE_SIZE, ttl=Config.JAVA_ID_CACHE_TTL
+        )
+        self.negative_ttl = Config.JAVA_ID_CACHE_NEGATIVE_TTL
+        # external -> identificación, para invalidar cuando solo se conoce el external
+        self._identification_by_external = TTLCache(
+            maxsize=Config.JAVA_ID_CACHE_SIZE, ttl=Config.JAVA_ID_CACHE_TTL
+        )
+        self._negative_hits = 0
+        self._stats_lock = threading.Lock()
 
     def _get_headers(self, token=None):
         headers = {"Content-Type": "application/json"}
@@ -52,12 +89,13 @@ class JavaSyncService:
         """
         try:
             url = f"{self.base_url}/update"
-            response = requests.post(
+            response = self.http.post(
                 url,
+                operation="update_person_in_java",
                 json=data,
                 headers=self._get_headers(token),
-                timeout=self.timeout
             )
+            self.invalidate_identification(external_id=data.get("external"))
             
             if response.status_code == 200:
                 return response.json()
@@ -69,12 +107,51 @@ class JavaSyncService:
             return None
 
     def search_by_identification(self, identification, token):
-        """Busca persona por cédula/identificación en el microservicio Java."""
+        """
+        Busca persona por cédula/identificación en el microservicio Java.
+        Usa la caché de identificaciones (ver identification_cache_stats).
+        """
+        key = str(identification).strip()
+        cached = self.identification_cache.get(key)
+        if cached is not None:
+            if not cached["found"]:
+                with self._stats_lock:
+                    self._negative_hits += 1
+            return copy.deepcopy(cached)
+
+        result = self._fetch_by_identification(key, token)
+        if "error" not in result:
+            if result["found"]:
+                self.identification_cache.set(key, copy.deepcopy(result))
+                external = result["data"].get("external_id")
+                if external:
+                    self._identification_by_external.set(external, key)
+            else:
+                self.identification_cache.set(key, copy.deepcopy(result), ttl=self.negative_ttl)
+        return result
+
+    def invalidate_identification(self, identification=None, external_id=None):
+        """Quita de la caché a la persona tocada por nuestras propias escrituras en Java."""
+        if external_id:
+            mapped = self._identification_by_external.get(external_id)
+            self._identification_by_external.invalidate(external_id)
+            if mapped:
+                self.identification_cache.invalidate(mapped)
+        if identification:
+            self.identification_cache.invalidate(str(identification).strip())
+
+    def identification_cache_stats(self):
+        stats = self.identification_cache.stats()
+        with self._stats_lock:
+            stats["negative_hits"] = self._negative_hits
+        return stats
+
+    def _fetch_by_identification(self, identification, token):
         try:
-            response = requests.get(
+            response = self.http.get(
                 f"{self.base_url}/search_identification/{identification}",
+                operation="search_by_identification",
                 headers=self._get_headers(token),
-                timeout=self.timeout
             )
 
             if response.status_code == 200:
@@ -103,10 +180,10 @@ class JavaSyncService:
     def search_by_external(self, external_id, token):
         """Busca persona por external_id en el microservicio Java."""
         try:
-            response = requests.get(
+            response = self.http.get(
                 f"{self.base_url}/search/{external_id}",
+                operation="search_by_external",
                 headers=self._get_headers(token),
-                timeout=self.timeout
             )
 
             if response.status_code == 200:
@@ -145,12 +222,13 @@ class JavaSyncService:
                 "phono": data.get("phone", ""),
             }
 
-            response = requests.post(
+            response = self.http.post(
                 f"{self.base_url}/save",
+                operation="create_person",
                 json=java_payload,
                 headers=self._get_headers(token),
-                timeout=self.timeout
             )
+            self.invalidate_identification(identification=data.get("dni"))
 
             if response.status_code == 200:
                 result = response.json()
@@ -186,12 +264,13 @@ class JavaSyncService:
                 "password": data.get("password"),
             }
 
-            response = requests.post(
+            response = self.http.post(
                 f"{self.base_url}/save-account",
+                operation="create_person_with_account",
                 json=java_payload,
                 headers=self._get_headers(token),
-                timeout=self.timeout
             )
+            self.invalidate_identification(identification=data.get("dni"))
 
             if response.status_code == 200:
                 result = response.json()
@@ -225,11 +304,14 @@ class JavaSyncService:
                 "phono": data.get("phone", ""),
             }
 
-            response = requests.post(
+            response = self.http.post(
                 f"{self.base_url}/update",
+                operation="update_person",
                 json=java_payload,
                 headers=self._get_headers(token),
-                timeout=self.timeout
+            )
+            self.invalidate_identification(
+                identification=data.get("dni"), external_id=data.get("external_id")
             )
 
             if response.status_code == 200:
@@ -254,11 +336,13 @@ class JavaSyncService:
     def change_state(self, external_id, token):
         """Cambia el estado (activa/desactiva) de una persona en Java."""
         try:
-            response = requests.get(
+            response = self.http.get(
                 f"{self.base_url}/change_state/{external_id}",
+                operation="change_state",
+                idempotent=False,  # alterna el estado: no se reintenta
                 headers=self._get_headers(token),
-                timeout=self.timeout
             )
+            self.invalidate_identification(external_id=external_id)
 
             if response.status_code == 200:
                 result = response.json()
@@ -268,25 +352,38 @@ class JavaSyncService:
                     "message": result.get("message", "Estado cambiado en Java")
                 }
             elif response.status_code == 404:
-                return {"success": False, "error": "Persona no encontrada en Java"}
+                return {"success": False, "error": "Persona no encontrada en Java", "retryable": False}
             else:
                 result = response.json() if response.text else {}
                 return {
                     "success": False,
-                    "error": result.get("message", "Error al cambiar estado en Java")
+                    "error": result.get("message", "Error al cambiar estado en Java"),
+                    # 503: Java no atendió la petición; otro 5xx pudo haberla aplicado
+                    "retryable": response.status_code == 503,
                 }
 
         except requests.exceptions.RequestException as e:
             print(f"[JavaSync] Error conexión change_state: {e}")
-            return {"success": False, "error": str(e)}
+            return {"success": False, "error": str(e), "retryable": self._request_not_sent(e)}
+
+    def _request_not_sent(self, error):
+        """
+        True si la petición seguro no llegó a Java (circuito abierto, conexión
+        rechazada o timeout al conectar). Un timeout de lectura o una conexión
+        cortada después de enviar no permiten saber si Java la aplicó.
+        """
+        if isinstance(error, (CircuitOpenError, requests.exceptions.ConnectTimeout)):
+            return True
+        reason = getattr(error.args[0], "reason", None) if error.args else None
+        return isinstance(reason, NewConnectionError)
 
     def get_all_persons(self, token):
         """Obtiene todas las personas del microservicio Java."""
         try:
-            response = requests.get(
+            response = self.http.get(
                 f"{self.base_url}/all_filter",
+                operation="get_all_persons",
                 headers=self._get_headers(token),
-                timeout=self.timeout
             )
 
             if response.status_code == 200:
@@ -302,6 +399,22 @@ class JavaSyncService:
             print(f"[JavaSync] Error conexión get_all_persons: {e}")
             return {"success": False, "error": str(e)}
 
+    def iter_all_persons(self, token, chunk_size=64 * 1024):
+        """
+        Recorre /all_filter en streaming: entrega cada persona (formato de Java)
+        a medida que llega, sin cargar la lista completa en memoria.
+        Lanza requests.RequestException si Java no responde o responde con error.
+        """
+        response = self.http.get(
+            f"{self.base_url}/all_filter",
+            operation="iter_all_persons",
+            headers=self._get_headers(token),
+            stream=True,
+        )
+        with response:
+            response.raise_for_status()
+            yield from iter_json_array(response.iter_content(chunk_size=chunk_size))
+
     def _map_person_from_java(self, java_data):
         """Mapea datos de persona de Java a formato Python."""
         return {
@@ -0,0 +1,260 @@
+"""
+Búsqueda de participantes por DNI y nombre.
+En PostgreSQL usa índices GIN de pg_trgm (ver migrations/012 y 013);
+en otros motores (SQLite en pruebas) usa un trie en memoria con los sufijos de cada palabra.
+
+Ambos caminos coinciden igual: sin mayúsculas ni tildes, el DNI por subcadena y
+cada palabra buscada como subcadena del nombre completo (el mismo `%texto%` que
+usaba la búsqueda original; pg_trgm lo resuelve con el índice GIN).
+"""
+import threading
+import unicodedata
+
+from sqlalchemy import String, and_, event, false, func, literal, or_, select
+from sqlalchemy.orm import Session, object_session
+
+from app import db
+from app.models.participant import Participant
+
+
+def _normalize(text):
+    """Minúsculas y sin tildes: 'Núñez' -> 'nunez'."""
+    text = unicodedata.normalize("NFKD", str(text or "").lower())
+    return "".join(c for c in text if not unicodedata.combining(c))
+
+
+def _like_pattern(term):
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def _full_name_text(first_name, last_name):
+    # Igual que _full_name() en SQL: un nombre nulo cuenta como vacío
+    return f"{first_name or ''} {last_name or ''}"
+
+
+class PrefixTrie:
+    """Trie de prefijos: token -> ids de participantes que lo contienen."""
+
+    def __init__(self):
+        self.root = {}
+
+    def add(self, token, participant_id):
+        node = self.root
+        for char in token:
+            node = node.setdefault(char, {})
+            node.setdefault("$ids", set()).add(participant_id)
+
+    def ids_with_prefix(self, prefix):
+        node = self.root
+        for char in prefix:
+            node = node.get(char)
+            if node is None:
+                return set()
+        return node.get("$ids", set())
+
+    def add_suffixes(self, token, participant_id):
+        """Indexa cada sufijo: ids_with_prefix() pasa a buscar subcadenas del token."""
+        for start in range(len(token)):
+            self.add(token[start:], participant_id)
+
+
+class ParticipantSearchService:
+    """Autocompletado y filtros de participantes respaldados por índices."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._dirty = True
+        self._dni_trie = None
+        self._name_trie = None
+        self._rows = {}
+
+    # ---------- API pública ----------
+
+    def search(self, q, limit=10, field=None):
+        """Retorna participantes ordenados por relevancia para el texto q."""
+        q = str(q or "").strip()
+        if not q:
+            return []
+        if self._uses_trigram():
+            return self._search_trigram(q, limit, field)
+        return self._search_trie(q, limit, field)
+
+    def matching_ids(self, q, field=None):
+        """
+        Ids de participantes que coinciden con q, para usar en `Participant.id.in_(...)`.
+        En PostgreSQL es un subselect (se resuelve con los índices en la misma consulta).
+        """
+        q = str(q or "").strip()
+        if self._uses_trigram():
+            return select(Participant.id).where(self._trigram_condition(q, field))
+        return sorted(self._trie_matches(q, field))
+
+    def mark_dirty(self, *args):
+        self._dirty = True
+
+    # ---------- PostgreSQL (pg_trgm) ----------
+
+    def _uses_trigram(self):
+        return db.engine.dialect.name == "postgresql"
+
+    def _full_name(self):
+        # coalesce y no concat_ws: concat_ws no es IMMUTABLE y no sirve en un índice
+        return (
+            func.coalesce(Participant.firstName, "")
+            + literal(" ", String)
+            + func.coalesce(Participant.lastName, "")
+        )
+
+    def _normalized(self, expression):
+        # Equivale a _normalize(); debe coincidir con las expresiones de los índices
+        # ix_participant_dni_search_trgm e ix_participant_full_name_search_trgm
+        return func.f_unaccent(func.lower(expression))
+
+    def _trigram_condition(self, q, field):
+        terms = _normalize(q).split()
+        if not terms:
+            return false()
+        conditions = []
+        if field in (None, "dni"):
+            conditions.append(
+                self._normalized(Participant.dni).like(_like_pattern("".join(terms)), escape="\\")
+            )
+        if field in (None, "name"):
+            full_name = self._normalized(self._full_name())
+            conditions.append(
+                and_(*(full_name.like(_like_pattern(term), escape="\\") for term in terms))
+            )
+        return or_(*conditions)
+
+    def _search_trigram(self, q, limit, field):
+        normalized = _normalize(q)
+        score = func.greatest(
+            func.similarity(self._normalized(Participant.dni), normalized),
+            func.similarity(self._normalized(self._full_name()), normalized),
+        )
+        rows = (
+            db.session.query(
+                Participant.id,
+                Participant.external_id,
+                Participant.firstName,
+                Participant.lastName,
+                Participant.dni,
+                Participant.program,
+                Participant.status,
+                score.label("score"),
+            )
+            .filter(self._trigram_condition(q, field))
+            .order_by(score.desc(), Participant.lastName, Participant.id)
+            .limit(limit)
+            .all()
+        )
+        return [self._serialize(row, round(float(row.score), 4)) for row in rows]
+
+    # ---------- Trie en memoria (fallback) ----------
+
+    def _ensure_index(self):
+        if not self._dirty:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            # Se limpia antes de leer: un cambio concurrente vuelve a marcarlo
+            self._dirty = False
+            dni_trie, name_trie, rows = PrefixTrie(), PrefixTrie(), {}
+            query = db.session.query(
+                Participant.id,
+                Participant.external_id,
+                Participant.firstName,
+                Participant.lastName,
+                Participant.dni,
+                Participant.program,
+                Participant.status,
+            )
+            for row in query:
+                rows[row.id] = row
+                dni_trie.add_suffixes(_normalize(row.dni), row.id)
+                for token in _normalize(_full_name_text(row.firstName, row.lastName)).split():
+                    name_trie.add_suffixes(token, row.id)
+            self._dni_trie, self._name_trie, self._rows = dni_trie, name_trie, rows
+
+    def _trie_matches(self, q, field):
+        self._ensure_index()
+        terms = _normalize(q).split()
+        if not terms:
+            return set()
+        matches = set()
+        if field in (None, "dni"):
+            matches |= self._dni_trie.ids_with_prefix("".join(terms))
+        if field in (None, "name"):
+            name_ids = None
+            for term in terms:
+                ids = self._name_trie.ids_with_prefix(term)
+                name_ids = ids if name_ids is None else name_ids & ids
+            matches |= name_ids or set()
+        return matches
+
+    def _search_trie(self, q, limit, field):
+        normalized = _normalize(q)
+        compact = "".join(normalized.split())
+        scored = []
+        for participant_id in self._trie_matches(q, field):
+            row = self._rows[participant_id]
+            dni = _normalize(row.dni)
+            full_name = _normalize(_full_name_text(row.firstName, row.lastName))
+            # Proporción del texto buscado sobre el campo que coincidió (1.0 = exacto)
+            target = dni if compact in dni else full_name
+            score = round(min(len(normalized) / max(len(target), 1), 1.0), 4)
+            scored.append((score, row))
+        scored.sort(key=lambda item: (-item[0], item[1].lastName, item[1].id))
+        return [self._serialize(row, score) for score, row in scored[:limit]]
+
+    def _serialize(self, row, score):
+        return {
+            "external_id": row.external_id,
+            "firstName": row.firstName,
+            "lastName": row.lastName,
+            "dni": row.dni,
+            "program": row.program,
+            "status": row.status,
+            "score": score,
+        }
+
+
+# Instancia global del servicio
+participant_search = ParticipantSearchService()
+
+_DIRTY_KEY = "participant_search_dirty"
+
+
+def _touch(session):
+    """Invalida el trie ahora y otra vez al confirmar (lo leído antes del commit es viejo)."""
+    participant_search.mark_dirty()
+    if session is not None:
+        session.info[_DIRTY_KEY] = True
+
+
+def _on_participant_flush(mapper, connection, target):
+    _touch(object_session(target))
+
+
+def _on_execute(orm_execute_state):
+    # INSERT/UPDATE/DELETE de Core o masivos (executemany, Query.update) no
+    # disparan los eventos del mapper
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    table = getattr(orm_execute_state.statement, "table", None)
+    if getattr(table, "name", None) == Participant.__tablename__:
+        _touch(orm_execute_state.session)
+
+
+def _on_commit(session):
+    if session.info.pop(_DIRTY_KEY, False):
+        participant_search.mark_dirty()
+
+
+# Cualquier cambio de participantes invalida el trie en memoria
+for _event in ("after_insert", "after_update", "after_delete"):
+    event.listen(Participant, _event, _on_participant_flush)
+event.listen(Session, "do_orm_execute", _on_execute)
+event.listen(Session, "after_commit", _on_commit)
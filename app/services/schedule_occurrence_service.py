@@ -0,0 +1,206 @@
+"""
+Motor de ocurrencias de horarios.
+Expande reglas recurrentes (dayOfWeek + startDate/endDate) y sesiones de fecha
+específica en instancias concretas (fecha, inicio, fin) desde un índice en
+memoria, y detecta solapamientos con un índice de intervalos que se arma solo
+con los horarios del programa y la ubicación del candidato.
+"""
+import bisect
+import threading
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+from sqlalchemy import event, or_
+
+from app import db
+from app.models.schedule import Schedule
+
+# 0=Lunes ... 6=Domingo (date.weekday()); se aceptan nombres en inglés y español
+WEEKDAYS = {
+    "MONDAY": 0, "LUNES": 0,
+    "TUESDAY": 1, "MARTES": 1,
+    "WEDNESDAY": 2, "MIERCOLES": 2, "MIÉRCOLES": 2,
+    "THURSDAY": 3, "JUEVES": 3,
+    "FRIDAY": 4, "VIERNES": 4,
+    "SATURDAY": 5, "SABADO": 5, "SÁBADO": 5,
+    "SUNDAY": 6, "DOMINGO": 6,
+}
+
+
+def _minutes(hhmm):
+    hours, minutes = str(hhmm).split(":")[:2]
+    return int(hours) * 60 + int(minutes)
+
+
+class ScheduleRule:
+    """Regla normalizada de un horario: días, rango de fechas e intervalo de minutos."""
+
+    __slots__ = (
+        "id", "external_id", "name", "program", "location",
+        "weekday", "specific_date", "start_date", "end_date",
+        "start", "end", "start_time", "end_time",
+    )
+
+    def __init__(self, schedule_id, external_id, name, program, location, day_of_week,
+                 specific_date, start_date, end_date, start_time, end_time):
+        self.id = schedule_id
+        self.external_id = external_id
+        self.name = name
+        self.program = program
+        self.location = location or None
+        self.specific_date = specific_date
+        self.weekday = (
+            specific_date.weekday() if specific_date
+            else WEEKDAYS.get(str(day_of_week or "").upper())
+        )
+        self.start_date = specific_date or start_date
+        self.end_date = specific_date or end_date
+        self.start_time = start_time
+        self.end_time = end_time
+        self.start = _minutes(start_time)
+        self.end = _minutes(end_time)
+
+    @classmethod
+    def from_schedule(cls, s):
+        return cls(
+            s.id, s.external_id, s.name, s.program, s.location, s.dayOfWeek,
+            s.specificDate, s.startDate, s.endDate, s.startTime, s.endTime,
+        )
+
+    def dates(self, window_start, window_end):
+        """Fechas en las que ocurre la regla dentro de [window_start, window_end]."""
+        if self.weekday is None:
+            return
+        first = max(window_start, self.start_date) if self.start_date else window_start
+        last = min(window_end, self.end_date) if self.end_date else window_end
+        if first > last:
+            return
+        current = first + timedelta(days=(self.weekday - first.weekday()) % 7)
+        while current <= last:
+            yield current
+            current += timedelta(days=7)
+
+    def shares_a_date_with(self, other):
+        """True si ambas reglas ocurren al menos un mismo día."""
+        if self.weekday is None or self.weekday != other.weekday:
+            return False
+        starts = [d for d in (self.start_date, other.start_date) if d]
+        ends = [d for d in (self.end_date, other.end_date) if d]
+        if not starts or not ends:
+            # Con un extremo abierto siempre existe un día común de la semana
+            return True
+        return next(self.dates(max(starts), min(ends)), None) is not None
+
+
+class IntervalIndex:
+    """Intervalos de un (programa, ubicación) por día de la semana, ordenados por inicio."""
+
+    def __init__(self):
+        self._starts = defaultdict(list)
+        self._rules = defaultdict(list)
+
+    def add(self, rule):
+        if rule.weekday is None:
+            return
+        position = bisect.bisect_right(self._starts[rule.weekday], rule.start)
+        self._starts[rule.weekday].insert(position, rule.start)
+        self._rules[rule.weekday].insert(position, rule)
+
+    def overlapping(self, rule):
+        """Reglas cuyo horario se cruza con `rule` en alguna fecha común."""
+        if rule.weekday is None:
+            return []
+        # Solo los intervalos que empiezan antes de que termine el candidato
+        limit = bisect.bisect_left(self._starts[rule.weekday], rule.end)
+        return [
+            other
+            for other in self._rules[rule.weekday][:limit]
+            if other.end > rule.start
+            and other.id != rule.id
+            and rule.shares_a_date_with(other)
+        ]
+
+
+class ScheduleOccurrenceService:
+    """Expande horarios activos y detecta solapamientos usando índices en memoria."""
+
+    REFRESH_SECONDS = 30
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._dirty = True
+        self._built_at = 0
+        self._rules = []
+        self._indexes = {}
+
+    def mark_dirty(self, *args):
+        self._dirty = True
+
+    def _active_rules(self, *criteria):
+        # Método interno: reglas de los horarios activos que cumplen `criteria`
+        rows = db.session.query(
+            Schedule.id, Schedule.external_id, Schedule.name, Schedule.program,
+            Schedule.location, Schedule.dayOfWeek, Schedule.specificDate,
+            Schedule.startDate, Schedule.endDate, Schedule.startTime, Schedule.endTime,
+        ).filter(Schedule.status == "active", *criteria)
+        rules = []
+        for row in rows:
+            try:
+                rules.append(ScheduleRule(*row))
+            except (ValueError, TypeError):
+                continue
+        return rules
+
+    def _ensure_index(self):
+        # Se reconstruye si hubo cambios en este proceso o si el índice es antiguo
+        # (otros workers de gunicorn pueden haber modificado horarios).
+        stale = time.monotonic() - self._built_at > self.REFRESH_SECONDS
+        if not (self._dirty or stale):
+            return
+        with self._lock:
+            self._dirty = False
+            rules, indexes = self._active_rules(), defaultdict(IntervalIndex)
+            for rule in rules:
+                indexes[(rule.program, rule.location)].add(rule)
+            self._rules, self._indexes = rules, indexes
+            self._built_at = time.monotonic()
+
+    def occurrences(self, window_start, window_end, program=None):
+        """Instancias (fecha, inicio, fin) de los horarios activos en la ventana."""
+        self._ensure_index()
+        result = []
+        for rule in self._rules:
+            if program and rule.program != program:
+                continue
+            for day in rule.dates(window_start, window_end):
+                result.append((day, rule))
+        result.sort(key=lambda item: (item[0], item[1].start, item[1].name))
+        return result
+
+    def find_overlaps(self, candidate):
+        """
+        Horarios activos que se solapan con `candidate` (ScheduleRule).
+        Mismo programa; si ambos tienen ubicación, solo choca la misma ubicación.
+        Se valida antes de escribir, así que no usa el índice en memoria (puede
+        estar desactualizado respecto de otros workers): consulta solo los
+        horarios del programa y la ubicación del candidato.
+        """
+        criteria = [Schedule.program == candidate.program]
+        if candidate.location:
+            criteria.append(or_(
+                Schedule.location == candidate.location,
+                Schedule.location.is_(None),
+                Schedule.location == "",
+            ))
+        index = IntervalIndex()
+        for rule in self._active_rules(*criteria):
+            index.add(rule)
+        return index.overlapping(candidate)
+
+# Instancia global del servicio
+schedule_occurrences = ScheduleOccurrenceService()
+
+# Cualquier cambio de horarios invalida el índice en memoria
+for _event in ("after_insert", "after_update", "after_delete"):
+    event.listen(Schedule, _event, schedule_occurrences.mark_dirty)
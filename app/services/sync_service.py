@@ -0,0 +1,49 @@
+"""
+Soporte de sincronización para clientes offline.
+Las filas modificadas se detectan por `updated_at`; las eliminadas quedan
+registradas en `sync_tombstone` para que el cliente pueda borrarlas.
+"""
+from datetime import datetime
+
+from sqlalchemy import event
+
+from app import db
+from app.models.attendance import Attendance
+from app.models.participant import Participant
+from app.models.schedule import Schedule
+from app.models.syncTombstone import SyncTombstone
+
+ENTITIES = {Attendance: "attendance", Participant: "participant", Schedule: "schedule"}
+
+
+def record_tombstones(entity, external_ids):
+    """
+    Registra eliminaciones hechas con DELETE masivo (no disparan eventos del ORM).
+    No hace commit: usa la transacción actual.
+    """
+    external_ids = list(external_ids)
+    if not external_ids:
+        return
+    deleted_at = datetime.utcnow()
+    db.session.execute(
+        SyncTombstone.__table__.insert(),
+        [
+            {"entity": entity, "external_id": external_id, "deleted_at": deleted_at}
+            for external_id in external_ids
+        ],
+    )
+
+
+def _record_deleted_row(mapper, connection, target):
+    connection.execute(
+        SyncTombstone.__table__.insert().values(
+            entity=ENTITIES[mapper.class_],
+            external_id=target.external_id,
+            deleted_at=datetime.utcnow(),
+        )
+    )
+
+
+# Las eliminaciones vía ORM (db.session.delete) dejan su tombstone automáticamente
+for _model in ENTITIES:
+    event.listen(_model, "after_delete", _record_deleted_row)
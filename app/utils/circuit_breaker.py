@@ -0,0 +1,98 @@
+"""
+Circuit breaker para servicios externos (estado compartido entre hilos).
+
+CLOSED    -> las llamadas pasan; N fallas seguidas lo abren.
+OPEN      -> las llamadas fallan de inmediato durante reset_timeout segundos.
+HALF_OPEN -> se permiten hasta `half_open_probes` llamadas de prueba: si una
+             tiene éxito se cierra, si falla vuelve a abrirse.
+
+El estado es por proceso: cada worker de gunicorn tiene su propio breaker.
+"""
+import threading
+import time
+
+import requests
+
+CLOSED = "CLOSED"
+OPEN = "OPEN"
+HALF_OPEN = "HALF_OPEN"
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """Llamada rechazada sin salir a la red porque el circuito está abierto."""
+
+
+class CircuitBreaker:
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30, half_open_probes=1,
+                 clock=time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_probes = half_open_probes
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = None
+        self._probes = 0
+        self.rejected = 0
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self):
+        if self._state == OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+            self._state, self._probes = HALF_OPEN, 0
+        return self._state
+
+    def allow(self):
+        """True si la llamada puede salir; en HALF_OPEN reserva una de las pruebas."""
+        with self._lock:
+            state = self._current_state()
+            if state == CLOSED:
+                return True
+            if state == HALF_OPEN and self._probes < self.half_open_probes:
+                self._probes += 1
+                return True
+            self.rejected += 1
+            return False
+
+    def available(self):
+        """True si una llamada no sería rechazada (sin reservar pruebas)."""
+        with self._lock:
+            state = self._current_state()
+            return state == CLOSED or (state == HALF_OPEN and self._probes < self.half_open_probes)
+
+    def record_success(self):
+        with self._lock:
+            self._state, self._failures, self._opened_at, self._probes = CLOSED, 0, None, 0
+
+    def reset(self):
+        with self._lock:
+            self._state, self._failures, self._opened_at, self._probes = CLOSED, 0, None, 0
+            self.rejected = 0
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._current_state() == HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state, self._opened_at, self._probes = OPEN, self._clock(), 0
+
+    def snapshot(self):
+        with self._lock:
+            state = self._current_state()
+            retry_in = (
+                round(max(self.reset_timeout - (self._clock() - self._opened_at), 0), 1)
+                if state == OPEN else None
+            )
+            return {
+                "name": self.name,
+                "state": state,
+                "consecutive_failures": self._failures,
+                "failure_threshold": self.failure_threshold,
+                "retry_in_seconds": retry_in,
+                "rejected": self.rejected,
+            }
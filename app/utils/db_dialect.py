@@ -0,0 +1,10 @@
+from app import db
+
+
+def dialect_insert(model):
+    """INSERT con soporte de ON CONFLICT según el motor (PostgreSQL o SQLite en pruebas)."""
+    if db.engine.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(model)
@@ -0,0 +1,145 @@
+"""
+Cliente HTTP con pool de conexiones keep-alive, timeouts y reintentos acotados.
+Cada hilo usa su propia requests.Session, pero todas comparten el mismo
+HTTPAdapter (y por lo tanto el mismo pool de urllib3, que es seguro entre hilos).
+"""
+import threading
+import time
+from collections import defaultdict, deque
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from app.utils.circuit_breaker import CircuitOpenError
+
+# Códigos que justifican reintentar una llamada idempotente
+RETRY_STATUSES = frozenset({502, 503, 504})
+
+
+class LatencyMetrics:
+    """Latencias por operación: llamadas, errores, reintentos y percentiles recientes."""
+
+    def __init__(self, window=256):
+        self._window = window
+        self._lock = threading.Lock()
+        self._ops = defaultdict(self._empty)
+
+    def _empty(self):
+        return {
+            "calls": 0, "errors": 0, "retries": 0, "total_ms": 0.0, "max_ms": 0.0,
+            "recent": deque(maxlen=self._window),
+        }
+
+    def record(self, operation, elapsed_ms, error=False, retries=0):
+        with self._lock:
+            op = self._ops[operation]
+            op["calls"] += 1
+            op["errors"] += int(error)
+            op["retries"] += retries
+            op["total_ms"] += elapsed_ms
+            op["max_ms"] = max(op["max_ms"], elapsed_ms)
+            op["recent"].append(elapsed_ms)
+
+    def snapshot(self):
+        with self._lock:
+            result = {}
+            for name, op in self._ops.items():
+                recent = sorted(op["recent"])
+                result[name] = {
+                    "calls": op["calls"],
+                    "errors": op["errors"],
+                    "retries": op["retries"],
+                    "avg_ms": round(op["total_ms"] / op["calls"], 2) if op["calls"] else 0,
+                    "p50_ms": round(recent[len(recent) // 2], 2) if recent else 0,
+                    "p95_ms": (
+                        round(recent[min(len(recent) - 1, int(len(recent) * 0.95))], 2)
+                        if recent else 0
+                    ),
+                    "max_ms": round(op["max_ms"], 2),
+                }
+            return result
+
+    def reset(self):
+        with self._lock:
+            self._ops.clear()
+
+
+class PooledHttpClient:
+    """
+    Sesiones HTTP compartidas para un servicio externo.
+    Solo las llamadas marcadas como idempotentes se reintentan (errores de
+    conexión, timeouts y 502/503/504) con backoff exponencial. Con un
+    CircuitBreaker, cada llamada (con sus reintentos) cuenta como un éxito o una
+    falla, y mientras el circuito está abierto se lanza CircuitOpenError.
+    """
+
+    def __init__(self, pool_size=10, connect_timeout=2, read_timeout=5,
+                 retries=2, backoff=0.2, breaker=None):
+        self.timeout = (connect_timeout, read_timeout)
+        self.breaker = breaker
+        self.retries = retries
+        self.backoff = backoff
+        self.metrics = LatencyMetrics()
+        # Los reintentos los controla request(): urllib3 no sabe qué llamadas son idempotentes
+        self._adapter = HTTPAdapter(pool_maxsize=pool_size, max_retries=0)
+        self._local = threading.local()
+
+    @property
+    def session(self):
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            session.mount("http://", self._adapter)
+            session.mount("https://", self._adapter)
+            self._local.session = session
+        return session
+
+    def get(self, url, operation, idempotent=True, **kwargs):
+        return self.request("GET", url, operation, idempotent=idempotent, **kwargs)
+
+    def post(self, url, operation, idempotent=False, **kwargs):
+        return self.request("POST", url, operation, idempotent=idempotent, **kwargs)
+
+    def request(self, method, url, operation, idempotent=False, **kwargs):
+        """Ejecuta la llamada y registra su latencia total (incluidos los reintentos)."""
+        started = time.perf_counter()
+        if self.breaker and not self.breaker.allow():
+            self._record(operation, started, True, 0)
+            raise CircuitOpenError(f"Circuito {self.breaker.name} abierto: llamada rechazada")
+
+        kwargs.setdefault("timeout", self.timeout)
+        attempts = 1 + (self.retries if idempotent else 0)
+        healthy = False
+        try:
+            for attempt in range(attempts):
+                last_attempt = attempt == attempts - 1
+                try:
+                    response = self.session.request(method, url, **kwargs)
+                except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                    if last_attempt:
+                        self._record(operation, started, True, attempt)
+                        raise
+                else:
+                    if response.status_code not in RETRY_STATUSES or last_attempt:
+                        healthy = response.status_code < 500
+                        self._record(operation, started, not healthy, attempt)
+                        return response
+                    response.close()
+                time.sleep(self.backoff * (2 ** attempt))
+        finally:
+            # Cualquier desenlace libera la prueba reservada en HALF_OPEN
+            if self.breaker:
+                if healthy:
+                    self.breaker.record_success()
+                else:
+                    self.breaker.record_failure()
+
+    def _record(self, operation, started, error, retries):
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self.metrics.record(operation, elapsed_ms, error=error, retries=retries)
+
+    def stats(self):
+        return self.metrics.snapshot()
+
+    def circuit(self):
+        return self.breaker.snapshot() if self.breaker else None
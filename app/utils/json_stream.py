@@ -0,0 +1,77 @@
+"""
+Lectura incremental de un arreglo JSON de nivel superior ([{...}, {...}, ...]).
+Entrega cada elemento en cuanto llega completo, sin cargar el documento entero:
+la memoria queda acotada por el tamaño del elemento más grande más un bloque.
+"""
+import codecs
+import json
+
+_WHITESPACE = " \t\r\n"
+
+
+def iter_json_array(chunks):
+    """
+    Genera los elementos del arreglo JSON leído desde `chunks` (iterable de bytes
+    o str, por ejemplo response.iter_content()). Lanza ValueError si el
+    documento no es un arreglo o está truncado.
+    """
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    chunks = iter(chunks)
+    buffer, pos, exhausted = "", 0, False
+
+    def read_more():
+        nonlocal buffer, pos, exhausted
+        for chunk in chunks:
+            text = utf8.decode(chunk) if isinstance(chunk, bytes) else chunk
+            if text:
+                # Se descarta lo ya consumido para no acumular el documento
+                buffer, pos = buffer[pos:] + text, 0
+                return True
+        tail = utf8.decode(b"", final=True)
+        buffer, pos = buffer[pos:] + tail, 0
+        exhausted = True
+        return bool(tail)
+
+    def next_char():
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+                pos += 1
+            if pos < len(buffer):
+                return buffer[pos]
+            if exhausted or not read_more():
+                return None
+
+    if next_char() != "[":
+        raise ValueError("Se esperaba un arreglo JSON")
+    pos += 1
+    expect_value = True
+    while True:
+        char = next_char()
+        if char is None:
+            raise ValueError("Arreglo JSON truncado")
+        if char == "]":
+            return
+        if char == ",":
+            if expect_value:
+                raise ValueError(f"Coma inesperada en la posición {pos}")
+            pos += 1
+            expect_value = True
+            continue
+        if not expect_value:
+            raise ValueError(f"Se esperaba ',' o ']' en la posición {pos}")
+        try:
+            value, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            if exhausted:
+                raise ValueError("Arreglo JSON truncado")
+            read_more()
+            continue
+        if end == len(buffer) and not exhausted:
+            # Un número al final del bloque podría continuar en el siguiente
+            read_more()
+            continue
+        pos = end
+        expect_value = False
+        yield value
@@ -0,0 +1,21 @@
+from datetime import date, datetime
+from app.utils.constants.message import DATE_FORMAT, ERROR_DATE_FORMAT
+
+
+def parse_attendance_date(value):
+    """Convierte 'YYYY-MM-DD' a date. Retorna (fecha, error)."""
+    if not value:
+        return None, None
+
+    if isinstance(value, date):
+        return value, None
+
+    try:
+        return datetime.strptime(str(value).strip(), DATE_FORMAT).date(), None
+    except ValueError:
+        return None, ERROR_DATE_FORMAT
+
+
+def format_date(value):
+    """Serializa una fecha como 'YYYY-MM-DD' (None si no hay fecha)."""
+    return value.isoformat() if value else None
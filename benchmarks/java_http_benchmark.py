@@ -0,0 +1,61 @@
+"""
+Benchmark del cliente HTTP del API de personas: requests.get por llamada
+(una conexión TCP nueva cada vez) vs. el PooledHttpClient compartido.
+
+Levanta un servidor falso local (keep-alive) y reporta llamadas/segundo,
+latencias y cuántas conexiones TCP aceptó el servidor en cada caso.
+
+Uso:
+    python -m benchmarks.java_http_benchmark --calls 2000 --workers 8
+"""
+import argparse
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from app.utils.http_client import PooledHttpClient
+from tests.test_unitarios.fake_person_api import FakePersonApi
+
+PERSON = {"external": "java-1", "identification": "1104567891", "first_name": "Ana"}
+
+
+def run(label, api, call, calls, workers):
+    api.connections = 0
+    url = f"{api.base_url}/search_identification/1104567891"
+
+    def timed(_):
+        started = time.perf_counter()
+        call(url).raise_for_status()
+        return (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        latencies = sorted(pool.map(timed, range(calls)))
+    elapsed = time.perf_counter() - started
+    print(
+        f"{label:8s}: {calls / elapsed:7.0f} llamadas/s, "
+        f"p50 {statistics.median(latencies):.2f} ms, "
+        f"p95 {latencies[int(len(latencies) * 0.95) - 1]:.2f} ms, "
+        f"conexiones TCP {api.connections}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=2000)
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+
+    api = FakePersonApi({"1104567891": PERSON}).start()
+    pooled = PooledHttpClient(pool_size=args.workers)
+    try:
+        run("requests", api, lambda url: requests.get(url, timeout=5), args.calls, args.workers)
+        run("pool", api, lambda url: pooled.get(url, operation="search"), args.calls, args.workers)
+    finally:
+        api.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Benchmark del listado de participantes: objetos del ORM vs. filas Core proyectadas.
+
+Inserta N participantes temporales en el PostgreSQL configurado en .env, mide la
+serialización de ambos enfoques (lo que hacía get_users antes y lo que hace ahora)
+y al terminar elimina los datos creados.
+
+Uso:
+    python -m benchmarks.users_listing_benchmark --participants 50000 --rounds 3
+"""
+import argparse
+import statistics
+import time
+import tracemalloc
+import uuid
+
+from sqlalchemy import select
+
+from app import create_app, db
+from app.controllers.usercontroller import UserController
+from app.models import Participant
+
+FIELDS = UserController.USER_LIST_DEFAULT_FIELDS
+
+
+def seed(participants):
+    tag = uuid.uuid4().hex[:6]
+    rows = [
+        {
+            "external_id": str(uuid.uuid4()), "firstName": "Bench", "lastName": f"P{i}",
+            "age": 20, "dni": f"8{tag[:3]}{i:06d}"[:10], "address": "bench " * 20,
+            "status": "ACTIVO", "type": "EXTERNO", "program": "FUNCIONAL",
+        }
+        for i in range(participants)
+    ]
+    for start in range(0, len(rows), 5000):
+        db.session.bulk_insert_mappings(Participant, rows[start:start + 5000])
+    db.session.commit()
+    return [r["dni"] for r in rows]
+
+
+def cleanup(dnis):
+    for start in range(0, len(dnis), 5000):
+        Participant.query.filter(Participant.dni.in_(dnis[start:start + 5000])).delete(
+            synchronize_session=False
+        )
+    db.session.commit()
+
+
+def orm_listing():
+    return [{name: getattr(p, name) for name in FIELDS} for p in Participant.query.all()]
+
+
+def core_listing():
+    columns = [UserController.USER_LIST_FIELDS[name].label(name) for name in FIELDS]
+    return [dict(row._mapping) for row in db.session.execute(select(*columns))]
+
+
+def measure(label, fn, rounds):
+    timings, peaks = [], []
+    for _ in range(rounds):
+        db.session.expunge_all()
+        tracemalloc.start()
+        started = time.perf_counter()
+        rows = fn()
+        timings.append(time.perf_counter() - started)
+        peaks.append(tracemalloc.get_traced_memory()[1] / 1024 / 1024)
+        tracemalloc.stop()
+    print(
+        f"{label:5s}: {len(rows)} filas, mediana {statistics.median(timings) * 1000:.0f} ms, "
+        f"pico de memoria {max(peaks):.1f} MB"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--participants", type=int, default=50000)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        db.engine.echo = False
+        dnis = seed(args.participants)
+        try:
+            measure("ORM", orm_listing, args.rounds)
+            measure("Core", core_listing, args.rounds)
+        finally:
+            cleanup(dnis)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 from app import create_app
+from app.routes.auth_routes import health as api_health
 from flask import jsonify
 
 app = create_app()
@@ -9,7 +10,8 @@ def home():
 
 @app.route("/health")
 def health():
-    return {"status": "ok"}, 200
+    # Mismo reporte que /api/health (incluye el estado del circuito de Java)
+    return api_health()
 
 if __name__ == "__main__":
    app.run(port=5000)
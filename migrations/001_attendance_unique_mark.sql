@@ -0,0 +1,19 @@
+-- Un solo registro de asistencia por (participante, horario, fecha).
+-- Necesario para el INSERT ... ON CONFLICT de register_bulk_attendance.
+-- db.create_all() solo crea tablas nuevas: ejecutar este script en bases existentes.
+
+BEGIN;
+
+-- Conservar el registro más reciente de cada duplicado
+DELETE FROM attendance a
+USING attendance b
+WHERE a.participant_id = b.participant_id
+  AND a.schedule_id = b.schedule_id
+  AND a.date = b.date
+  AND a.id < b.id;
+
+ALTER TABLE attendance
+    ADD CONSTRAINT uq_attendance_participant_schedule_date
+    UNIQUE (participant_id, schedule_id, date);
+
+COMMIT;
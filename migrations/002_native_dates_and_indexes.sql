@@ -0,0 +1,24 @@
+-- Fechas nativas (DATE) para asistencias y horarios + índices compuestos.
+-- Los valores existentes tienen formato 'YYYY-MM-DD'; cadenas vacías pasan a NULL.
+
+BEGIN;
+
+ALTER TABLE attendance
+    ALTER COLUMN date TYPE DATE USING date::date;
+
+ALTER TABLE schedule
+    ALTER COLUMN "specificDate" TYPE DATE USING NULLIF("specificDate", '')::date,
+    ALTER COLUMN "startDate" TYPE DATE USING NULLIF("startDate", '')::date,
+    ALTER COLUMN "endDate" TYPE DATE USING NULLIF("endDate", '')::date;
+
+CREATE INDEX IF NOT EXISTS ix_attendance_schedule_date
+    ON attendance (schedule_id, date);
+CREATE INDEX IF NOT EXISTS ix_attendance_participant_date
+    ON attendance (participant_id, date);
+CREATE INDEX IF NOT EXISTS ix_attendance_participant_status
+    ON attendance (participant_id, status);
+
+COMMIT;
+
+ANALYZE attendance;
+ANALYZE schedule;
@@ -0,0 +1,11 @@
+-- Búsqueda de participantes con índices de trigramas (pg_trgm).
+-- Permite ILIKE '%texto%' y similarity() sin recorrer toda la tabla.
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX IF NOT EXISTS ix_participant_dni_trgm
+    ON participant USING gin (dni gin_trgm_ops);
+
+-- La expresión debe coincidir con ParticipantSearchService._full_name()
+CREATE INDEX IF NOT EXISTS ix_participant_full_name_trgm
+    ON participant USING gin (("firstName" || ' ' || "lastName") gin_trgm_ops);
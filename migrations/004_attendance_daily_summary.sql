@@ -0,0 +1,32 @@
+-- Resumen diario de asistencias por sesión (horario + fecha).
+-- La aplicación lo mantiene en cada registro/eliminación de asistencias;
+-- este script crea la tabla y la llena con los datos existentes.
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS attendance_daily_summary (
+    schedule_id INTEGER NOT NULL REFERENCES schedule (id),
+    date DATE NOT NULL,
+    present INTEGER NOT NULL DEFAULT 0,
+    absent INTEGER NOT NULL DEFAULT 0,
+    total INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP NOT NULL DEFAULT now(),
+    PRIMARY KEY (schedule_id, date)
+);
+
+CREATE INDEX IF NOT EXISTS ix_attendance_daily_summary_date
+    ON attendance_daily_summary (date);
+
+DELETE FROM attendance_daily_summary;
+
+INSERT INTO attendance_daily_summary (schedule_id, date, present, absent, total, updated_at)
+SELECT schedule_id,
+       date,
+       SUM(CASE WHEN status = 'present' THEN 1 ELSE 0 END),
+       SUM(CASE WHEN status = 'absent' THEN 1 ELSE 0 END),
+       COUNT(id),
+       now()
+FROM attendance
+GROUP BY schedule_id, date;
+
+COMMIT;
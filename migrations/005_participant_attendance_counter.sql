@@ -0,0 +1,24 @@
+-- Contadores de asistencia por participante (total y presentes).
+-- La aplicación los mantiene en cada registro/eliminación de asistencias;
+-- también se pueden reconstruir con: flask rebuild-attendance-summaries
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS participant_attendance_counter (
+    participant_id INTEGER PRIMARY KEY REFERENCES participant (id),
+    total INTEGER NOT NULL DEFAULT 0,
+    present INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP NOT NULL DEFAULT now()
+);
+
+DELETE FROM participant_attendance_counter;
+
+INSERT INTO participant_attendance_counter (participant_id, total, present, updated_at)
+SELECT participant_id,
+       COUNT(id),
+       SUM(CASE WHEN status = 'present' THEN 1 ELSE 0 END),
+       now()
+FROM attendance
+GROUP BY participant_id;
+
+COMMIT;
@@ -0,0 +1,34 @@
+-- Sincronización offline: marca de última modificación en horarios, participantes
+-- y asistencias, registro de eliminaciones (tombstones) y claves de idempotencia
+-- de las marcas subidas por los clientes.
+
+BEGIN;
+
+ALTER TABLE schedule ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP NOT NULL DEFAULT now();
+ALTER TABLE participant ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP NOT NULL DEFAULT now();
+ALTER TABLE attendance ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP NOT NULL DEFAULT now();
+
+CREATE INDEX IF NOT EXISTS ix_schedule_updated_at ON schedule (updated_at);
+CREATE INDEX IF NOT EXISTS ix_participant_updated_at ON participant (updated_at);
+CREATE INDEX IF NOT EXISTS ix_attendance_updated_at ON attendance (updated_at);
+
+CREATE TABLE IF NOT EXISTS sync_tombstone (
+    id SERIAL PRIMARY KEY,
+    entity VARCHAR(20) NOT NULL,
+    external_id VARCHAR(36) NOT NULL,
+    deleted_at TIMESTAMP NOT NULL DEFAULT now()
+);
+CREATE INDEX IF NOT EXISTS ix_sync_tombstone_deleted_at ON sync_tombstone (deleted_at);
+
+CREATE TABLE IF NOT EXISTS attendance_sync_receipt (
+    idempotency_key VARCHAR(64) PRIMARY KEY,
+    schedule_id INTEGER NOT NULL REFERENCES schedule (id),
+    participant_id INTEGER NOT NULL REFERENCES participant (id),
+    date DATE NOT NULL,
+    status VARCHAR(20) NOT NULL,
+    received_at TIMESTAMP NOT NULL DEFAULT now()
+);
+CREATE INDEX IF NOT EXISTS ix_attendance_sync_receipt_received_at
+    ON attendance_sync_receipt (received_at);
+
+COMMIT;
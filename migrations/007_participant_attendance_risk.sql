@@ -0,0 +1,21 @@
+-- Riesgo de abandono por participante: racha actual, última asistencia y tasa
+-- de los últimos 30 días. La tabla se llena con: flask compute-attendance-risk
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS participant_attendance_risk (
+    participant_id INTEGER PRIMARY KEY REFERENCES participant (id),
+    streak_status VARCHAR(20) NOT NULL,
+    streak_length INTEGER NOT NULL DEFAULT 0,
+    last_attended DATE,
+    present_30d INTEGER NOT NULL DEFAULT 0,
+    total_30d INTEGER NOT NULL DEFAULT 0,
+    attendance_rate_30d DOUBLE PRECISION,
+    risk_score DOUBLE PRECISION NOT NULL DEFAULT 0,
+    computed_at TIMESTAMP NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS ix_participant_attendance_risk_score
+    ON participant_attendance_risk (risk_score);
+
+COMMIT;
@@ -0,0 +1,30 @@
+-- Inscripciones participante <-> horario con rango de fechas vigente.
+-- Carga inicial: quienes tienen asistencias en un horario activo quedan inscritos
+-- desde su primera marca (se puede ajustar luego desde la API).
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS enrollment (
+    id SERIAL PRIMARY KEY,
+    external_id VARCHAR(36) NOT NULL UNIQUE,
+    participant_id INTEGER NOT NULL REFERENCES participant (id),
+    schedule_id INTEGER NOT NULL REFERENCES schedule (id),
+    start_date DATE NOT NULL,
+    end_date DATE,
+    updated_at TIMESTAMP NOT NULL DEFAULT now(),
+    CONSTRAINT uq_enrollment_participant_schedule_start
+        UNIQUE (participant_id, schedule_id, start_date)
+);
+
+CREATE INDEX IF NOT EXISTS ix_enrollment_schedule_dates
+    ON enrollment (schedule_id, start_date, end_date);
+
+INSERT INTO enrollment (external_id, participant_id, schedule_id, start_date)
+SELECT md5(random()::text || a.participant_id || '-' || a.schedule_id)::uuid::text,
+       a.participant_id, a.schedule_id, MIN(a.date)
+FROM attendance a
+JOIN schedule s ON s.id = a.schedule_id AND s.status = 'active'
+GROUP BY a.participant_id, a.schedule_id
+ON CONFLICT DO NOTHING;
+
+COMMIT;
@@ -0,0 +1,26 @@
+-- Outbox de sincronización con el API de personas (Java): los cambios de perfil
+-- y de estado se encolan en la misma transacción que el cambio local y los
+-- entrega un worker (hilos de la app o: flask java-outbox-worker)
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS java_sync_outbox (
+    id SERIAL PRIMARY KEY,
+    operation VARCHAR(30) NOT NULL,
+    entity_external_id VARCHAR(36) NOT NULL,
+    coalesce_key VARCHAR(80) NOT NULL,
+    payload JSON NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'PENDING',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at TIMESTAMP NOT NULL DEFAULT now(),
+    last_error TEXT,
+    created_at TIMESTAMP NOT NULL DEFAULT now(),
+    updated_at TIMESTAMP NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS ix_java_sync_outbox_due
+    ON java_sync_outbox (status, next_attempt_at);
+CREATE INDEX IF NOT EXISTS ix_java_sync_outbox_key
+    ON java_sync_outbox (coalesce_key, status);
+
+COMMIT;
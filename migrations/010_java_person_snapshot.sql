@@ -0,0 +1,13 @@
+-- Checkpoint de la conciliación Java <-> local (flask reconcile-java-persons):
+-- huella de cada persona remota vista en la última ejecución
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS java_person_snapshot (
+    identification VARCHAR(20) PRIMARY KEY,
+    external_id VARCHAR(100),
+    digest VARCHAR(40) NOT NULL,
+    seen_at TIMESTAMP NOT NULL DEFAULT now()
+);
+
+COMMIT;
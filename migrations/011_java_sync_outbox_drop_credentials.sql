@@ -0,0 +1,10 @@
+-- El outbox de Java ya no guarda credenciales (el worker usa la cuenta de
+-- servicio JAVA_SERVICE_EMAIL/PASSWORD): se borran las que quedaron en filas previas
+
+BEGIN;
+
+UPDATE java_sync_outbox
+SET payload = (payload::jsonb - 'password' - 'token')::json
+WHERE payload::jsonb ?| array['password', 'token'];
+
+COMMIT;
@@ -0,0 +1,24 @@
+-- Búsqueda de participantes sin tildes ni mayúsculas, con el mismo criterio que
+-- el trie en memoria (DNI por prefijo, palabras del nombre por prefijo).
+-- Reemplaza los índices de 003: la expresión debe coincidir con
+-- ParticipantSearchService._normalized()
+
+BEGIN;
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE EXTENSION IF NOT EXISTS unaccent;
+
+-- unaccent() es STABLE; los índices de expresión necesitan una función IMMUTABLE
+CREATE OR REPLACE FUNCTION f_unaccent(text) RETURNS text
+    LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+    AS $$ SELECT public.unaccent('public.unaccent'::regdictionary, $1) $$;
+
+DROP INDEX IF EXISTS ix_participant_dni_trgm;
+DROP INDEX IF EXISTS ix_participant_full_name_trgm;
+
+CREATE INDEX IF NOT EXISTS ix_participant_dni_search_trgm
+    ON participant USING gin (f_unaccent(lower(dni)) gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS ix_participant_full_name_search_trgm
+    ON participant USING gin (f_unaccent(lower("firstName" || ' ' || "lastName")) gin_trgm_ops);
+
+COMMIT;
@@ -0,0 +1,15 @@
+-- El nombre completo del índice de búsqueda usa coalesce: con "firstName" ||
+-- ' ' || "lastName" un apellido nulo dejaba todo el nombre en NULL y el
+-- participante no aparecía. La expresión debe coincidir con
+-- ParticipantSearchService._normalized(_full_name()) (concat_ws no sirve: no es IMMUTABLE)
+
+BEGIN;
+
+DROP INDEX IF EXISTS ix_participant_full_name_search_trgm;
+
+CREATE INDEX IF NOT EXISTS ix_participant_full_name_search_trgm
+    ON participant USING gin (
+        f_unaccent(lower(coalesce("firstName", '') || ' ' || coalesce("lastName", ''))) gin_trgm_ops
+    );
+
+COMMIT;
@@ -0,0 +1,1064 @@
+import base64
+import io
+import os
+import tempfile
+import threading
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from app import db
+from app.controllers.attendance_controller import today_sessions_cache
+from app.models.attendance import Attendance
+from app.models.attendanceDailySummary import AttendanceDailySummary
+from app.models.enrollment import Enrollment
+from app.services.attendance_summary_service import (
+    lock_session_summary,
+    rebuild_daily_summary,
+    rebuild_participant_counters,
+)
+from app.services.participant_search_service import participant_search
+from app.services.schedule_occurrence_service import ScheduleRule, schedule_occurrences
+from app.models.participant import Participant
+from app.models.participantAttendanceCounter import ParticipantAttendanceCounter
+from app.models.schedule import Schedule
+from app.models.syncTombstone import SyncTombstone
+from tests.test_integration.base_test import POSTGRES_TEST_URI, BaseTestCase, requires_postgres
+
+
+class TestAttendanceQueries(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        today_sessions_cache.clear()
+        participant_search.mark_dirty()
+        schedule_occurrences.mark_dirty()
+
+    def _login_and_get_token(self):
+        response = self.client.post(
+            "/api/auth/login", json={"email": "dev@kallpa.com", "password": "xxxxx"}
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.get_json()["token"]
+
+    def _auth(self):
+        return {"Authorization": f"Bearer {self._login_and_get_token()}"}
+
+    def _seed(self, participants, program="FUNCIONAL", dates=("2026-01-05", "2026-01-12")):
+        schedule = Schedule(
+            name=f"Sesión {program}",
+            dayOfWeek="MONDAY",
+            startTime="08:00",
+            endTime="10:00",
+            maxSlots=500,
+            program=program,
+        )
+        db.session.add(schedule)
+        db.session.flush()
+        created = []
+        for i in range(participants):
+            p = Participant(
+                firstName=f"Nombre{i}",
+                lastName=f"Apellido{i}",
+                age=20,
+                dni=f"{program[:1]}{i:09d}",
+                address="Loja",
+                status="ACTIVO",
+                type="ESTUDIANTE",
+                program=program,
+            )
+            db.session.add(p)
+            db.session.flush()
+            for n, d in enumerate(dates):
+                status = Attendance.Status.PRESENT if (i + n) % 2 == 0 else Attendance.Status.ABSENT
+                db.session.add(
+                    Attendance(
+                        participant_id=p.id,
+                        schedule_id=schedule.id,
+                        date=date.fromisoformat(d),
+                        status=status,
+                    )
+                )
+            created.append(p)
+        # Los datos se insertan directamente: se reconstruyen los resúmenes como en un backfill
+        rebuild_daily_summary()
+        rebuild_participant_counters()
+        db.session.commit()
+        return schedule, created
+
+    def test_participants_percentage(self):
+        headers = self._auth()
+        _, created = self._seed(3)
+        db.session.add(
+            Participant(
+                firstName="Sin", lastName="Registros", age=20, dni="9000000001",
+                address="Loja", status="ACTIVO", type="ESTUDIANTE", program="FUNCIONAL",
+            )
+        )
+        db.session.commit()
+
+        response = self.client.get("/api/attendance/v2/public/participants", headers=headers)
+
+        self.assertEqual(response.status_code, 200)
+        by_dni = {p["dni"]: p for p in response.get_json()["data"]}
+        self.assertEqual(len(by_dni), 4)
+        self.assertEqual(by_dni[created[0].dni]["attendance_percentage"], 50.0)
+        self.assertEqual(by_dni["9000000001"]["attendance_percentage"], 0)
+
+    def test_participants_query_count_is_constant(self):
+        headers = self._auth()
+        self._seed(5)
+        with self.count_queries() as few:
+            self.client.get("/api/attendance/v2/public/participants", headers=headers)
+
+        self._seed(40, program="INICIACION")
+        with self.count_queries() as many:
+            response = self.client.get("/api/attendance/v2/public/participants", headers=headers)
+
+        self.assertEqual(len(response.get_json()["data"]), 45)
+        self.assertEqual(len(few), len(many))
+
+    def test_participants_filtered_by_program(self):
+        headers = self._auth()
+        self._seed(2)
+        self._seed(3, program="INICIACION")
+
+        response = self.client.get(
+            "/api/attendance/v2/public/participants?program=INICIACION", headers=headers
+        )
+
+        data = response.get_json()["data"]
+        self.assertEqual(len(data), 3)
+        self.assertTrue(all(p["program"] == "INICIACION" for p in data))
+
+    def test_bulk_register_upserts_in_constant_queries(self):
+        headers = self._auth()
+        schedule, created = self._seed(30, dates=("2026-01-05",))
+        payload = {
+            "schedule_external_id": schedule.external_id,
+            "date": "2026-01-05",
+            "attendances": [
+                {"participant_external_id": p.external_id, "status": "present"}
+                for p in created
+            ]
+            + [{"participant_external_id": "no-existe", "status": "present"}, {"status": "absent"}],
+        }
+
+        with self.count_queries() as statements:
+            response = self.client.post(
+                "/api/attendance/v2/public/register", json=payload, headers=headers
+            )
+
+        data = response.get_json()["data"]
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((data["inserted"], data["updated"], data["skipped"]), (0, 30, 2))
+        # Número fijo de sentencias, independiente del tamaño de la lista
+        self.assertLessEqual(len(statements), 10)
+        self.assertEqual(
+            Attendance.query.filter_by(schedule_id=schedule.id, status="present").count(), 30
+        )
+
+        payload["date"] = "2026-01-19"
+        response = self.client.post(
+            "/api/attendance/v2/public/register", json=payload, headers=headers
+        )
+        self.assertEqual(response.get_json()["data"]["inserted"], 30)
+        self.assertEqual(Attendance.query.filter_by(schedule_id=schedule.id).count(), 60)
+
+    def test_history_keyset_pagination(self):
+        headers = self._auth()
+        self._seed(7, dates=("2026-01-05", "2026-01-12", "2026-01-19"))
+
+        seen, cursor, pages = [], None, 0
+        while True:
+            url = "/api/attendance/v2/public/history?limit=5"
+            if cursor:
+                url += f"&cursor={cursor}"
+            data = self.client.get(url, headers=headers).get_json()["data"]
+            seen.extend(item["external_id"] for item in data["items"])
+            pages += 1
+            cursor = data["next_cursor"]
+            if not cursor:
+                break
+
+        self.assertEqual(pages, 5)
+        self.assertEqual(len(seen), 21)
+        self.assertEqual(len(set(seen)), 21)
+
+        invalid = self.client.get(
+            "/api/attendance/v2/public/history?limit=5&cursor=xyz", headers=headers
+        )
+        self.assertEqual(invalid.status_code, 400)
+
+    def test_history_ndjson_stream(self):
+        import json
+
+        headers = self._auth()
+        self._seed(4, dates=("2026-01-05", "2026-01-12"))
+
+        response = self.client.get(
+            "/api/attendance/v2/public/history?format=ndjson&date_from=2026-01-10",
+            headers=headers,
+        )
+
+        self.assertEqual(response.mimetype, "application/x-ndjson")
+        lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        self.assertEqual(len(lines), 4)
+        self.assertTrue(all(line["date"] == "2026-01-12" for line in lines))
+        self.assertIn("dni", lines[0]["participant"])
+
+    def test_history_day_of_week_filter_on_date_column(self):
+        headers = self._auth()
+        # 2026-01-05 es lunes, 2026-01-10 es sábado
+        self._seed(3, dates=("2026-01-05", "2026-01-10"))
+
+        data = self.client.get(
+            "/api/attendance/v2/public/history?day_of_week=sabado", headers=headers
+        ).get_json()["data"]
+
+        self.assertEqual(len(data), 3)
+        self.assertTrue(all(item["date"] == "2026-01-10" for item in data))
+
+        invalid = self.client.get(
+            "/api/attendance/v2/public/history?date_from=05/01/2026", headers=headers
+        )
+        self.assertEqual(invalid.status_code, 400)
+
+    def test_attendance_query_plans_use_composite_indexes(self):
+        from sqlalchemy import text
+
+        self._seed(60, dates=tuple(f"2026-02-{d:02d}" for d in range(1, 21)))
+        db.session.execute(text("ANALYZE"))
+
+        def plan(sql, **params):
+            rows = db.session.execute(text(f"EXPLAIN QUERY PLAN {sql}"), params).all()
+            return " ".join(row[-1] for row in rows)
+
+        by_session = plan(
+            "SELECT id FROM attendance WHERE schedule_id = :s AND date BETWEEN :a AND :b",
+            s=1, a="2026-02-03", b="2026-02-10",
+        )
+        by_participant = plan(
+            "SELECT id FROM attendance WHERE participant_id = :p AND date >= :a",
+            p=1, a="2026-02-03",
+        )
+        stats = plan(
+            "SELECT participant_id, count(*) FROM attendance "
+            "WHERE participant_id = :p AND status = 'present' GROUP BY participant_id",
+            p=1,
+        )
+
+        self.assertIn("ix_attendance_schedule_date", by_session)
+        self.assertIn("ix_attendance_participant_date", by_participant)
+        self.assertIn("ix_attendance_participant_status", stats)
+
+    def test_today_sessions_single_query_and_cache(self):
+        headers = self._auth()
+        today = date.today()
+        schedules, participants = [], []
+        for program in ("FUNCIONAL", "INICIACION"):
+            schedule, created = self._seed(3, program=program, dates=())
+            schedule.specificDate = today
+            schedules.append(schedule)
+            participants.extend(created)
+        db.session.commit()
+        payload = {
+            "schedule_external_id": schedules[0].external_id,
+            "date": today.isoformat(),
+            "attendances": [
+                {"participant_external_id": p.external_id, "status": "present"}
+                for p in participants[:3]
+            ],
+        }
+        self.client.post("/api/attendance/v2/public/register", json=payload, headers=headers)
+
+        with self.count_queries() as first:
+            data = self.client.get(
+                "/api/attendance/v2/public/sessions/today", headers=headers
+            ).get_json()["data"]
+        with self.count_queries() as cached:
+            self.client.get("/api/attendance/v2/public/sessions/today", headers=headers)
+
+        counts = {s["external_id"]: s["attendances_registered"] for s in data}
+        self.assertEqual(counts, {schedules[0].external_id: 3, schedules[1].external_id: 0})
+        self.assertEqual(len(first), 1)
+        self.assertEqual(len(cached), 0)
+
+        self.client.delete(
+            f"/api/attendance/v2/public/history/session/{schedules[0].external_id}/{today.isoformat()}",
+            headers=headers,
+        )
+        data = self.client.get(
+            "/api/attendance/v2/public/sessions/today", headers=headers
+        ).get_json()["data"]
+        self.assertTrue(all(s["attendances_registered"] == 0 for s in data))
+
+    def test_participant_search_ranked_autocomplete(self):
+        headers = self._auth()
+        _, created = self._seed(3)
+        created[1].firstName, created[1].lastName = "María", "Núñez"
+        created[2].firstName, created[2].lastName = "Mario", "Paredes"
+        db.session.commit()
+
+        data = self.client.get("/api/participants/search?q=mari", headers=headers).get_json()["data"]
+        self.assertEqual([p["lastName"] for p in data], ["Núñez", "Paredes"])
+
+        data = self.client.get(
+            "/api/participants/search?q=maria nunez", headers=headers
+        ).get_json()["data"]
+        self.assertEqual([p["dni"] for p in data], [created[1].dni])
+
+        data = self.client.get(
+            f"/api/participants/search?q={created[0].dni}", headers=headers
+        ).get_json()["data"]
+        self.assertEqual(data[0]["external_id"], created[0].external_id)
+        self.assertEqual(data[0]["score"], 1.0)
+
+        missing = self.client.get("/api/participants/search?q=", headers=headers)
+        self.assertEqual(missing.status_code, 400)
+
+    def test_participant_search_sees_core_writes(self):
+        self.assertEqual(participant_search.search("zoila"), [])  # construye el trie
+        db.session.execute(
+            Participant.__table__.insert(),
+            [{"firstName": "Zoila", "lastName": "Quispe", "age": 30, "dni": "1199999991",
+              "address": "Loja", "status": "ACTIVO", "type": "EXTERNO", "program": "FUNCIONAL"}],
+        )
+        db.session.commit()
+        self.assertEqual([p["lastName"] for p in participant_search.search("zoila")], ["Quispe"])
+
+        # Query.update() masivo tampoco pasa por los eventos del mapper
+        Participant.query.filter_by(dni="1199999991").update({"firstName": "Zenaida"})
+        db.session.commit()
+        self.assertEqual(participant_search.search("zoila"), [])
+        self.assertEqual([p["dni"] for p in participant_search.search("zena")], ["1199999991"])
+
+    def test_history_search_reuses_participant_search(self):
+        headers = self._auth()
+        _, created = self._seed(3)
+        created[2].firstName, created[2].lastName = "Lucía", "Torres"
+        db.session.commit()
+
+        by_name = self.client.get(
+            "/api/attendance/v2/public/history?name=lucia", headers=headers
+        ).get_json()["data"]
+        by_dni = self.client.get(
+            f"/api/attendance/v2/public/history?dni={created[0].dni}", headers=headers
+        ).get_json()["data"]
+
+        self.assertEqual({a["participant"]["last_name"] for a in by_name}, {"Torres"})
+        self.assertEqual(len(by_name), 2)
+        self.assertEqual({a["participant"]["dni"] for a in by_dni}, {created[0].dni})
+
+    def test_schedule_overlap_and_calendar(self):
+        headers = self._auth()
+        url = "/api/attendance/v2/public/schedules"
+        base = {"startTime": "08:00", "endTime": "10:00", "maxSlots": 20, "program": "FUNCIONAL"}
+
+        recurring = dict(
+            base, name="Lunes mañana", dayOfWeek="MONDAY",
+            startDate="2027-03-01", endDate="2027-03-29", location="Coliseo",
+        )
+        self.assertEqual(self.client.post(url, json=recurring, headers=headers).status_code, 200)
+
+        # 2027-03-15 es lunes dentro del rango: se solapa
+        clash = dict(base, name="Extra", specificDate="2027-03-15", startTime="09:00", endTime="11:00")
+        response = self.client.post(url, json=clash, headers=headers)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("Lunes mañana", response.get_json()["data"]["schedule"])
+
+        # Mismo lunes, fuera del rango de fechas o en otra ubicación: no se solapa
+        after_range = dict(clash, specificDate="2027-04-05")
+        other_place = dict(clash, name="Extra piscina", location="Piscina")
+        self.assertEqual(self.client.post(url, json=after_range, headers=headers).status_code, 200)
+        self.assertEqual(self.client.post(url, json=other_place, headers=headers).status_code, 200)
+
+        data = self.client.get(
+            f"{url}/calendar?from=2027-03-01&to=2027-04-30", headers=headers
+        ).get_json()["data"]
+        recurring_dates = [o["date"] for o in data if o["schedule"]["name"] == "Lunes mañana"]
+        self.assertEqual(
+            recurring_dates,
+            ["2027-03-01", "2027-03-08", "2027-03-15", "2027-03-22", "2027-03-29"],
+        )
+        self.assertEqual(len(data), 7)
+        self.assertEqual(data, sorted(data, key=lambda o: (o["date"], o["start_time"])))
+
+        invalid = self.client.get(f"{url}/calendar?from=2027-03-01", headers=headers)
+        self.assertEqual(invalid.status_code, 400)
+
+    def test_overlap_check_reads_current_rows_without_rebuilding_index(self):
+        schedule_occurrences.occurrences(date(2027, 3, 1), date(2027, 3, 31))
+        built_at = schedule_occurrences._built_at
+        # Inserción por Core, como la haría otro worker: no dispara mark_dirty
+        db.session.execute(Schedule.__table__.insert().values(
+            external_id="otro-worker", name="Otro worker", dayOfWeek="MONDAY",
+            startTime="08:00", endTime="10:00", maxSlots=20, program="FUNCIONAL",
+            location="Coliseo", status="active", updated_at=datetime.utcnow(),
+        ))
+        db.session.commit()
+
+        candidate = ScheduleRule(
+            None, None, "Nuevo", "FUNCIONAL", "Coliseo", None,
+            date(2027, 3, 15), None, None, "09:00", "11:00",
+        )
+        with self.count_queries() as statements:
+            overlaps = schedule_occurrences.find_overlaps(candidate)
+        self.assertEqual([o.name for o in overlaps], ["Otro worker"])
+        self.assertEqual(len(statements), 1)
+        self.assertIn("program", statements[0])
+        self.assertEqual(schedule_occurrences._built_at, built_at)
+
+        elsewhere = ScheduleRule(
+            None, None, "Nuevo", "FUNCIONAL", "Piscina", None,
+            date(2027, 3, 15), None, None, "09:00", "11:00",
+        )
+        self.assertEqual(schedule_occurrences.find_overlaps(elsewhere), [])
+
+    def test_occupancy_analytics_from_summary(self):
+        headers = self._auth()
+        schedule, created = self._seed(4, dates=())
+        schedule.maxSlots = 10
+        db.session.commit()
+        register = "/api/attendance/v2/public/register"
+        # Cuatro lunes con 1, 2, 3 y 4 presentes de 4 marcados
+        for week, present in enumerate((1, 2, 3, 4)):
+            marks = [
+                {"participant_external_id": p.external_id, "status": "present" if i < present else "absent"}
+                for i, p in enumerate(created)
+            ]
+            self.client.post(
+                register,
+                json={
+                    "schedule_external_id": schedule.external_id,
+                    "date": f"2026-03-{2 + 7 * week:02d}",
+                    "attendances": marks,
+                },
+                headers=headers,
+            )
+
+        self.assertEqual(AttendanceDailySummary.query.count(), 4)
+        with self.count_queries() as statements:
+            response = self.client.get(
+                "/api/attendance/v2/analytics/occupancy?date_from=2026-03-01&date_to=2026-03-31",
+                headers=headers,
+            )
+        self.assertFalse(any("FROM attendance " in sql for sql in statements))
+
+        data = response.get_json()["data"]
+        row = data["by_schedule"][0]
+        self.assertEqual((row["sessions"], row["present"], row["absent"]), (4, 10, 6))
+        self.assertEqual(row["fill_rate"], 25.0)
+        self.assertEqual(row["present_ratio"], 62.5)
+        # Media móvil de 4 sesiones: 10% al inicio, 25% al final
+        self.assertEqual(row["trend"], 15.0)
+        self.assertEqual(data["by_weekday"][0]["day_name"], "Lunes")
+
+        self.client.delete(
+            f"/api/attendance/v2/public/history/session/{schedule.external_id}/2026-03-02",
+            headers=headers,
+        )
+        # La fila de la sesión queda en cero (no se borra) y deja de contar como dictada
+        self.assertEqual(AttendanceDailySummary.query.filter(AttendanceDailySummary.total > 0).count(), 3)
+
+    def test_summaries_follow_writes_and_rebuild_command(self):
+        headers = self._auth()
+        schedule, created = self._seed(3, dates=("2026-01-05",))
+        register = "/api/attendance/v2/public/register"
+        self.client.post(
+            register,
+            json={
+                "schedule_external_id": schedule.external_id,
+                "date": "2026-01-12",
+                "attendances": [
+                    {"participant_external_id": p.external_id, "status": "present"}
+                    for p in created
+                ],
+            },
+            headers=headers,
+        )
+
+        counter = db.session.get(ParticipantAttendanceCounter, created[1].id)
+        self.assertEqual((counter.total, counter.present), (2, 1))
+        summary = db.session.get(AttendanceDailySummary, (schedule.id, date(2026, 1, 12)))
+        self.assertEqual((summary.present, summary.total), (3, 3))
+
+        self.client.delete(
+            f"/api/attendance/v2/public/history/session/{schedule.external_id}/2026-01-12",
+            headers=headers,
+        )
+        db.session.expire_all()
+        counter = db.session.get(ParticipantAttendanceCounter, created[1].id)
+        self.assertEqual((counter.total, counter.present), (1, 0))
+        summary = db.session.get(AttendanceDailySummary, (schedule.id, date(2026, 1, 12)))
+        self.assertEqual((summary.present, summary.absent, summary.total), (0, 0, 0))
+
+        db.session.query(ParticipantAttendanceCounter).delete()
+        db.session.query(AttendanceDailySummary).delete()
+        db.session.commit()
+        result = self.app.test_cli_runner().invoke(args=["rebuild-attendance-summaries"])
+
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertEqual(AttendanceDailySummary.query.count(), 1)
+        self.assertEqual(ParticipantAttendanceCounter.query.count(), 3)
+
+    def test_counters_apply_deltas_without_recounting_history(self):
+        headers = self._auth()
+        schedule, created = self._seed(2, dates=("2026-01-05",))
+        # Valor centinela: si se recalculara desde `attendance` volvería a (1, x)
+        ParticipantAttendanceCounter.query.filter_by(participant_id=created[0].id).update(
+            {"total": 50, "present": 40}
+        )
+        db.session.commit()
+        register = "/api/attendance/v2/public/register"
+        body = {"schedule_external_id": schedule.external_id, "date": "2026-01-12"}
+
+        self.client.post(
+            register,
+            json=dict(body, attendances=[{"participant_external_id": created[0].external_id, "status": "present"}]),
+            headers=headers,
+        )
+        self.client.post(
+            register,
+            json=dict(body, attendances=[{"participant_external_id": created[0].external_id, "status": "absent"}]),
+            headers=headers,
+        )
+        db.session.expire_all()
+        counter = db.session.get(ParticipantAttendanceCounter, created[0].id)
+        # Alta (+1 total, +1 presente) y luego cambio a ausente (-1 presente)
+        self.assertEqual((counter.total, counter.present), (51, 40))
+
+        self.client.delete(
+            f"/api/attendance/v2/public/history/session/{schedule.external_id}/2026-01-12",
+            headers=headers,
+        )
+        db.session.expire_all()
+        counter = db.session.get(ParticipantAttendanceCounter, created[0].id)
+        self.assertEqual((counter.total, counter.present), (50, 40))
+
+    def test_check_in_is_idempotent_and_respects_capacity(self):
+        headers = self._auth()
+        schedule, created = self._seed(4, dates=())
+        schedule.maxSlots = 2
+        db.session.commit()
+        url = "/api/attendance/v2/public/checkin"
+        body = {"schedule_external_id": schedule.external_id, "date": "2026-04-06"}
+
+        first = self.client.post(url, json=dict(body, dni=created[0].dni), headers=headers)
+        repeat = self.client.post(url, json=dict(body, dni=created[0].dni), headers=headers)
+        second = self.client.post(
+            url, json=dict(body, participant_external_id=created[1].external_id), headers=headers
+        )
+        full = self.client.post(url, json=dict(body, dni=created[2].dni), headers=headers)
+
+        self.assertEqual(first.get_json()["data"]["already_checked_in"], False)
+        self.assertEqual(repeat.get_json()["data"]["already_checked_in"], True)
+        self.assertEqual(second.get_json()["data"]["occupied"], 2)
+        self.assertEqual(full.status_code, 409)
+        self.assertEqual(Attendance.query.filter_by(schedule_id=schedule.id).count(), 2)
+
+        summary = db.session.get(AttendanceDailySummary, (schedule.id, date(2026, 4, 6)))
+        counter = db.session.get(ParticipantAttendanceCounter, created[0].id)
+        self.assertEqual((summary.present, summary.total), (2, 2))
+        self.assertEqual((counter.total, counter.present), (1, 1))
+
+        missing = self.client.post(url, json=dict(body, dni="0000000001"), headers=headers)
+        self.assertEqual(missing.status_code, 404)
+
+    def test_sync_returns_only_changes_and_tombstones(self):
+        headers = self._auth()
+        schedule, created = self._seed(3, dates=("2026-04-06", "2026-04-13"))
+        # Todo lo sembrado queda "antiguo" respecto al cursor del cliente
+        an_hour_ago = datetime.utcnow() - timedelta(hours=1)
+        for model in (Schedule, Participant, Attendance):
+            db.session.execute(model.__table__.update().values(updated_at=an_hour_ago))
+        db.session.commit()
+        since = (datetime.utcnow() - timedelta(minutes=30)).isoformat()
+
+        self.client.post(
+            "/api/attendance/v2/public/register",
+            json={
+                "schedule_external_id": schedule.external_id,
+                "date": "2026-04-06",
+                "attendances": [
+                    {"participant_external_id": created[0].external_id, "status": "absent"}
+                ],
+            },
+            headers=headers,
+        )
+        deleted_ids = {
+            a.external_id
+            for a in Attendance.query.filter_by(schedule_id=schedule.id, date=date(2026, 4, 13))
+        }
+        self.client.delete(
+            f"/api/attendance/v2/public/history/session/{schedule.external_id}/2026-04-13",
+            headers=headers,
+        )
+
+        response = self.client.get(f"/api/attendance/v2/sync?since={since}", headers=headers)
+        self.assertEqual(response.status_code, 200)
+        data = response.get_json()["data"]
+        self.assertEqual(data["full"], False)
+        self.assertEqual(data["schedules"], [])
+        self.assertEqual(data["participants"], [])
+        self.assertEqual(len(data["attendances"]), 1)
+        self.assertEqual(data["attendances"][0]["participant_external_id"], created[0].external_id)
+        self.assertEqual(data["attendances"][0]["status"], "absent")
+        self.assertEqual(set(data["deleted"]["attendances"]), deleted_ids)
+        self.assertEqual(SyncTombstone.query.count(), 3)
+
+        full = self.client.get("/api/attendance/v2/sync", headers=headers).get_json()["data"]
+        self.assertEqual(full["full"], True)
+        self.assertEqual(len(full["participants"]), 3)
+
+        invalid = self.client.get("/api/attendance/v2/sync?since=ayer", headers=headers)
+        self.assertEqual(invalid.status_code, 400)
+
+    def test_sync_upload_is_idempotent(self):
+        headers = self._auth()
+        schedule, created = self._seed(2, dates=())
+        url = "/api/attendance/v2/sync/attendances"
+        marks = [
+            {
+                "idempotency_key": f"tablet-1-{i}",
+                "schedule_external_id": schedule.external_id,
+                "participant_external_id": p.external_id,
+                "date": "2026-04-06",
+                "status": "present",
+            }
+            for i, p in enumerate(created)
+        ]
+        marks.append(dict(marks[0], idempotency_key="tablet-1-x", status="tarde"))
+
+        first = self.client.post(url, json={"marks": marks}, headers=headers).get_json()["data"]
+        retry = self.client.post(url, json={"marks": marks}, headers=headers).get_json()["data"]
+
+        self.assertEqual((first["applied"], first["duplicates"], first["rejected"]), (2, 0, 1))
+        self.assertEqual((retry["applied"], retry["duplicates"], retry["rejected"]), (0, 2, 1))
+        self.assertEqual(Attendance.query.filter_by(schedule_id=schedule.id).count(), 2)
+        summary = db.session.get(AttendanceDailySummary, (schedule.id, date(2026, 4, 6)))
+        self.assertEqual((summary.present, summary.total), (2, 2))
+
+        # Una marca nueva sobre la misma asistencia la actualiza y cambia updated_at
+        before = Attendance.query.filter_by(participant_id=created[0].id).one().updated_at
+        update = dict(marks[0], idempotency_key="tablet-1-2", status="absent")
+        self.client.post(url, json={"marks": [update]}, headers=headers)
+        db.session.expire_all()
+        attendance = Attendance.query.filter_by(participant_id=created[0].id).one()
+        self.assertEqual(attendance.status, "absent")
+        self.assertGreaterEqual(attendance.updated_at, before)
+        # Los reintentos no duplican los contadores; la actualización solo resta el presente
+        counter = db.session.get(ParticipantAttendanceCounter, created[0].id)
+        self.assertEqual((counter.total, counter.present), (1, 0))
+
+    def test_session_detail_single_query_and_etag(self):
+        headers = self._auth()
+        schedule, created = self._seed(6, dates=("2026-04-06",))
+        url = f"/api/attendance/v2/public/history/session/{schedule.external_id}/2026-04-06"
+
+        with self.count_queries() as statements:
+            response = self.client.get(url, headers=headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.get_json()["data"]), 6)
+        # Versión + roster, sin carga perezosa por participante
+        self.assertLessEqual(len(statements), 2)
+        etag = response.headers["ETag"]
+
+        with self.count_queries() as statements:
+            cached = self.client.get(url, headers=dict(headers, **{"If-None-Match": etag}))
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(cached.data, b"")
+        self.assertEqual(len(statements), 1)
+
+        self.client.post(
+            "/api/attendance/v2/public/checkin",
+            json={"schedule_external_id": schedule.external_id, "date": "2026-04-06",
+                  "participant_external_id": created[1].external_id},
+            headers=headers,
+        )
+        changed = self.client.get(url, headers=dict(headers, **{"If-None-Match": etag}))
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed.headers["ETag"], etag)
+
+    def test_export_history_streams_csv_and_xlsx(self):
+        headers = self._auth()
+        self._seed(3, dates=("2026-04-06", "2026-04-13"))
+
+        response = self.client.get(
+            "/api/attendance/v2/export?format=csv&date_from=2026-04-13", headers=headers
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_streamed)
+        self.assertIn("attachment", response.headers["Content-Disposition"])
+        lines = response.get_data(as_text=True).lstrip("\ufeff").splitlines()
+        self.assertEqual(lines[0].split(",")[:3], ["Fecha", "Estado", "DNI"])
+        self.assertEqual(len(lines), 4)
+        self.assertTrue(all(line.startswith("2026-04-13,") for line in lines[1:]))
+
+        response = self.client.get("/api/attendance/v2/export?format=xlsx", headers=headers)
+        self.assertEqual(response.status_code, 200)
+        with zipfile.ZipFile(io.BytesIO(response.get_data())) as workbook:
+            sheet = workbook.read("xl/worksheets/sheet1.xml").decode()
+            self.assertIn("xl/workbook.xml", workbook.namelist())
+        self.assertEqual(sheet.count("<row>"), 7)
+        self.assertIn("Apellido0", sheet)
+
+        invalid = self.client.get("/api/attendance/v2/export?format=pdf", headers=headers)
+        self.assertEqual(invalid.status_code, 400)
+
+    def test_at_risk_streaks_from_precomputed_table(self):
+        headers = self._auth()
+        schedule, created = self._seed(3, dates=())
+        today = date.today()
+        history = {
+            0: ["present", "absent", "absent", "absent"],
+            1: ["absent", "present", "present"],
+            2: ["present"],
+        }
+        for i, statuses in history.items():
+            # Del más antiguo al más reciente, una sesión por semana
+            for weeks_ago, status in zip(range(len(statuses) - 1, -1, -1), statuses):
+                db.session.add(
+                    Attendance(
+                        participant_id=created[i].id,
+                        schedule_id=schedule.id,
+                        date=today - timedelta(weeks=weeks_ago),
+                        status=status,
+                    )
+                )
+        db.session.commit()
+
+        refresh = self.client.post("/api/attendance/v2/analytics/at-risk/refresh", headers=headers)
+        self.assertEqual(refresh.get_json()["data"]["participants"], 3)
+
+        with self.count_queries() as statements:
+            response = self.client.get("/api/attendance/v2/analytics/at-risk", headers=headers)
+        self.assertEqual(len(statements), 1)
+        rows = response.get_json()["data"]["participants"]
+        self.assertEqual(
+            [r["participant_external_id"] for r in rows],
+            [created[0].external_id, created[1].external_id, created[2].external_id],
+        )
+        first = rows[0]
+        self.assertEqual((first["streak_status"], first["streak_length"]), ("absent", 3))
+        self.assertEqual(first["last_attended"], (today - timedelta(weeks=3)).isoformat())
+        self.assertEqual((first["present_30d"], first["total_30d"]), (1, 4))
+        self.assertEqual(first["attendance_rate_30d"], 25.0)
+        self.assertEqual((rows[1]["streak_status"], rows[1]["streak_length"]), ("present", 2))
+
+        filtered = self.client.get(
+            "/api/attendance/v2/analytics/at-risk?min_absences=3", headers=headers
+        ).get_json()["data"]["participants"]
+        self.assertEqual(len(filtered), 1)
+
+        result = self.app.test_cli_runner().invoke(args=["compute-attendance-risk"])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn("3 participantes", result.output)
+
+    def test_attendance_matrix_packed_bitsets(self):
+        headers = self._auth()
+        _, created = self._seed(3, dates=("2026-01-05", "2026-01-12"))
+        self._seed(2, program="INICIACION", dates=("2026-01-05",))
+
+        with self.count_queries() as statements:
+            response = self.client.get(
+                "/api/attendance/v2/analytics/matrix?program=FUNCIONAL"
+                "&date_from=2026-01-01&date_to=2026-01-31",
+                headers=headers,
+            )
+        self.assertEqual(len(statements), 1)
+        data = response.get_json()["data"]
+        self.assertEqual(data["shape"], [3, 2])
+        self.assertEqual(data["participants"], [p.external_id for p in created])
+        self.assertEqual(data["dates"], ["2026-01-05", "2026-01-12"])
+
+        present = base64.b64decode(data["present"])
+        recorded = base64.b64decode(data["recorded"])
+        self.assertEqual(len(present), 3 * data["row_bytes"])
+        # Semilla: presente cuando (participante + sesión) es par -> 10, 01, 10
+        self.assertEqual(list(present), [0b10000000, 0b01000000, 0b10000000])
+        self.assertEqual(list(recorded), [0b11000000] * 3)
+
+        invalid = self.client.get(
+            "/api/attendance/v2/analytics/matrix?date_from=2026-01-31&date_to=2026-01-01",
+            headers=headers,
+        )
+        self.assertEqual(invalid.status_code, 400)
+
+    def test_enrollment_roster_returns_only_enrolled(self):
+        headers = self._auth()
+        schedule, created = self._seed(12, dates=("2026-01-05",))
+        enrollments = f"/api/attendance/v2/schedules/{schedule.external_id}/enrollments"
+        enrolled = [p.external_id for p in created[:3]]
+
+        response = self.client.post(
+            enrollments,
+            json={"participant_external_ids": enrolled + ["no-existe"], "start_date": "2026-01-01"},
+            headers=headers,
+        ).get_json()["data"]
+        self.assertEqual((len(response["enrolled"]), response["not_found"]), (3, ["no-existe"]))
+        repeat = self.client.post(
+            enrollments, json={"participant_external_ids": enrolled[:1]}, headers=headers
+        ).get_json()["data"]
+        self.assertEqual(repeat["already_enrolled"], enrolled[:1])
+
+        roster_url = f"/api/attendance/v2/public/sessions/{schedule.external_id}/2026-01-05/roster"
+        with self.count_queries() as statements:
+            roster = self.client.get(roster_url, headers=headers).get_json()["data"]
+        self.assertEqual(len(statements), 1)
+        self.assertEqual({r["participant_external_id"] for r in roster}, set(enrolled))
+        # La semilla registró a todos el 2026-01-05: presente si el índice es par
+        by_id = {r["participant_external_id"]: r["status"] for r in roster}
+        self.assertEqual(by_id[enrolled[0]], "present")
+        self.assertEqual(by_id[enrolled[1]], "absent")
+
+        self.client.delete(
+            f"{enrollments}/{enrolled[0]}", json={"end_date": "2026-01-10"}, headers=headers
+        )
+        later = self.client.get(
+            f"/api/attendance/v2/public/sessions/{schedule.external_id}/2026-01-12/roster",
+            headers=headers,
+        ).get_json()["data"]
+        self.assertEqual({r["participant_external_id"] for r in later}, set(enrolled[1:]))
+        self.assertTrue(all(r["status"] is None for r in later))
+
+        missing = self.client.get(
+            "/api/attendance/v2/public/sessions/no-existe/2026-01-05/roster", headers=headers
+        )
+        self.assertEqual(missing.status_code, 404)
+
+    def test_ended_enrollment_leaves_the_roster_that_day(self):
+        headers = self._auth()
+        schedule, created = self._seed(3, dates=("2026-01-05",))
+        enrollments = f"/api/attendance/v2/schedules/{schedule.external_id}/enrollments"
+        today = date.today()
+        first, second = created[0].external_id, created[1].external_id
+
+        def roster(day):
+            rows = self.client.get(
+                f"/api/attendance/v2/public/sessions/{schedule.external_id}/{day.isoformat()}/roster",
+                headers=headers,
+            ).get_json()["data"]
+            return {r["participant_external_id"] for r in rows}
+
+        self.client.post(
+            enrollments,
+            json={"participant_external_ids": [first], "start_date": (today - timedelta(days=7)).isoformat()},
+            headers=headers,
+        )
+        ended = self.client.delete(f"{enrollments}/{first}", headers=headers).get_json()["data"]
+        self.assertEqual(ended["last_active_date"], (today - timedelta(days=1)).isoformat())
+        self.assertEqual(roster(today - timedelta(days=1)), {first})
+        self.assertEqual(roster(today), set())
+        # Se puede volver a inscribir el mismo día de la baja
+        again = self.client.post(
+            enrollments, json={"participant_external_ids": [first]}, headers=headers
+        ).get_json()["data"]
+        self.assertEqual(again["enrolled"], [first])
+
+        # Una inscripción que aún no empezaba se elimina en lugar de quedar con un día suelto
+        tomorrow = (today + timedelta(days=1)).isoformat()
+        self.client.post(
+            enrollments, json={"participant_external_ids": [second], "start_date": tomorrow}, headers=headers
+        )
+        ended = self.client.delete(f"{enrollments}/{second}", headers=headers).get_json()["data"]
+        self.assertEqual(ended["deleted"], 1)
+        self.assertEqual(roster(today + timedelta(days=1)), {first})
+        self.assertEqual(
+            Enrollment.query.filter_by(participant_id=created[1].id).count(), 0
+        )
+
+
+@requires_postgres
+class TestParticipantSearchPostgres(BaseTestCase):
+    """pg_trgm + unaccent debe encontrar exactamente lo mismo que el trie de SQLite."""
+
+    database_uri = POSTGRES_TEST_URI
+    MIGRATIONS = [
+        os.path.join(os.path.dirname(__file__), "..", "..", "migrations", name)
+        for name in ("012_participant_search_unaccent.sql", "013_participant_search_null_names.sql")
+    ]
+
+    def setUp(self):
+        super().setUp()
+        connection = db.engine.raw_connection()
+        try:
+            connection.driver_connection.autocommit = True
+            for path in self.MIGRATIONS:
+                with open(path, encoding="utf-8") as migration, connection.cursor() as cursor:
+                    cursor.execute(migration.read())
+        finally:
+            connection.close()
+        for dni, first, last in (
+            ("1104567891", "María José", "Núñez"),
+            ("1104567892", "Mario", "Paredes Ñusta"),
+            ("1714567893", "Ana", "Mariño"),
+            ("1104 67894", "Rosa_María", "100% Loja"),
+        ):
+            db.session.add(Participant(
+                firstName=first, lastName=last, age=20, dni=dni, address="Loja",
+                status="ACTIVO", type="EXTERNO", program="FUNCIONAL",
+            ))
+        db.session.commit()
+        participant_search.mark_dirty()
+
+    def test_postgres_matches_the_trie(self):
+        queries = [
+            "mari", "MARÍA", "maria nunez", "nun", "ñusta", "usta", "jose maria", "ana mar",
+            "ariñ", "a j", "110456", "4567", "1104 6", "7893", "rosa_", "100%", "%", "_", "(", "",
+        ]
+        for q in queries:
+            for field in (None, "dni", "name"):
+                with self.subTest(q=q, field=field):
+                    postgres = set(db.session.scalars(participant_search.matching_ids(q, field)))
+                    self.assertEqual(postgres, participant_search._trie_matches(q, field))
+
+        data = participant_search.search("maria nunez")
+        self.assertEqual([p["dni"] for p in data], ["1104567891"])
+
+    def test_null_last_name_is_still_found(self):
+        # Filas antiguas sin apellido: el nombre completo no debe quedar en NULL
+        with db.engine.begin() as connection:
+            connection.exec_driver_sql('ALTER TABLE participant ALTER COLUMN "lastName" DROP NOT NULL')
+            connection.exec_driver_sql(
+                'UPDATE participant SET "lastName" = NULL WHERE dni = %s', ("1714567893",)
+            )
+        participant_search.mark_dirty()
+        expected = {db.session.query(Participant.id).filter_by(dni="1714567893").scalar()}
+        postgres = set(db.session.scalars(participant_search.matching_ids("ana", "name")))
+        self.assertEqual(postgres, expected)
+        self.assertEqual(postgres, participant_search._trie_matches("ana", "name"))
+
+
+class SessionCapacityScenario:
+    """Registro concurrente de una misma sesión desde varios hilos."""
+
+    MAX_SLOTS = 10
+
+    def test_concurrent_bulk_and_checkin_respect_capacity(self):
+        token = self.client.post(
+            "/api/auth/login", json={"email": "dev@kallpa.com", "password": "xxxxx"}
+        ).get_json()["token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        schedule = Schedule(
+            name="Sesión concurrida", dayOfWeek="MONDAY", startTime="08:00",
+            endTime="09:00", maxSlots=self.MAX_SLOTS, program="FUNCIONAL",
+        )
+        db.session.add(schedule)
+        participants = [
+            Participant(
+                firstName=f"Nombre{i}", lastName=f"Apellido{i}", age=20, dni=f"C{i:09d}",
+                address="Loja", status="ACTIVO", type="ESTUDIANTE", program="FUNCIONAL",
+            )
+            for i in range(30)
+        ]
+        db.session.add_all(participants)
+        db.session.commit()
+        schedule_external_id = schedule.external_id
+        external_ids = [p.external_id for p in participants]
+
+        def bulk(worker):
+            # Cada instructor marca 4 participantes; los grupos se solapan entre hilos
+            chosen = [external_ids[(worker * 3 + k) % 30] for k in range(4)]
+            return self.client.post(
+                "/api/attendance/v2/public/register",
+                json={
+                    "schedule_external_id": schedule_external_id,
+                    "date": "2026-05-04",
+                    "attendances": [
+                        {"participant_external_id": e, "status": "present"} for e in chosen
+                    ],
+                },
+                headers=headers,
+            ).status_code
+
+        def check_in(i):
+            return self.client.post(
+                "/api/attendance/v2/public/checkin",
+                json={
+                    "schedule_external_id": schedule_external_id,
+                    "date": "2026-05-04",
+                    "participant_external_id": external_ids[i],
+                },
+                headers=headers,
+            ).status_code
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            futures = [pool.submit(bulk, w) for w in range(10)]
+            futures += [pool.submit(check_in, i) for i in range(30)]
+            statuses = [f.result() for f in futures]
+
+        self.assertTrue(set(statuses) <= {200, 409}, statuses)
+        self.assertIn(409, statuses)
+
+        db.session.expire_all()
+        rows = Attendance.query.filter_by(date=date(2026, 5, 4)).all()
+        present = [a for a in rows if a.status == Attendance.Status.PRESENT]
+        self.assertEqual(len(rows), len({a.participant_id for a in rows}))
+        self.assertLessEqual(len(present), self.MAX_SLOTS)
+        summary = db.session.get(AttendanceDailySummary, (schedule.id, date(2026, 5, 4)))
+        self.assertEqual(summary.present, len(present))
+
+
+class TestSessionCapacityConcurrency(SessionCapacityScenario, BaseTestCase):
+    """
+    Variante SQLite (base en archivo). SQLite ignora with_for_update() y su bloqueo
+    único de escritura serializa todo: esto verifica la lógica de cupos bajo hilos,
+    no el bloqueo de fila de lock_session_summary (ver la variante PostgreSQL).
+    """
+
+    def setUp(self):
+        fd, self.db_path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        self.database_uri = f"sqlite:///{self.db_path}"
+        super().setUp()
+        today_sessions_cache.clear()
+
+    def tearDown(self):
+        super().tearDown()
+        os.remove(self.db_path)
+
+
+@requires_postgres
+class TestSessionCapacityConcurrencyPostgres(SessionCapacityScenario, BaseTestCase):
+    """Misma carga sobre PostgreSQL, donde el cupo depende del SELECT ... FOR UPDATE."""
+
+    database_uri = POSTGRES_TEST_URI
+
+    def setUp(self):
+        super().setUp()
+        today_sessions_cache.clear()
+
+    def test_session_lock_blocks_a_second_transaction(self):
+        schedule = Schedule(
+            name="Sesión bloqueada", dayOfWeek="MONDAY", startTime="08:00",
+            endTime="09:00", maxSlots=1, program="FUNCIONAL",
+        )
+        db.session.add(schedule)
+        db.session.commit()
+        schedule_id, day = schedule.id, date(2026, 5, 4)
+        locked, waits = threading.Event(), []
+
+        def holder():
+            with self.app.app_context():
+                lock_session_summary(schedule_id, day)
+                locked.set()
+                time.sleep(0.5)
+                db.session.commit()
+
+        def contender():
+            locked.wait()
+            with self.app.app_context():
+                started = time.perf_counter()
+                lock_session_summary(schedule_id, day)
+                waits.append(time.perf_counter() - started)
+                db.session.commit()
+
+        threads = [threading.Thread(target=holder), threading.Thread(target=contender)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # La segunda transacción esperó a que la primera liberara la fila
+        self.assertGreaterEqual(waits[0], 0.4)
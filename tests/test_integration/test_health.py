@@ -0,0 +1,55 @@
+import time
+
+from app.services.java_sync_service import java_sync
+from app.utils.circuit_breaker import CircuitBreaker
+from app.utils.http_client import PooledHttpClient
+from tests.test_integration.base_test import BaseTestCase
+from tests.test_unitarios.fake_person_api import FakePersonApi
+
+
+class TestJavaCircuitHealth(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.api = FakePersonApi().start()
+        self.original_base_url, self.original_http = java_sync.base_url, java_sync.http
+        java_sync.base_url = self.api.base_url
+        java_sync.http = PooledHttpClient(
+            connect_timeout=1, read_timeout=0.3, retries=0,
+            breaker=CircuitBreaker("java_person_api", failure_threshold=2, reset_timeout=60),
+        )
+
+    def tearDown(self):
+        java_sync.base_url, java_sync.http = self.original_base_url, self.original_http
+        self.api.stop()
+        super().tearDown()
+
+    def _java_login(self):
+        return self.client.post("/api/auth/login", json={"email": "otro@test.com", "password": "x"})
+
+    def test_health_reports_circuit_state(self):
+        health = self.client.get("/api/health").get_json()
+        self.assertEqual((health["status"], health["java_circuit"]["state"]), ("ok", "CLOSED"))
+
+        self.api.mode = "drop"
+        for _ in range(2):
+            self.assertEqual(self._java_login().status_code, 500)
+
+        health = self.client.get("/api/health")
+        self.assertEqual(health.status_code, 200)
+        data = health.get_json()
+        self.assertEqual((data["status"], data["java_circuit"]["state"]), ("degraded", "OPEN"))
+        self.assertGreater(data["java_circuit"]["retry_in_seconds"], 0)
+
+    def test_login_fails_fast_while_java_is_down(self):
+        self.api.mode = "drop"
+        self._java_login()
+        self._java_login()
+        requests_before = sum(self.api.requests.values())
+
+        started = time.perf_counter()
+        response = self._java_login()
+
+        self.assertEqual(response.status_code, 503)
+        self.assertLess(time.perf_counter() - started, 0.2)
+        self.assertEqual(sum(self.api.requests.values()), requests_before)
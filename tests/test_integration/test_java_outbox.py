@@ -0,0 +1,243 @@
+from datetime import datetime, timedelta
+
+from app import db
+from app.models.javaSyncOutbox import JavaSyncOutbox
+from app.models.participant import Participant
+from app.services.java_outbox_service import java_outbox
+from app.services.java_sync_service import java_sync
+from app.utils.circuit_breaker import OPEN, CircuitBreaker
+from app.utils.http_client import PooledHttpClient
+from app.utils.jwt import generate_token
+from tests.test_integration.base_test import BaseTestCase
+from tests.test_unitarios.fake_person_api import FakePersonApi
+
+
+class TestJavaSyncOutbox(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.api = FakePersonApi({
+            "12345678": {"external": "java-admin", "identification": "12345678", "first_name": "Test"},
+        }).start()
+        self.original_base_url, self.original_http = java_sync.base_url, java_sync.http
+        java_sync.base_url = self.api.base_url
+        java_sync.http = PooledHttpClient(retries=0, breaker=CircuitBreaker("java", failure_threshold=3))
+        java_sync.identification_cache.clear()
+        self.original_service = java_outbox.service_email, java_outbox.service_password
+        java_outbox.service_email, java_outbox.service_password = "servicio@kallpa.com", "secreta"
+        java_outbox._service_token.clear()
+        token = generate_token({"sub": "test-user-id", "email": "dev@kallpa.com", "role": "ADMINISTRADOR"})
+        self.headers = {"Authorization": f"Bearer {token}"}
+
+    def tearDown(self):
+        java_sync.base_url, java_sync.http = self.original_base_url, self.original_http
+        java_outbox.service_email, java_outbox.service_password = self.original_service
+        java_outbox._service_token.clear()
+        self.api.stop()
+        super().tearDown()
+
+    def _participant(self):
+        participant = Participant(
+            firstName="Ana", lastName="Torres", age=20, dni="1104567891", address="Loja",
+            status="ACTIVO", type="EXTERNO", program="FUNCIONAL", java_external="java-ana",
+        )
+        db.session.add(participant)
+        db.session.commit()
+        return participant
+
+    def _later(self, minutes=60):
+        return datetime.utcnow() + timedelta(minutes=minutes)
+
+    def test_profile_update_returns_before_java_and_worker_delivers(self):
+        response = self.client.put(
+            "/api/users/profile", json={"firstName": "Nuevo", "password": "secreta1"},
+            headers=self.headers,
+        )
+        self.assertEqual(response.status_code, 200, response.get_json())
+        outbox_id = response.get_json()["data"]["java_sync_id"]
+        # La API respondió sin llamar a Java
+        self.assertEqual(sum(self.api.requests.values()), 0)
+        row = db.session.get(JavaSyncOutbox, outbox_id)
+        self.assertEqual(row.status, "PENDING")
+        self.assertNotIn("secreta1", str(row.payload))
+
+        self.assertEqual(java_outbox.process_due()["DONE"], 1)
+
+        db.session.refresh(row)
+        self.assertEqual((row.status, row.attempts), ("DONE", 1))
+        # Token de la cuenta de servicio; el external se buscó por cédula
+        self.assertEqual(self.api.requests["login"], 1)
+        self.assertEqual(self.api.updates[0]["first_name"], "Nuevo")
+        self.assertEqual(self.api.updates[0]["external"], "java-admin")
+
+    def test_service_token_is_reused_across_deliveries(self):
+        self.client.put("/api/users/profile", json={"firstName": "Uno"}, headers=self.headers)
+        java_outbox.process_due()
+        self.client.put("/api/users/profile", json={"firstName": "Dos"}, headers=self.headers)
+        java_outbox.process_due()
+        self.assertEqual((self.api.requests["login"], self.api.requests["update"]), (1, 2))
+
+    def test_nothing_is_delivered_without_service_credentials(self):
+        java_outbox.service_email = None
+        self.client.put("/api/users/profile", json={"firstName": "Nuevo"}, headers=self.headers)
+
+        self.assertEqual(java_outbox.process_due(), {"DONE": 0, "PENDING": 0, "FAILED": 0})
+        self.assertEqual(JavaSyncOutbox.query.one().attempts, 0)
+
+    def test_repeated_profile_updates_are_coalesced(self):
+        for name in ("Primero", "Segundo", "Tercero"):
+            self.client.put("/api/users/profile", json={"firstName": name}, headers=self.headers)
+
+        self.assertEqual(JavaSyncOutbox.query.count(), 1)
+        java_outbox.process_due()
+        self.assertEqual(self.api.requests["update"], 1)
+        self.assertEqual(self.api.updates[0]["first_name"], "Tercero")
+
+    def test_failures_retry_with_backoff_until_final_status(self):
+        self.api.mode = "error"
+        self.client.put("/api/users/profile", json={"firstName": "Nuevo"}, headers=self.headers)
+        row = JavaSyncOutbox.query.one()
+
+        self.assertEqual(java_outbox.process_due()["PENDING"], 1)
+        db.session.refresh(row)
+        self.assertEqual(row.attempts, 1)
+        self.assertIn("500", row.last_error)
+        self.assertGreater(row.next_attempt_at, datetime.utcnow())
+        # Aún no vence: no se reintenta
+        self.assertEqual(java_outbox.process_due(), {"DONE": 0, "PENDING": 0, "FAILED": 0})
+
+        for _ in range(java_outbox.MAX_ATTEMPTS - 1):
+            java_sync.http.breaker.reset()
+            java_outbox.process_due(now=self._later(60 * 24))
+        db.session.refresh(row)
+        self.assertEqual((row.status, row.attempts), ("FAILED", java_outbox.MAX_ATTEMPTS))
+
+    def test_state_changes_are_queued_and_opposite_toggles_cancel(self):
+        participant = self._participant()
+        url = f"/api/users/{participant.external_id}/status"
+
+        first = self.client.put(url, json={"status": "INACTIVO"}, headers=self.headers)
+        self.assertIsNotNone(first.get_json()["data"]["java_sync_id"])
+        second = self.client.put(url, json={"status": "ACTIVO"}, headers=self.headers)
+        self.assertIsNone(second.get_json()["data"]["java_sync_id"])
+
+        self.assertEqual(JavaSyncOutbox.query.one().status, "CANCELLED")
+        java_outbox.process_due()
+        self.assertEqual(self.api.requests["change_state"], 0)
+
+        self.client.put(url, json={"status": "INACTIVO"}, headers=self.headers)
+        java_outbox.process_due()
+        self.assertEqual(self.api.requests["change_state"], 1)
+        self.assertEqual(JavaSyncOutbox.query.filter_by(status="DONE").count(), 1)
+        self.assertNotIn("token", JavaSyncOutbox.query.filter_by(status="DONE").one().payload)
+
+    def test_ambiguous_state_change_is_not_retried(self):
+        participant = self._participant()
+        url = f"/api/users/{participant.external_id}/status"
+        self.client.put(url, json={"status": "INACTIVO"}, headers=self.headers)
+        java_outbox._service_token.set("token", "Bearer fake-token")
+        # Java cierra la conexión después de recibir la petición: pudo aplicarla
+        self.api.fail_next("drop")
+
+        self.assertEqual(java_outbox.process_due()["FAILED"], 1)
+        row = JavaSyncOutbox.query.one()
+        self.assertEqual(row.attempts, 1)
+
+        # Un cambio posterior no anula un intento que pudo haberse aplicado
+        self.client.put(url, json={"status": "ACTIVO"}, headers=self.headers)
+        self.assertEqual(JavaSyncOutbox.query.filter_by(status="PENDING").count(), 1)
+
+    def test_state_change_retries_when_java_surely_did_not_receive_it(self):
+        participant = self._participant()
+        self.client.put(
+            f"/api/users/{participant.external_id}/status", json={"status": "INACTIVO"}, headers=self.headers,
+        )
+        java_outbox._service_token.set("token", "Bearer fake-token")
+        self.api.fail_next("unavailable")
+
+        self.assertEqual(java_outbox.process_due()["PENDING"], 1)
+        # Conexión rechazada: la petición nunca salió
+        java_sync.base_url = "http://127.0.0.1:9/api/person"
+        java_outbox._service_token.set("token", "Bearer fake-token")
+        self.assertEqual(java_outbox.process_due(now=self._later())["PENDING"], 1)
+
+        java_sync.base_url = self.api.base_url
+        self.assertEqual(java_outbox.process_due(now=self._later(120))["DONE"], 1)
+        self.assertEqual(self.api.requests["change_state"], 2)
+
+    def test_pending_state_change_with_attempts_is_not_cancelled(self):
+        participant = self._participant()
+        url = f"/api/users/{participant.external_id}/status"
+        self.client.put(url, json={"status": "INACTIVO"}, headers=self.headers)
+        JavaSyncOutbox.query.update({"attempts": 1})
+        db.session.commit()
+
+        response = self.client.put(url, json={"status": "ACTIVO"}, headers=self.headers)
+        self.assertIsNotNone(response.get_json()["data"]["java_sync_id"])
+        self.assertEqual(JavaSyncOutbox.query.filter_by(status="PENDING").count(), 2)
+
+    def test_open_circuit_pauses_delivery_without_spending_attempts(self):
+        self.api.mode = "error"
+        for name in ("Uno", "Dos", "Tres"):
+            # Fallas de otras llamadas a Java abren el circuito
+            java_sync.search_by_identification(name, "token")
+        self.assertEqual(java_sync.http.breaker.state, OPEN)
+
+        self.client.put("/api/users/profile", json={"firstName": "Nuevo"}, headers=self.headers)
+        self.assertEqual(java_outbox.process_due(), {"DONE": 0, "PENDING": 0, "FAILED": 0})
+        row = JavaSyncOutbox.query.one()
+        self.assertEqual((row.status, row.attempts), ("PENDING", 0))
+        self.assertEqual(self.api.requests["login"], 0)
+
+    def test_expired_change_state_lease_is_failed_not_resent(self):
+        participant = self._participant()
+        self.client.put(
+            f"/api/users/{participant.external_id}/status", json={"status": "INACTIVO"}, headers=self.headers,
+        )
+        # Otro worker reclamó la fila y murió a mitad del envío
+        JavaSyncOutbox.query.update({
+            "status": "PROCESSING", "attempts": 1,
+            "next_attempt_at": datetime.utcnow() - timedelta(seconds=1),
+        })
+        db.session.commit()
+
+        java_outbox.process_due(now=self._later())
+
+        row = JavaSyncOutbox.query.one()
+        db.session.refresh(row)
+        self.assertEqual((row.status, row.attempts), ("FAILED", 1))
+        self.assertIn("Entrega desconocida", row.last_error)
+        self.assertEqual(self.api.requests["change_state"], 0)
+
+    def test_expired_profile_update_lease_is_reclaimed(self):
+        self.client.put("/api/users/profile", json={"firstName": "Nuevo"}, headers=self.headers)
+        JavaSyncOutbox.query.update({
+            "status": "PROCESSING", "attempts": 1,
+            "next_attempt_at": datetime.utcnow() - timedelta(seconds=1),
+        })
+        db.session.commit()
+
+        self.assertEqual(java_outbox.process_due()["DONE"], 1)
+        self.assertEqual(JavaSyncOutbox.query.one().attempts, 2)
+
+    def test_missing_service_account_is_reported_once_and_in_health(self):
+        java_outbox.service_email = None
+        self.client.put("/api/users/profile", json={"firstName": "Nuevo"}, headers=self.headers)
+
+        java_outbox._start_refused = False
+        try:
+            with self.assertLogs(self.app.logger, level="ERROR") as logs:
+                java_outbox.start(self.app)
+                java_outbox.start(self.app)
+            self.assertEqual(len(logs.records), 1)
+            self.assertEqual(java_outbox._threads, [])
+        finally:
+            java_outbox._start_refused = False
+
+        backlog = self.client.get("/api/health/java").get_json()["outbox_backlog"]
+        self.assertEqual(backlog["undelivered"], 1)
+        self.assertFalse(backlog["service_account_configured"])
+
+        result = self.app.test_cli_runner().invoke(args=["java-outbox-worker", "--once"])
+        self.assertNotEqual(result.exit_code, 0)
+        self.assertIn("JAVA_SERVICE_EMAIL", result.output)
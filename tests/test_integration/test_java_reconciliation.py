@@ -0,0 +1,116 @@
+from app import db
+from app.models.javaPersonSnapshot import JavaPersonSnapshot
+from app.models.participant import Participant
+from app.models.user import User
+from app.services.java_reconciliation_service import java_reconciliation
+from app.services.java_sync_service import java_sync
+from app.utils.circuit_breaker import CircuitBreaker
+from app.utils.http_client import PooledHttpClient
+from tests.test_integration.base_test import BaseTestCase
+from tests.test_unitarios.fake_person_api import FakePersonApi
+
+
+def _person(dni, external, name="Ana"):
+    return {"identification": dni, "external": external, "first_name": name}
+
+
+class TestJavaReconciliation(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.api = FakePersonApi({
+            "1104567891": _person("1104567891", "java-ana"),
+            "1104567892": _person("1104567892", "java-luis", "Luis"),
+            "12345678": _person("12345678", "java-admin", "Test"),
+            "1104567899": _person("1104567899", "java-solo-java", "Eva"),
+        }).start()
+        self.original_base_url, self.original_http = java_sync.base_url, java_sync.http
+        java_sync.base_url = self.api.base_url
+        java_sync.http = PooledHttpClient(retries=0, breaker=CircuitBreaker("java", failure_threshold=3))
+
+        for dni, java_external in (
+            ("1104567891", "java-ana"),       # coincide
+            ("1104567892", "java-viejo"),     # desactualizado
+            ("1104567893", "java-borrado"),   # ya no existe en Java
+            ("1104567894", None),             # solo local, sin Java
+        ):
+            db.session.add(Participant(
+                firstName="Ana", lastName="Torres", age=20, dni=dni, address="Loja",
+                status="ACTIVO", type="EXTERNO", program="FUNCIONAL", java_external=java_external,
+            ))
+        db.session.commit()
+
+    def tearDown(self):
+        java_sync.base_url, java_sync.http = self.original_base_url, self.original_http
+        self.api.stop()
+        super().tearDown()
+
+    def _java_external(self, model, dni):
+        return db.session.query(model.java_external).filter_by(dni=dni).scalar()
+
+    def test_first_run_fixes_mismatches_and_reports_missing(self):
+        report = java_reconciliation.reconcile("token", batch_size=2)
+
+        self.assertTrue(report["complete"])
+        self.assertEqual((report["received"], report["processed"]), (4, 4))
+        self.assertEqual((report["mismatched"], report["fixed"]), (2, 2))
+        self.assertEqual(self._java_external(Participant, "1104567892"), "java-luis")
+        self.assertEqual(self._java_external(User, "12345678"), "java-admin")
+        self.assertEqual(report["missing_local_sample"], [{"dni": "1104567899", "java_external": "java-solo-java"}])
+        self.assertEqual(
+            report["missing_remote_sample"],
+            [{"dni": "1104567893", "kind": "participant", "java_external": "java-borrado"}],
+        )
+        self.assertEqual(JavaPersonSnapshot.query.count(), 4)
+
+    def test_later_runs_only_process_changes(self):
+        java_reconciliation.reconcile("token")
+
+        report = java_reconciliation.reconcile("token")
+        self.assertEqual((report["unchanged"], report["processed"], report["fixed"]), (4, 0, 0))
+
+        # Cambia una persona en Java y se desajusta otra localmente
+        self.api.people["1104567892"] = _person("1104567892", "java-luis-2", "Luis")
+        Participant.query.filter_by(dni="1104567891").update({"java_external": None})
+        db.session.commit()
+
+        report = java_reconciliation.reconcile("token")
+        self.assertEqual((report["unchanged"], report["processed"], report["fixed"]), (2, 2, 2))
+        self.assertEqual(self._java_external(Participant, "1104567892"), "java-luis-2")
+        self.assertEqual(self._java_external(Participant, "1104567891"), "java-ana")
+
+        # --full ignora el checkpoint
+        self.assertEqual(java_reconciliation.reconcile("token", full=True)["processed"], 4)
+
+    def test_people_removed_from_java_leave_the_checkpoint(self):
+        java_reconciliation.reconcile("token")
+        del self.api.people["1104567899"]
+
+        java_reconciliation.reconcile("token")
+        self.assertIsNone(db.session.get(JavaPersonSnapshot, "1104567899"))
+        self.assertEqual(JavaPersonSnapshot.query.count(), 3)
+
+    def test_dry_run_writes_nothing(self):
+        report = java_reconciliation.reconcile("token", dry_run=True)
+
+        self.assertEqual((report["mismatched"], report["fixed"]), (2, 0))
+        self.assertEqual(self._java_external(Participant, "1104567892"), "java-viejo")
+        self.assertEqual(JavaPersonSnapshot.query.count(), 0)
+
+    def test_java_error_keeps_checkpoint_and_cli_fails(self):
+        self.api.mode = "error"
+        report = java_reconciliation.reconcile("token")
+        self.assertFalse(report["complete"])
+        self.assertIn("500", report["error"])
+        self.assertEqual(report["missing_remote"], 0)
+
+        result = self.app.test_cli_runner().invoke(args=["reconcile-java-persons", "--token", "token"])
+        self.assertNotEqual(result.exit_code, 0)
+        self.assertIn("Conciliación incompleta", result.output)
+
+        self.api.mode = "ok"
+        result = self.app.test_cli_runner().invoke(
+            args=["reconcile-java-persons", "--dry-run"], env={"JAVA_SYNC_TOKEN": "token"}
+        )
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn('"mismatched": 2', result.output)
@@ -0,0 +1,218 @@
+from app import db
+from app.models.participant import Participant
+from app.models.user import User
+from tests.test_integration.base_test import BaseTestCase
+
+
+class TestParticipantListing(BaseTestCase):
+
+    def _auth(self):
+        response = self.client.post(
+            "/api/auth/login", json={"email": "dev@kallpa.com", "password": "xxxxx"}
+        )
+        self.assertEqual(response.status_code, 200)
+        return {"Authorization": f"Bearer {response.get_json()['token']}"}
+
+    def _seed(self, count, program="FUNCIONAL", status="ACTIVO"):
+        participants = [
+            Participant(
+                firstName=f"Nombre{i}",
+                lastName=f"Apellido{i}",
+                age=20,
+                dni=f"{program[:1]}{status[:1]}{i:08d}",
+                address="Loja",
+                status=status,
+                type="ESTUDIANTE",
+                program=program,
+            )
+            for i in range(count)
+        ]
+        db.session.add_all(participants)
+        db.session.commit()
+        return participants
+
+    def test_list_users_legacy_shape(self):
+        headers = self._auth()
+        self._seed(3)
+        data = self.client.get("/api/users", headers=headers).get_json()["data"]
+        self.assertEqual(len(data), 3)
+        self.assertEqual(
+            set(data[0]),
+            {"external_id", "firstName", "lastName", "email", "dni", "age", "status", "type", "java_external"},
+        )
+
+    def test_list_users_paginated_projection_and_filters(self):
+        headers = self._auth()
+        created = self._seed(7)
+        self._seed(2, program="INICIACION")
+        self._seed(2, status="INACTIVO")
+
+        seen, cursor = [], None
+        while True:
+            url = "/api/users?program=FUNCIONAL&status=ACTIVO&fields=external_id,dni&limit=3"
+            if cursor:
+                url += f"&cursor={cursor}"
+            with self.count_queries() as statements:
+                page = self.client.get(url, headers=headers).get_json()["data"]
+            self.assertEqual(len(statements), 1)
+            self.assertTrue(all(set(item) == {"external_id", "dni"} for item in page["items"]))
+            seen.extend(item["external_id"] for item in page["items"])
+            cursor = page["next_cursor"]
+            if not cursor:
+                break
+        self.assertEqual(seen, [p.external_id for p in created])
+
+        invalid = self.client.get("/api/users?fields=password", headers=headers)
+        self.assertEqual(invalid.status_code, 400)
+        self.assertEqual(invalid.get_json()["data"]["fields"], ["password"])
+
+
+class TestParticipantRegistration(BaseTestCase):
+
+    def _minor(self, dni="1104567891", responsible_dni="1104567892", email="nino@test.com"):
+        return {
+            "participant": {
+                "firstName": "Mateo",
+                "lastName": "Castillo",
+                "dni": dni,
+                "age": 12,
+                "phone": "0991234578",
+                "program": "INICIACION",
+                "email": email,
+                "type": "ESTUDIANTE",
+                "address": "Loja",
+            },
+            "responsible": {"name": "Ana Castillo", "dni": responsible_dni, "phone": "0991234579"},
+        }
+
+    def test_create_participant_single_probe_and_transaction(self):
+        with self.count_queries() as statements:
+            response = self.client.post("/api/save-participants", json=self._minor())
+        self.assertEqual(response.status_code, 200, response.get_json())
+        # Consulta de duplicados (UNION) + INSERT participante + INSERT responsable
+        self.assertEqual(len(statements), 3)
+        self.assertEqual(sum("UNION ALL" in sql for sql in statements), 1)
+
+        data = response.get_json()["data"]
+        participant = Participant.query.filter_by(external_id=data["participant_external_id"]).one()
+        self.assertEqual(participant.responsibles[0].external_id, data["responsible_external_id"])
+
+    def test_create_participant_reports_duplicates_from_probe(self):
+        self.client.post("/api/save-participants", json=self._minor())
+        with self.count_queries() as statements:
+            response = self.client.post(
+                "/api/save-participants",
+                json=self._minor(dni="1104567892", responsible_dni="1104567891"),
+            )
+        self.assertEqual(response.status_code, 400)
+        errors = response.get_json()["data"]
+        self.assertEqual(errors["dni"], "El DNI ya está registrado")
+        self.assertEqual(errors["responsibleDni"], "El DNI ya está registrado")
+        self.assertEqual(errors["email"], "El correo ya está registrado")
+        self.assertEqual(len(statements), 1)
+
+    def test_create_participant_links_existing_user(self):
+        # Un docente ya registrado como usuario se inscribe también como participante
+        user = User.query.filter_by(email="dev@kallpa.com").one()
+        user.dni = "1104567894"
+        db.session.commit()
+        response = self.client.post(
+            "/api/save-participants",
+            json={
+                "firstName": "Test", "lastName": "User", "dni": "1104567894", "age": 30,
+                "phone": "0991234581", "program": "FUNCIONAL", "email": "docente@test.com",
+                "type": "DOCENTE", "address": "Loja",
+            },
+        )
+        self.assertEqual(response.status_code, 200, response.get_json())
+        participant = Participant.query.filter_by(dni="1104567894").one()
+        self.assertEqual(participant.user_id, user.id)
+
+
+class TestParticipantImport(BaseTestCase):
+
+    def _auth(self):
+        response = self.client.post(
+            "/api/auth/login", json={"email": "dev@kallpa.com", "password": "xxxxx"}
+        )
+        return {"Authorization": f"Bearer {response.get_json()['token']}"}
+
+    def _adult(self, i, **overrides):
+        row = {
+            "firstName": "Lucia", "lastName": "Torres", "dni": f"22045{i:05d}", "age": 25,
+            "phone": "0991234578", "program": "FUNCIONAL", "email": f"lucia{i}@test.com",
+            "type": "EXTERNO", "address": "Loja",
+        }
+        row.update(overrides)
+        return row
+
+    def test_import_dry_run_reports_row_errors_without_inserting(self):
+        headers = self._auth()
+        db.session.add(Participant(
+            firstName="Ya", lastName="Existe", age=30, dni="2204500099", address="Loja",
+            status="ACTIVO", type="EXTERNO", program="FUNCIONAL",
+        ))
+        db.session.commit()
+        rows = [
+            self._adult(1),
+            self._adult(2, dni="2204500001", email="otra@test.com"),  # repetido en el lote
+            self._adult(3, email="lucia1@test.com"),  # correo repetido en el lote
+            self._adult(4, dni="2204500099"),  # ya existe en la base
+            self._adult(5, firstName="L", age="abc"),
+        ]
+        with self.count_queries() as statements:
+            response = self.client.post(
+                "/api/participants/import?dry_run=true", json={"participants": rows}, headers=headers
+            )
+        self.assertEqual(response.status_code, 200, response.get_json())
+        data = response.get_json()["data"]
+        self.assertEqual((data["total"], data["valid"], data["invalid"], data["created"]), (5, 1, 4, 0))
+        errors = {item["row"]: item["errors"] for item in data["errors"]}
+        self.assertEqual(errors[2]["dni"], "DNI repetido en la fila 1")
+        self.assertEqual(errors[3]["email"], "Correo repetido en la fila 1")
+        self.assertEqual(errors[4]["dni"], "El DNI ya está registrado")
+        self.assertEqual(set(errors[5]), {"firstName", "age"})
+        # Una sola consulta de duplicados para todo el lote
+        self.assertEqual(sum("UNION ALL" in sql for sql in statements), 1)
+        self.assertIsNone(Participant.query.filter_by(dni="2204500001").first())
+
+    def test_import_csv_inserts_valid_rows_with_responsibles(self):
+        headers = self._auth()
+        csv_text = (
+            "\ufefffirstName,lastName,dni,age,phone,email,address,type,program,"
+            "responsibleName,responsibleDni,responsiblePhone\n"
+            "Mateo,Castillo,2204600001,12,0991234578,mateo@test.com,Loja,ESTUDIANTE,INICIACION,"
+            "Ana Castillo,2204600009,0991234579\n"
+            "Sofia,Castillo,2204600002,10,0991234578,sofia@test.com,Loja,ESTUDIANTE,INICIACION,"
+            "Ana Castillo,2204600009,0991234579\n"
+            "Pedro,Ruiz,2204600003,40,0991234578,pedro@test.com,Loja,EXTERNO,FUNCIONAL,,,\n"
+            "Nino,Solo,2204600004,11,0991234578,nino@test.com,Loja,ESTUDIANTE,INICIACION,,,\n"
+        )
+        response = self.client.post(
+            "/api/participants/import", data=csv_text, content_type="text/csv", headers=headers
+        )
+        self.assertEqual(response.status_code, 200, response.get_json())
+        data = response.get_json()["data"]
+        self.assertEqual((data["valid"], data["created"]), (3, 3))
+        self.assertEqual(data["errors"][0]["row"], 4)
+        self.assertIn("responsibleName", data["errors"][0]["errors"])
+
+        mateo = Participant.query.filter_by(dni="2204600001").one()
+        self.assertEqual(mateo.age, 12)
+        self.assertEqual(mateo.responsibles[0].dni, "2204600009")
+        self.assertEqual(Participant.query.filter_by(dni="2204600002").one().responsibles[0].name, "Ana Castillo")
+        self.assertEqual(Participant.query.filter_by(dni="2204600003").one().responsibles, [])
+        self.assertIsNone(Participant.query.filter_by(dni="2204600004").first())
+
+        # Los nuevos participantes aparecen en la búsqueda (índice invalidado)
+        search = self.client.get("/api/participants/search?q=Sofia", headers=headers)
+        self.assertEqual(search.status_code, 200)
+        self.assertTrue(any(p["dni"] == "2204600002" for p in search.get_json()["data"]))
+
+    def test_import_rejects_empty_and_oversized_batches(self):
+        headers = self._auth()
+        empty = self.client.post("/api/participants/import", json={"participants": []}, headers=headers)
+        self.assertEqual(empty.status_code, 400)
+        rows = [self._adult(i) for i in range(2001)]
+        oversized = self.client.post("/api/participants/import", json={"participants": rows}, headers=headers)
+        self.assertEqual(oversized.status_code, 400)
@@ -0,0 +1,124 @@
+"""
+Servidor falso del API de personas (Java) para pruebas y benchmarks.
+Corre en un hilo sobre un puerto libre, cuenta conexiones TCP y peticiones, y
+puede cambiar de modo: "ok", "error" (500), "unavailable" (503), "slow" y "drop"
+(cierra la conexión sin responder).
+"""
+import json
+import socket
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def setup(self):
+        super().setup()
+        # Encabezados y cuerpo van en escrituras separadas: sin esto Nagle +
+        # ACK retardado agregan ~40 ms por petición en conexiones keep-alive
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        with self.server.fake.lock:
+            self.server.fake.connections += 1
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self._dispatch()
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        self.body = json.loads(self.rfile.read(length) or b"{}")
+        self._dispatch()
+
+    def _dispatch(self):
+        fake = self.server.fake
+        path = self.path.split("/api/person/", 1)[-1]
+        with fake.lock:
+            fake.requests[path.split("/")[0]] += 1
+            mode = fake.failures.pop(0) if fake.failures else fake.mode
+        if mode == "drop":
+            self.close_connection = True
+            self.connection.close()
+            return
+        if mode == "slow":
+            time.sleep(fake.delay)
+        elif mode in ("error", "unavailable"):
+            return self._send(500 if mode == "error" else 503, {"message": "falla simulada"})
+        status, payload = fake.route(path, getattr(self, "body", None))
+        self._send(status, payload)
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clientes que cortan por timeout: no ensuciar la salida de las pruebas
+        pass
+
+
+class FakePersonApi:
+    """API de personas en memoria: {identification: persona}."""
+
+    def __init__(self, people=None):
+        self.people = dict(people or {})
+        self.mode = "ok"
+        self.delay = 0.5
+        self.failures = []  # modos a aplicar a las próximas peticiones, en orden
+        self.connections = 0
+        self.requests = Counter()
+        self.updates = []
+        self.lock = threading.Lock()
+        self._server = _Server(("127.0.0.1", 0), _Handler)
+        self._server.fake = self
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self._server.server_port}/api/person"
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def fail_next(self, *modes):
+        with self.lock:
+            self.failures.extend(modes)
+
+    def route(self, path, body):
+        parts = path.split("/")
+        if parts[0] == "search_identification":
+            person = self.people.get(parts[1])
+            return (200, person) if person else (404, {})
+        if parts[0] in ("save", "save-account"):
+            person = {
+                "external": f"java-{body['identification']}", "identification": body["identification"],
+                "first_name": body.get("first_name"), "last_name": body.get("last_name"),
+            }
+            self.people[body["identification"]] = person
+            return 200, {"message": "ok", "data": person}
+        if parts[0] == "update":
+            self.updates.append(body)
+            return 200, {"status": "success", "message": "ok", "data": body}
+        if parts[0] == "change_state":
+            return 200, {"message": "ok", "data": {"external": parts[1]}}
+        if parts[0] == "login":
+            return 200, {"data": {"external": "java-login", "token": "Bearer fake-token"}}
+        if parts[0] == "all_filter":
+            return 200, list(self.people.values())
+        return 404, {}
@@ -0,0 +1,109 @@
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from app.services.java_sync_service import JavaSyncService
+from app.utils.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+from app.utils.http_client import PooledHttpClient
+from tests.test_unitarios.fake_person_api import FakePersonApi
+
+PERSON = {"external": "java-1", "identification": "1104567891", "first_name": "Ana"}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestJavaCircuitBreaker(unittest.TestCase):
+    """Pruebas del circuit breaker contra un API de personas falso con modos de falla"""
+
+    def setUp(self):
+        self.api = FakePersonApi({"1104567891": PERSON}).start()
+        self.clock = FakeClock()
+        self.breaker = CircuitBreaker("java", failure_threshold=3, reset_timeout=30, clock=self.clock)
+        self.http = PooledHttpClient(connect_timeout=1, read_timeout=0.3, retries=0,
+                                     backoff=0, breaker=self.breaker)
+        self.service = JavaSyncService(http=self.http)
+        self.service.base_url = self.api.base_url
+        # Sin caché de identificaciones: cada búsqueda sale a la red
+        self.service.identification_cache.maxsize = 0
+
+    def tearDown(self):
+        self.api.stop()
+
+    def _search(self):
+        return self.service.search_by_identification("1104567891", "token")
+
+    def test_opens_after_consecutive_failures_only(self):
+        self.api.fail_next("error", "error", "ok", "error", "error")
+        for _ in range(5):
+            self._search()
+        # El éxito intermedio reinició el conteo
+        self.assertEqual(self.breaker.state, CLOSED)
+
+        self.api.mode = "error"
+        self._search()
+        self.assertEqual(self.breaker.state, OPEN)
+
+    def test_fails_fast_while_open(self):
+        self.api.mode, self.api.delay = "slow", 1
+        for _ in range(3):
+            self._search()  # timeouts de 0.3 s
+        self.assertEqual(self.breaker.state, OPEN)
+        received = sum(self.api.requests.values())
+
+        started = time.perf_counter()
+        results = [self._search() for _ in range(50)]
+        elapsed = time.perf_counter() - started
+
+        self.assertLess(elapsed, 0.2)
+        self.assertTrue(all(r["found"] is False and "abierto" in r["error"] for r in results))
+        self.assertEqual(sum(self.api.requests.values()), received)
+        self.assertEqual(self.breaker.snapshot()["rejected"], 50)
+        with self.assertRaises(CircuitOpenError):
+            self.http.get(f"{self.api.base_url}/all_filter", operation="all")
+
+    def test_half_open_probe_closes_or_reopens(self):
+        self.api.mode = "drop"
+        for _ in range(3):
+            self._search()
+        self.clock.now += 31
+        self.assertEqual(self.breaker.state, HALF_OPEN)
+
+        # La prueba falla: vuelve a abrirse por otro periodo completo
+        self._search()
+        self.assertEqual(self.breaker.state, OPEN)
+        self.assertEqual(self.breaker.snapshot()["retry_in_seconds"], 30)
+
+        self.clock.now += 31
+        self.api.mode = "ok"
+        self.assertTrue(self._search()["found"])
+        self.assertEqual(self.breaker.state, CLOSED)
+
+    def test_half_open_allows_a_single_probe_across_threads(self):
+        self.api.mode = "error"
+        for _ in range(3):
+            self._search()
+        self.clock.now += 31
+        self.api.mode, self.api.delay = "slow", 0.2
+        received = sum(self.api.requests.values())
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(lambda _: self._search(), range(8)))
+
+        # Solo una llamada salió a la red; las demás se rechazaron de inmediato
+        self.assertEqual(sum(self.api.requests.values()) - received, 1)
+        self.assertEqual(sum("abierto" in str(r.get("error")) for r in results), 7)
+
+    def test_client_errors_do_not_count_as_failures(self):
+        for _ in range(5):
+            self.assertFalse(self.service.search_by_identification("0000000001", "token")["found"])
+        self.assertEqual(self.breaker.state, CLOSED)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+import time
+import unittest
+from datetime import date
+
+from app.services.schedule_occurrence_service import IntervalIndex, ScheduleRule
+
+
+def _rule(schedule_id, day, start, end, specific=None, start_date=None, end_date=None):
+    return ScheduleRule(
+        schedule_id, f"ext-{schedule_id}", f"Sesión {schedule_id}", "FUNCIONAL", None,
+        day, specific, start_date, end_date, start, end,
+    )
+
+
+class TestScheduleOccurrences(unittest.TestCase):
+    """Pruebas del motor de ocurrencias e índice de intervalos"""
+
+    def test_expand_recurring_within_range(self):
+        rule = _rule(1, "WEDNESDAY", "18:00", "19:00",
+                     start_date=date(2027, 1, 1), end_date=date(2027, 1, 31))
+
+        days = list(rule.dates(date(2026, 12, 1), date(2027, 3, 1)))
+
+        self.assertEqual(days, [date(2027, 1, d) for d in (6, 13, 20, 27)])
+
+    def test_expand_specific_date_and_spanish_day(self):
+        one_off = _rule(1, None, "08:00", "09:00", specific=date(2027, 2, 10))
+        spanish = _rule(2, "Miércoles", "08:00", "09:00")
+
+        self.assertEqual(list(one_off.dates(date(2027, 2, 1), date(2027, 2, 28))), [date(2027, 2, 10)])
+        self.assertEqual(len(list(spanish.dates(date(2027, 2, 1), date(2027, 2, 28)))), 4)
+
+    def test_overlap_requires_common_date_and_time(self):
+        index = IntervalIndex()
+        index.add(_rule(1, "MONDAY", "08:00", "10:00",
+                        start_date=date(2027, 3, 1), end_date=date(2027, 3, 29)))
+        index.add(_rule(2, "MONDAY", "10:00", "11:00"))
+
+        inside = _rule(None, None, "09:30", "10:30", specific=date(2027, 3, 8))
+        outside = _rule(None, None, "09:30", "09:45", specific=date(2027, 4, 5))
+
+        self.assertEqual(sorted(r.id for r in index.overlapping(inside)), [1, 2])
+        self.assertEqual(index.overlapping(outside), [])
+
+    def test_overlap_thousands_of_schedules_is_fast(self):
+        index = IntervalIndex()
+        days = ["MONDAY", "TUESDAY", "WEDNESDAY", "THURSDAY", "FRIDAY", "SATURDAY", "SUNDAY"]
+        for i in range(5000):
+            minute = (i * 7) % (22 * 60)
+            start = f"{minute // 60:02d}:{minute % 60:02d}"
+            end = f"{minute // 60 + 1:02d}:{minute % 60:02d}"
+            index.add(_rule(i, days[i % 7], start, end))
+
+        started = time.perf_counter()
+        for hour in range(6, 22):
+            index.overlapping(_rule(None, "MONDAY", f"{hour:02d}:00", f"{hour:02d}:30"))
+        elapsed = time.perf_counter() - started
+
+        self.assertLess(elapsed, 0.5)
+
+
+if __name__ == "__main__":
+    unittest.main()
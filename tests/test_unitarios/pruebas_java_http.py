@@ -0,0 +1,159 @@
+import time
+import unittest
+
+import requests
+
+from app.services.java_sync_service import JavaSyncService
+from app.utils.http_client import PooledHttpClient
+from app.utils.json_stream import iter_json_array
+from tests.test_unitarios.fake_person_api import FakePersonApi
+
+PERSON = {"external": "java-1", "identification": "1104567891", "first_name": "Ana"}
+
+
+class TestPooledJavaClient(unittest.TestCase):
+    """Pruebas del cliente HTTP con pool contra un API de personas falso"""
+
+    def setUp(self):
+        self.api = FakePersonApi({"1104567891": PERSON}).start()
+        self.http = PooledHttpClient(pool_size=2, connect_timeout=1, read_timeout=1,
+                                     retries=2, backoff=0)
+        self.service = JavaSyncService(http=self.http)
+        self.service.base_url = self.api.base_url
+
+    def tearDown(self):
+        self.api.stop()
+
+    def test_reuses_connection_across_calls(self):
+        # Identificaciones distintas: ninguna se sirve desde la caché
+        for i in range(20):
+            result = self.service.search_by_identification(f"11045678{i:02d}", "token")
+            self.assertNotIn("error", result)
+
+        self.assertEqual(self.api.connections, 1)
+        stats = self.http.stats()["search_by_identification"]
+        self.assertEqual((stats["calls"], stats["errors"]), (20, 0))
+
+    def test_retries_idempotent_calls_with_backoff(self):
+        self.api.fail_next("unavailable", "drop")
+
+        result = self.service.search_by_identification("1104567891", "token")
+
+        self.assertTrue(result["found"])
+        self.assertEqual(self.api.requests["search_identification"], 3)
+        self.assertEqual(self.http.stats()["search_by_identification"]["retries"], 2)
+
+    def test_does_not_retry_non_idempotent_calls(self):
+        self.api.fail_next("unavailable")
+        result = self.service.change_state("java-1", "token")
+        self.assertFalse(result["success"])
+        self.assertEqual(self.api.requests["change_state"], 1)
+
+        self.api.fail_next("drop")
+        result = self.service.create_person({"dni": "1104567892", "firstName": "Luis"}, "token")
+        self.assertFalse(result["success"])
+        self.assertEqual(self.api.requests["save"], 1)
+        self.assertEqual(self.http.stats()["create_person"]["errors"], 1)
+
+    def test_read_timeout_is_enforced(self):
+        self.api.mode, self.api.delay = "slow", 1
+        http = PooledHttpClient(connect_timeout=1, read_timeout=0.2, retries=0)
+
+        with self.assertRaises(requests.exceptions.Timeout):
+            http.get(f"{self.api.base_url}/search_identification/1104567891", operation="search")
+
+
+class TestJavaIdentificationCache(unittest.TestCase):
+    """Pruebas de la caché (positiva y negativa) de búsquedas por identificación"""
+
+    def setUp(self):
+        self.api = FakePersonApi({"1104567891": PERSON}).start()
+        self.service = JavaSyncService(http=PooledHttpClient(retries=0, backoff=0))
+        self.service.base_url = self.api.base_url
+
+    def tearDown(self):
+        self.api.stop()
+
+    def test_repeated_lookups_hit_remote_once(self):
+        results = [self.service.search_by_identification("1104567891", "token") for _ in range(5)]
+
+        self.assertTrue(all(r["found"] for r in results))
+        self.assertEqual(self.api.requests["search_identification"], 1)
+        stats = self.service.identification_cache_stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["negative_hits"]), (4, 1, 0))
+        # Los resultados son copias: modificarlos no altera la caché
+        results[0]["data"]["firstName"] = "Otra"
+        self.assertEqual(self.service.search_by_identification("1104567891", "token")["data"]["firstName"], "Ana")
+
+    def test_not_found_is_cached_with_shorter_ttl(self):
+        self.service.negative_ttl = 0.2
+        for _ in range(3):
+            self.assertFalse(self.service.search_by_identification("1104567892", "token")["found"])
+        self.assertEqual(self.api.requests["search_identification"], 1)
+        self.assertEqual(self.service.identification_cache_stats()["negative_hits"], 2)
+
+        time.sleep(0.25)
+        self.service.search_by_identification("1104567892", "token")
+        self.assertEqual(self.api.requests["search_identification"], 2)
+
+    def test_errors_are_not_cached(self):
+        self.api.fail_next("error")
+        self.assertIn("error", self.service.search_by_identification("1104567891", "token"))
+        self.assertTrue(self.service.search_by_identification("1104567891", "token")["found"])
+        self.assertEqual(self.api.requests["search_identification"], 2)
+
+    def test_own_writes_invalidate_the_person(self):
+        # Negativo en caché hasta que nosotros mismos creamos la persona
+        self.assertFalse(self.service.search_by_identification("1104567892", "token")["found"])
+        self.service.create_person({"dni": "1104567892", "firstName": "Luis"}, "token")
+        self.assertTrue(self.service.search_by_identification("1104567892", "token")["found"])
+
+        # update_person solo conoce el external: se invalida por el índice external -> cédula
+        self.service.search_by_identification("1104567891", "token")
+        before = self.api.requests["search_identification"]
+        self.service.update_person({"external_id": "java-1", "firstName": "Ana"}, "token")
+        self.service.search_by_identification("1104567891", "token")
+        self.assertEqual(self.api.requests["search_identification"], before + 1)
+
+    def test_cache_is_bounded(self):
+        self.service.identification_cache.maxsize = 3
+        for i in range(10):
+            self.service.search_by_identification(f"22045000{i:02d}", "token")
+        self.assertEqual(self.service.identification_cache_stats()["size"], 3)
+
+
+class TestJsonArrayStream(unittest.TestCase):
+    """Lectura incremental del arreglo que devuelve /all_filter"""
+
+    DOCUMENT = '[{"identification": "1104567891", "first_name": "Ñusta"}, 12345, "a,]", [1, {"b": null}]]'
+
+    def _chunks(self, size):
+        data = self.DOCUMENT.encode("utf-8")
+        return [data[i:i + size] for i in range(0, len(data), size)]
+
+    def test_same_items_for_any_chunk_size(self):
+        expected = [{"identification": "1104567891", "first_name": "Ñusta"}, 12345, "a,]", [1, {"b": None}]]
+        for size in (1, 2, 3, 7, 64, 10_000):
+            # Con bloques de 1 byte la Ñ llega partida y el número en varios trozos
+            self.assertEqual(list(iter_json_array(self._chunks(size))), expected)
+        self.assertEqual(list(iter_json_array([b" [ ] "])), [])
+
+    def test_invalid_documents_raise(self):
+        for document in ('{"a": 1}', "[1, 2", '[{"a": 1', "[1,,2]", "[1 2]", ""):
+            with self.assertRaises(ValueError, msg=document):
+                list(iter_json_array([document.encode("utf-8")]))
+
+    def test_streams_from_the_person_api(self):
+        people = {f"11000000{i:02d}": {"identification": f"11000000{i:02d}"} for i in range(50)}
+        api = FakePersonApi(people).start()
+        try:
+            service = JavaSyncService(http=PooledHttpClient(retries=0))
+            service.base_url = api.base_url
+            received = [p["identification"] for p in service.iter_all_persons("token", chunk_size=16)]
+        finally:
+            api.stop()
+        self.assertEqual(received, list(people))
+
+
+if __name__ == "__main__":
+    unittest.main()